@@ -42,6 +42,43 @@ def get_max_upload_size():
 VIDEO_SETTINGS = {
     'MAX_UPLOAD_SIZE': get_max_upload_size(),
     'DEFAULT_QUALITY': os.getenv('DEFAULT_VIDEO_QUALITY', '1080p'),
+    # 'single' runs one ffmpeg process per video, 'parallel' fans out one Celery task per rendition,
+    # 'chunked' fans out one Celery task per CHUNK_DURATION-second slice of the source
+    'PROCESSING_MODE': os.getenv('VIDEO_PROCESSING_MODE', 'single'),
+    'CHUNK_DURATION': int(os.getenv('VIDEO_CHUNK_DURATION', '60')),
+    # 'segments' writes an init file plus one file per segment and rendition; 'single_file' writes one
+    # fragmented MP4 per rendition addressed by byte range (SegmentBase). Chunked mode always uses segments
+    'PACKAGING': os.getenv('VIDEO_PACKAGING', 'segments'),
+    # Mark the fMP4 segments as CMAF and write HLS playlists over them next to the MPD,
+    # so the same files serve DASH and HLS players
+    'CMAF': os.getenv('VIDEO_CMAF', 'False').lower() == 'true',
+    # Low-latency profile: each segment is muxed as FRAGMENT_DURATION-second fragments flushed as
+    # they are encoded, so players can start from the first fragment and fetch segments still being
+    # written while a title encodes. Segments packaging only, single_file output needs the whole file
+    'LOW_LATENCY': os.getenv('VIDEO_LOW_LATENCY', 'False').lower() == 'true',
+    'FRAGMENT_DURATION': float(os.getenv('VIDEO_FRAGMENT_DURATION', '0.5')),
+    # Bitrate of the single audio representation shared by every rendition, when the source isn't AAC already
+    'AUDIO_BITRATE': os.getenv('VIDEO_AUDIO_BITRATE', '128k'),
+    # Serve the dynamic MPD ffmpeg rewrites while a 'single' mode video is still encoding,
+    # so playback starts from the first segments instead of waiting for COMPLETED
+    'PROGRESSIVE_PLAYBACK': os.getenv('VIDEO_PROGRESSIVE_PLAYBACK', 'True').lower() == 'true',
+    # Seconds a processing progress snapshot is kept in Redis
+    'PROGRESS_TTL': 24 * 3600,
+    # Seconds a (user, title) streaming grant is cached in Redis and in each process
+    'AUTHZ_CACHE_TTL': 300,
+    'AUTHZ_LOCAL_TTL': 5,
+    # Shared with nginx secure_link; when set, MPDs point segments at signed /streams/ URLs
+    'SIGNING_SECRET': os.getenv('STREAM_SIGNING_SECRET', ''),
+    'SIGNED_URL_TTL': int(os.getenv('STREAM_SIGNED_URL_TTL', str(6 * 3600))),
+    'SIGNED_URL_PREFIX': '/streams',
+    # RAM tier for the segments every viewer fetches first: a tmpfs shared with nginx ('' disables it),
+    # its size in bytes, and how many media segments of each representation it holds per title
+    'HOT_SEGMENT_ROOT': os.getenv('HOT_SEGMENT_ROOT', ''),
+    'HOT_SEGMENT_BUDGET': int(os.getenv('HOT_SEGMENT_BUDGET', str(256 * 1024 * 1024))),
+    'HOT_SEGMENT_COUNT': int(os.getenv('HOT_SEGMENT_COUNT', '3')),
+    # Direct-to-bucket uploads (USE_S3): part size handed to clients and lifetime of presigned part URLs
+    'DIRECT_UPLOAD_PART_SIZE': int(os.getenv('DIRECT_UPLOAD_PART_SIZE', str(64 * 1024 * 1024))),
+    'DIRECT_UPLOAD_URL_TTL': int(os.getenv('DIRECT_UPLOAD_URL_TTL', '3600')),
 }
 
 
@@ -105,6 +142,7 @@ REST_FRAMEWORK = {
         'anon': '100/day',  # Limit anonymous users to 100 requests per day
         'user': '1000/day',  # Limit authenticated users to 1000 requests per day
         'uploads': '10/day',  # Limit video uploads to 10 per day
+        'upload_parts': '20000/day',  # PATCH/HEAD requests of resumable uploads
         'streaming': '1000/hour',  # Limit streaming requests
     },
     'EXCEPTION_HANDLER': 'streambuddy_common.throttles.custom_throttle_handler',
@@ -252,19 +290,29 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 PROTECTED_MEDIA_URL = '/protected_media/'
+PROTECTED_HOT_URL = '/protected_hot/'
 
 # AWS settings
 AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
 AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
 AWS_STORAGE_BUCKET_NAME = os.getenv('AWS_STORAGE_BUCKET_NAME')
 AWS_S3_REGION_NAME = os.getenv('AWS_S3_REGION_NAME')
+# Point at MinIO or another S3-compatible endpoint instead of AWS
+AWS_S3_ENDPOINT_URL = os.getenv('AWS_S3_ENDPOINT_URL') or None
+AWS_S3_CUSTOM_DOMAIN = os.getenv('AWS_S3_CUSTOM_DOMAIN', f"{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com")
+USE_S3 = os.getenv('USE_S3', 'False').lower() == 'true'
 
 
 VIDEO_STORAGE = {
     'METADATA_ROOT': os.path.join(MEDIA_ROOT, 'metadata'),
+    # 'database' keeps metadata in Postgres, 'json' in one file per title under METADATA_ROOT
+    'METADATA_BACKEND': os.getenv('VIDEO_METADATA_BACKEND', 'database'),
     'MPD_ROOT': os.path.join(MEDIA_ROOT, 'dash_output'),
     'TEMP_UPLOAD_ROOT': os.path.join(MEDIA_ROOT, 'temp_uploads'),
-    'USE_S3': False,  # Set to True when you want to use S3
+    'USE_S3': USE_S3,
+    # Key prefix of published DASH output, and how many files are uploaded at once
+    'S3_DASH_PREFIX': 'dash',
+    'S3_PUBLISH_CONCURRENCY': int(os.getenv('S3_PUBLISH_CONCURRENCY', '32')),
     'S3_BUCKET_NAME': AWS_STORAGE_BUCKET_NAME,
     'S3_REGION': AWS_S3_REGION_NAME,
     'S3_ACCESS_KEY': AWS_ACCESS_KEY_ID,
@@ -274,10 +322,26 @@ VIDEO_STORAGE = {
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'filters': {
+        # Keep 1 in N successful streaming requests, every warning and error
+        'sampled_access': {
+            '()': 'streambuddy_common.log_filters.SamplingFilter',
+            'rate': int(os.getenv('STREAMING_LOG_SAMPLE_RATE', '100')),
+        },
+    },
+    'formatters': {
+        'access': {
+            'format': '%(asctime)s %(levelname)s %(name)s event=%(message)s sample_rate=%(sample_rate)s',
+        },
+    },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
         },
+        'access_console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'access',
+        },
         'file': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
@@ -294,12 +358,26 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        'videos.services.streaming': {
+            'handlers': ['access_console'],
+            'filters': ['sampled_access'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'videos.api.live': {
+            'handlers': ['access_console'],
+            'filters': ['sampled_access'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     }
 }
 
 # APPEND_SLASH = False  # Prevent Django from appending slashes
 
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+# Shared Redis for progress and caches, the broker's instance unless set separately
+REDIS_URL = os.getenv('REDIS_URL', CELERY_BROKER_URL)
 CELERY_RESULT_BACKEND = 'django-db'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
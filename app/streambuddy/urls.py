@@ -21,6 +21,8 @@ from django.conf import settings
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from videos.api.streaming import signed_segment
+from videos.api.live import live_segment
 
 
 schema_view = get_schema_view(
@@ -41,6 +43,12 @@ urlpatterns = [
     path('api/', include('videos.urls')),
     path('api/auth/', include('dj_rest_auth.urls')),
     path('api/auth/registration/', include('dj_rest_auth.registration.urls')),
+    # Signed segment URLs, normally answered by nginx secure_link before reaching Django
+    path('streams/<int:user_id>/<int:expires>/<str:token>/<str:title>/<str:segment>',
+         signed_segment, name='signed_segment'),
+    # Signed segments nginx found no file for, streamed by the ASGI service while still being written
+    path('streams/live/<int:user_id>/<int:expires>/<str:token>/<str:title>/<str:segment>',
+         live_segment, name='live_segment'),
 
     # Swagger URLs
     path('swagger<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
@@ -0,0 +1,27 @@
+import itertools
+import logging
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Pass one in every `rate` records below `min_level`, and every record at or above it.
+
+    Meant for high-volume access logs: successful requests are sampled while warnings
+    and errors are always kept. Passed records get a `sample_rate` attribute so log
+    consumers can scale counts back up.
+    """
+
+    def __init__(self, name='', rate=100, min_level='WARNING'):
+        super().__init__(name)
+        self.rate = max(1, int(rate))
+        self.min_level = logging.getLevelName(min_level) if isinstance(min_level, str) else min_level
+        self._counter = itertools.count()
+
+    def filter(self, record):
+        if record.levelno >= self.min_level:
+            record.sample_rate = 1
+            return True
+        if next(self._counter) % self.rate:
+            return False
+        record.sample_rate = self.rate
+        return True
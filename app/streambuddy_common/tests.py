@@ -1,3 +1,52 @@
+import logging
 from django.test import TestCase
+from unittest.mock import MagicMock, patch
 
-# Create your tests here.
+from .utils.progress_tracker import FFmpegProgress
+from .log_filters import SamplingFilter
+
+
+class FFmpegProgressTestCase(TestCase):
+    def setUp(self):
+        self.storage = MagicMock()
+        self.storage.get_metadata.return_value = {'title': 'test-video'}
+        self.progress = FFmpegProgress(100, self.storage, 'test-video', min_interval=2.0)
+
+    @patch('streambuddy_common.utils.progress_tracker.time.time')
+    def test_progress_writes_are_rate_limited(self, mock_time):
+        mock_time.return_value = 1000.0
+        self.progress.start_time = 1000.0
+
+        self.assertEqual(self.progress.update_progress('out_time=00:00:10.000000'), 10)
+        mock_time.return_value = 1001.0
+        self.progress.update_progress('out_time=00:00:20.000000')
+        self.assertEqual(self.storage.save_metadata.call_count, 1)
+
+        mock_time.return_value = 1002.5
+        self.progress.update_progress('out_time=00:00:30.000000')
+        self.assertEqual(self.storage.save_metadata.call_count, 2)
+
+    def test_final_progress_is_always_written(self):
+        self.progress.update_progress('out_time=00:00:50.000000')
+        self.progress.update_progress('out_time=00:01:40.000000')
+        self.assertEqual(self.storage.save_metadata.call_count, 2)
+        self.assertEqual(self.storage.save_metadata.call_args[0][1]['processing_progress'], 100)
+
+
+class SamplingFilterTestCase(TestCase):
+    def _record(self, level):
+        return logging.LogRecord('videos.services.streaming', level, __file__, 1, 'segment_served title=%s', ('t',), None)
+
+    def test_info_is_sampled(self):
+        sampler = SamplingFilter(rate=10)
+        passed = [r for r in (self._record(logging.INFO) for _ in range(100)) if sampler.filter(r)]
+        self.assertEqual(len(passed), 10)
+        self.assertTrue(all(r.sample_rate == 10 for r in passed))
+
+    def test_warnings_and_errors_always_pass(self):
+        sampler = SamplingFilter(rate=1000)
+        sampler.filter(self._record(logging.INFO))
+        for level in (logging.WARNING, logging.ERROR):
+            record = self._record(level)
+            self.assertTrue(sampler.filter(record))
+            self.assertEqual(record.sample_rate, 1)
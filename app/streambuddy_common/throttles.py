@@ -6,6 +6,10 @@ class VideoUploadRateThrottle(UserRateThrottle):
     rate = '10/day'
     scope = 'uploads'
 
+class UploadPartRateThrottle(UserRateThrottle):
+    rate = '20000/day'
+    scope = 'upload_parts'
+
 class StreamingRateThrottle(AnonRateThrottle):
     rate = '1000/hour'
     scope = 'streaming'
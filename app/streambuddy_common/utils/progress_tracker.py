@@ -6,11 +6,16 @@ import json
 import os
 
 class FFmpegProgress:
-    def __init__(self, total_duration, storage_service, title):
+    def __init__(self, total_duration, storage_service, title, min_interval=2.0, on_progress=None):
         self.total_duration = total_duration
         self.storage_service = storage_service
         self.title = title
         self.start_time = time.time()
+        # Persist at most once per min_interval seconds, ffmpeg reports several times a second
+        self.min_interval = min_interval
+        self.last_saved = None
+        # Optional callable(progress, remaining_time) invoked alongside each persisted update
+        self.on_progress = on_progress
 
     def update_progress(self, progress_text):
         """Update progress based on FFmpeg output."""
@@ -35,8 +40,13 @@ class FFmpegProgress:
                 else:
                     remaining_time = 0
 
-                # Update metadata with progress
-                self._update_metadata(progress, remaining_time)
+                # Update metadata with progress, rate limited except for the final report
+                now = time.time()
+                if progress >= 100 or self.last_saved is None or now - self.last_saved >= self.min_interval:
+                    self.last_saved = now
+                    self._update_metadata(progress, remaining_time)
+                    if self.on_progress:
+                        self.on_progress(progress, remaining_time)
                 
                 return progress
         except Exception as e:
@@ -0,0 +1,16 @@
+from functools import lru_cache
+from django.conf import settings
+import redis
+
+
+@lru_cache(maxsize=None)
+def get_redis_client(url=None):
+    """
+    Get a Redis client for the shared Redis instance.
+    Clients are cached per URL so every caller in the process shares one connection pool.
+    Args:
+        url: Redis URL, defaults to settings.REDIS_URL
+    Returns:
+        redis.Redis: Client decoding responses to str
+    """
+    return redis.Redis.from_url(url or settings.REDIS_URL, decode_responses=True)
@@ -43,3 +43,36 @@ class VideoValidator:
                 f'Unsupported file type {mime}. Allowed types: {", ".join(cls.ALLOWED_TYPES.values())}'
             )
 
+
+    @classmethod
+    def validate_video_path(cls, file_path):
+        """
+        Validates a video file already on disk, e.g. an assembled resumable upload.
+        Args:
+            file_path: Path to the file
+        Raises:
+            ValidationError: If file is invalid
+        """
+        with open(file_path, 'rb') as f:
+            cls.validate_video_head(f.read(1024), os.path.getsize(file_path))
+
+    @classmethod
+    def validate_video_head(cls, head, size):
+        """
+        Validates a video from its size and first bytes, e.g. an object in the bucket.
+        Args:
+            head: At least the first 1024 bytes of the file
+            size: Size of the whole file in bytes
+        Raises:
+            ValidationError: If file is invalid
+        """
+        if size > cls.MAX_SIZE:
+            raise ValidationError(
+                f'File size must be no more than {cls.MAX_SIZE/(1024*1024*1024):.1f}GB'
+            )
+
+        mime = magic.from_buffer(head[:1024], mime=True)
+        if mime not in cls.ALLOWED_TYPES:
+            raise ValidationError(
+                f'Unsupported file type {mime}. Allowed types: {", ".join(cls.ALLOWED_TYPES.values())}'
+            )
@@ -0,0 +1,107 @@
+import json
+import logging
+
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.authtoken.models import Token
+
+from ..models import Video, VideoStatus
+from ..services.progress import ProgressChannel
+
+# Seconds between keepalive comments so proxies don't drop an idle stream
+HEARTBEAT_INTERVAL = 15
+FINAL_STATUSES = (VideoStatus.COMPLETED, VideoStatus.FAILED)
+
+
+async def _authenticate(request):
+    """
+    Resolve the user of an event stream request.
+    Args:
+        request: The ASGI request
+    Returns:
+        User or None: The session user, or the owner of the DRF token sent in the
+        Authorization header or the ``token`` query parameter (EventSource cannot set headers)
+    """
+    user = await request.auser()
+    if user.is_authenticated:
+        return user
+
+    header = request.headers.get('Authorization', '')
+    key = header[len('Token '):] if header.startswith('Token ') else request.GET.get('token')
+    if not key:
+        return None
+    try:
+        token = await Token.objects.select_related('user').aget(key=key)
+    except Token.DoesNotExist:
+        return None
+    return token.user if token.user.is_active else None
+
+
+def _event(snapshot):
+    return f"event: progress\ndata: {json.dumps(snapshot)}\n\n"
+
+
+async def _progress_events(client, key, fallback=None):
+    """Yield the current snapshot, then every published one until processing ends."""
+    pubsub = client.pubsub()
+    try:
+        # Subscribe before reading the snapshot so no update falls in between
+        await pubsub.subscribe(key)
+        raw = await client.get(key)
+        snapshot = json.loads(raw) if raw else fallback
+        if snapshot:
+            yield _event(snapshot)
+            if snapshot['status'] in FINAL_STATUSES:
+                return
+
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=HEARTBEAT_INTERVAL)
+            if message is None:
+                yield ": keepalive\n\n"
+                continue
+            snapshot = json.loads(message['data'])
+            yield _event(snapshot)
+            if snapshot['status'] in FINAL_STATUSES:
+                return
+    except aioredis.RedisError as e:
+        logging.warning(f"Progress stream for {key} interrupted: {str(e)}")
+    finally:
+        await pubsub.aclose()
+        await client.aclose()
+
+
+async def video_progress_events(request, title):
+    """Server-sent events stream of a video's processing progress, served under ASGI."""
+    user = await _authenticate(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentication credentials were not provided.'}, status=401)
+
+    key = ProgressChannel.key(user.id, title)
+    client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+    try:
+        published = await client.exists(key)
+    except aioredis.RedisError:
+        published = False
+
+    # Nothing in Redis: the video is unknown, queued, or finished long enough ago to expire
+    fallback = None
+    if not published:
+        video = await Video.objects.filter(title=title, user=user).afirst()
+        if video is None:
+            await client.aclose()
+            return JsonResponse({'error': 'Video not found'}, status=404)
+        if video.status in FINAL_STATUSES:
+            fallback = {
+                'status': video.status,
+                'progress': 100 if video.status == VideoStatus.COMPLETED else 0,
+                'current_resolution': None,
+                'resolution_progress': None,
+                'estimated_time_remaining': None,
+            }
+
+    response = StreamingHttpResponse(_progress_events(client, key, fallback), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Let nginx pass events through as they are written
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+
+from ..services.streaming import StreamingService
+
+# Same sampled streaming access log as videos.services.streaming, keep calls lazy
+logger = logging.getLogger(__name__)
+
+# Bytes read from a growing segment per chunk sent
+CHUNK_SIZE = 64 * 1024
+# Seconds between checks for fragments appended to a growing segment
+POLL_INTERVAL = 0.05
+
+
+async def _follow_segment(path, stall_timeout):
+    """
+    Yield a segment file as the packager appends fragments to it.
+    Args:
+        path: The segment's temporary path while it is being written
+        stall_timeout: Seconds without new data after which the packager is assumed gone
+    """
+    with open(path, 'rb') as f:
+        last_data = time.monotonic()
+        while True:
+            data = f.read(CHUNK_SIZE)
+            if data:
+                last_data = time.monotonic()
+                yield data
+                continue
+            if not os.path.exists(path):
+                # Renamed into place once complete, the open file now holds every byte
+                while data := f.read(CHUNK_SIZE):
+                    yield data
+                return
+            if time.monotonic() - last_data > stall_timeout:
+                logger.warning("live_segment_stalled path=%s", path)
+                return
+            await asyncio.sleep(POLL_INTERVAL)
+
+
+async def live_segment(request, user_id, expires, token, title, segment):
+    """
+    Stream a signed segment while ffmpeg is still writing it, served under ASGI.
+
+    nginx sends here the signed segment requests it finds no file for. Low-latency
+    players request the segment being encoded before it completes and receive its
+    fragments with chunked transfer as they are written.
+    """
+    service = StreamingService()
+    if not service.signer.verify(user_id, title, expires, token):
+        return HttpResponse(status=403)
+
+    path = service.partial_segment_path(title, segment)
+    if path is not None:
+        stream = _follow_segment(path, stall_timeout=settings.VIDEO_SETTINGS['FRAGMENT_DURATION'] * 10)
+        try:
+            first = await anext(stream, b'')
+        except FileNotFoundError:
+            # Renamed into place since the lookup
+            path = None
+
+    if path is None:
+        # Completed since nginx looked for it, serve it from disk as usual
+        return service.completed_segment_response(title, segment)
+
+    async def body():
+        yield first
+        async for data in stream:
+            yield data
+
+    response = StreamingHttpResponse(body(), content_type='video/mp4')
+    response['Access-Control-Allow-Origin'] = '*'
+    response['Cache-Control'] = 'no-cache'
+    # Let nginx pass fragments through as they are written
+    response['X-Accel-Buffering'] = 'no'
+    return response
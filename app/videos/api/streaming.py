@@ -10,6 +10,8 @@ from django.http import Http404
 
 from ..models import Video
 from ..services.streaming import StreamingService
+from ..services.authz import VideoAuthorization
+from ..services.signing import StreamURLSigner
 from ..services.video_processor import VideoProcessor
 from ..serializers.video import VideoMetadataSerializer
 
@@ -31,6 +33,8 @@ class VideoStreamingAPIView(APIView):
 
     def __init__(self):
         self.streaming_service = StreamingService()
+        self.authorization = VideoAuthorization()
+        self.signer = StreamURLSigner()
         super().__init__()
 
     @swagger_auto_schema(
@@ -56,21 +60,64 @@ class VideoStreamingAPIView(APIView):
 
 
     def get(self, request, title):
-        try:
-            Video.objects.get(title=title, user=request.user)
-            return self.streaming_service.serve_mpd(title)
-        except Video.DoesNotExist:
+        if not self.authorization.is_authorized(request.user.id, title):
             return Response(
                 {'error': 'Video not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
-    
+        if self.signer.enabled:
+            return self.streaming_service.serve_signed_mpd(title, request.user.id)
+        return self.streaming_service.serve_mpd(title)
+
+
+class VideoPlaylistAPIView(APIView):
+    throttle_classes = [StreamingRateThrottle]
+    permission_classes = [IsAuthenticated]
+
+    def __init__(self):
+        self.streaming_service = StreamingService()
+        self.authorization = VideoAuthorization()
+        self.signer = StreamURLSigner()
+        super().__init__()
+
+    @swagger_auto_schema(
+        operation_description="Get the HLS master playlist, or one of its media playlists, for CMAF output",
+        manual_parameters=[
+            openapi.Parameter(
+                'title',
+                openapi.IN_PATH,
+                description="Video title",
+                type=openapi.TYPE_STRING,
+                required=True
+            )
+        ],
+        responses={
+            200: openapi.Response(
+                description="M3U8 playlist",
+                schema=openapi.Schema(type=openapi.TYPE_FILE)
+            ),
+            404: "Video not found"
+        },
+        tags=['streaming']
+    )
+
+    def get(self, request, title, playlist=None):
+        if not self.authorization.is_authorized(request.user.id, title):
+            return Response(
+                {'error': 'Video not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        if self.signer.enabled:
+            return self.streaming_service.serve_signed_playlist(title, request.user.id, playlist)
+        return self.streaming_service.serve_playlist(title, playlist)
+
 class VideoSegmentAPIView(APIView):
     throttle_classes = [StreamingRateThrottle]
     permission_classes = [IsAuthenticated]
 
     def __init__(self):
         self.streaming_service = StreamingService()
+        self.authorization = VideoAuthorization()
         super().__init__()
     
     @swagger_auto_schema(
@@ -102,14 +149,12 @@ class VideoSegmentAPIView(APIView):
     )
 
     def get(self, request, title, segment):
-        try:
-            Video.objects.get(title=title, user=request.user)
-            return self.streaming_service.serve_segment(title, segment)
-        except Video.DoesNotExist:
+        if not self.authorization.is_authorized(request.user.id, title):
             return Response(
                 {'error': 'Video not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        return self.streaming_service.serve_segment(title, segment)
 
 class VideoInfoAPIView(APIView):
     throttle_classes = [BurstRateThrottle]
@@ -158,3 +203,10 @@ class VideoInfoAPIView(APIView):
                 {'error': 'Video not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+
+
+def signed_segment(request, user_id, expires, token, title, segment):
+    """Serve a segment from a signed URL without DRF auth, throttling or the ORM."""
+    return StreamingService().serve_signed_segment(
+        user_id, expires, token, title, segment, range_header=request.headers.get('Range')
+    )
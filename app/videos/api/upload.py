@@ -5,16 +5,21 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.urls import reverse
 
-from ..models import Video, VideoStatus
+from ..models import Video, VideoStatus, UploadSession
 from ..tasks import process_video_task
 
-from ..serializers.video import VideoUploadSerializer, VideoMetadataSerializer
+from ..serializers.video import VideoUploadSerializer, VideoMetadataSerializer, ResumableUploadSerializer
 from ..services.video_processor import VideoProcessor
 from ..services.storage import StorageService
+from ..services.progress import ProgressChannel
+from ..services.uploads import ResumableUploadService, DirectUploadService
+from ..upload_handlers import TempUploadRootFileHandler
 
 from streambuddy_common.exceptions import (
     VideoProcessingError,
@@ -26,13 +31,50 @@ from streambuddy_common.exceptions import (
 from streambuddy_common.utils.validators import VideoValidator
 from streambuddy_common.utils.filename_utils import sanitize_filename
 
-from streambuddy_common.throttles import VideoUploadRateThrottle, StreamingRateThrottle, BurstRateThrottle
+from streambuddy_common.throttles import (
+    VideoUploadRateThrottle,
+    UploadPartRateThrottle,
+    StreamingRateThrottle,
+    BurstRateThrottle,
+)
 
 
 from datetime import datetime
 
 from celery.result import AsyncResult
 
+def _create_video(user, title, display_title, filename):
+    """Create the Video row for an upload, or return None if the user already has this title."""
+    try:
+        with transaction.atomic():
+            return Video.objects.create(
+                user=user,
+                title=title,
+                display_title=display_title,
+                original_filename=filename,
+            )
+    except IntegrityError:
+        return None
+
+
+def _queue_processing(video, temp_path):
+    """Start the processing task for an uploaded file and describe it in the response."""
+    task = process_video_task.delay(temp_path, video.title, video.id)
+
+    # Update metadata with task ID
+    video.task_id = task.id
+    video.status = VideoStatus.QUEUED
+    video.save()
+
+    return Response({
+        'message': 'Video upload successful, processing started',
+        'title': video.title,
+        'display_title': video.display_title,
+        'task_id': task.id,
+        'status': VideoStatus.QUEUED
+    }, status=status.HTTP_202_ACCEPTED)
+
+
 class VideoProcessingStatusView(APIView):
     throttle_classes = [BurstRateThrottle]
     def get(self, request, task_id):
@@ -62,6 +104,11 @@ class VideoUploadAPIView(APIView):
         self.video_processor = VideoProcessor()
         super().__init__()
 
+    def initialize_request(self, request, *args, **kwargs):
+        # Spool the body into temp_uploads so saving the upload is a rename, not a copy
+        request.upload_handlers = [TempUploadRootFileHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
     @swagger_auto_schema(
         operation_description="Upload a video file",
         request_body=VideoUploadSerializer,
@@ -111,32 +158,18 @@ class VideoUploadAPIView(APIView):
                 )
 
             # Save initial metadata
-            video = Video.objects.create(
-                user=request.user,
-                title=safe_title,
-                display_title=original_title,
-                original_filename=file.name,
-            )
+            video = _create_video(request.user, safe_title, original_title, file.name)
+            if video is None:
+                return Response(
+                    {'error': DuplicateTitleError.default_detail},
+                    status=status.HTTP_409_CONFLICT
+                )
 
             # Save the file temporarily
             storage = StorageService()
             temp_path = storage.save_temp_upload(file, safe_title)
 
-            # Start processing task
-            task = process_video_task.delay(temp_path, safe_title, video.id)
-
-            # Update metadata with task ID
-            video.task_id = task.id
-            video.status = VideoStatus.QUEUED
-            video.save()
-
-            return Response({
-                'message': 'Video upload successful, processing started',
-                'title': safe_title,
-                'display_title': original_title,
-                'task_id': task.id,
-                'status': VideoStatus.QUEUED
-            }, status=status.HTTP_202_ACCEPTED)
+            return _queue_processing(video, temp_path)
 
         except Exception as e:
             return Response(
@@ -146,6 +179,7 @@ class VideoUploadAPIView(APIView):
 
 class VideoProcessProgressView(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_classes = [BurstRateThrottle]
 
     @swagger_auto_schema(
         operation_description="Get video processing progress",
@@ -165,18 +199,277 @@ class VideoProcessProgressView(APIView):
         }
     )
     def get(self, request, title):
+        # Workers keep the latest snapshot in Redis, so polling never reaches the database
+        progress_data = ProgressChannel().get(request.user.id, title)
+        if progress_data:
+            return Response(progress_data)
+
+        # Nothing published (yet or anymore), fall back to the stored status
         try:
             video = Video.objects.get(title=title, user=request.user)
             progress_data = {
                 "status": video.status,
-                "progress": 0,  # This needs to be implemented
-                "current_resolution": None, # This needs to be implemented
-                "resolution_progress": None, # This needs to be implemented
-                "estimated_time_remaining": None # This needs to be implemented
+                "progress": 100 if video.status == VideoStatus.COMPLETED else 0,
+                "current_resolution": None,
+                "resolution_progress": None,
+                "estimated_time_remaining": None
             }
             return Response(progress_data)
         except Video.DoesNotExist:
             return Response(
                 {"error": "Video not found"},
                 status=status.HTTP_404_NOT_FOUND
-            )
\ No newline at end of file
+            )
+
+
+def _upload_headers(response, session):
+    response['Upload-Offset'] = str(session.offset)
+    response['Upload-Length'] = str(session.length)
+    response['Upload-Ranges'] = ','.join(f"{start}-{end - 1}" for start, end in session.ranges)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+class ResumableUploadCreateView(APIView):
+    """Start a resumable upload. The file is then sent with PATCH requests to its Location."""
+    parser_classes = (JSONParser,)
+    throttle_classes = [VideoUploadRateThrottle]
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Create a resumable upload",
+        request_body=ResumableUploadSerializer,
+        responses={
+            201: openapi.Response(
+                description="Upload created",
+                examples={
+                    "application/json": {
+                        "upload_id": "0f8fad5b-d9cb-469f-a165-70867728950e",
+                        "offset": 0,
+                        "length": 1073741824
+                    }
+                }
+            ),
+            409: "A video with this title already exists"
+        },
+        tags=['videos']
+    )
+    def post(self, request):
+        serializer = ResumableUploadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        original_title = serializer.validated_data['title']
+        safe_title = sanitize_filename(original_title)
+        if Video.objects.filter(user=request.user, title=safe_title).exists():
+            return Response(
+                {'error': DuplicateTitleError.default_detail},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        session = ResumableUploadService().create(
+            request.user,
+            safe_title,
+            original_title,
+            serializer.validated_data['filename'],
+            serializer.validated_data['length'],
+        )
+        response = Response({
+            'upload_id': str(session.id),
+            'offset': session.offset,
+            'length': session.length,
+        }, status=status.HTTP_201_CREATED)
+        response['Location'] = reverse('resumable_upload', args=[session.id])
+        return _upload_headers(response, session)
+
+
+class ResumableUploadView(APIView):
+    """
+    Send and inspect the bytes of a resumable upload.
+
+    PATCH writes the request body (Content-Type: application/offset+octet-stream) at the
+    byte position given in the Upload-Offset header. Parts may be sent in parallel and in
+    any order. HEAD reports the contiguous Upload-Offset and every received range in
+    Upload-Ranges, so an interrupted client only resends what is missing.
+    """
+    throttle_classes = [UploadPartRateThrottle]
+    permission_classes = [IsAuthenticated]
+
+    def _get_session(self, request, upload_id):
+        try:
+            return UploadSession.objects.get(id=upload_id, user=request.user, video__isnull=True, s3_upload_id='')
+        except UploadSession.DoesNotExist:
+            raise VideoNotFoundError('Upload not found')
+
+    def head(self, request, upload_id):
+        return _upload_headers(Response(status=status.HTTP_200_OK), self._get_session(request, upload_id))
+
+    def patch(self, request, upload_id):
+        session = self._get_session(request, upload_id)
+        if request.content_type != 'application/offset+octet-stream':
+            return Response(
+                {'error': 'Content-Type must be application/offset+octet-stream'},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+            )
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'Upload-Offset and Content-Length headers are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        session = ResumableUploadService().write_part(session, offset, request.stream, length)
+        return _upload_headers(Response(status=status.HTTP_204_NO_CONTENT), session)
+
+    def delete(self, request, upload_id):
+        ResumableUploadService().abort(self._get_session(request, upload_id))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ResumableUploadFinalizeView(APIView):
+    """Check a fully received upload and queue it for processing."""
+    throttle_classes = [UploadPartRateThrottle]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, upload_id):
+        try:
+            session = UploadSession.objects.get(id=upload_id, user=request.user, video__isnull=True, s3_upload_id='')
+        except UploadSession.DoesNotExist:
+            raise VideoNotFoundError('Upload not found')
+
+        uploads = ResumableUploadService()
+        if not session.complete:
+            return _upload_headers(Response(
+                {'error': f'Upload incomplete, {session.offset} of {session.length} bytes received'},
+                status=status.HTTP_409_CONFLICT
+            ), session)
+
+        video = _create_video(request.user, session.title, session.display_title, session.filename)
+        if video is None:
+            return Response(
+                {'error': DuplicateTitleError.default_detail},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        try:
+            temp_path = uploads.finalize(session)
+        except (InvalidVideoError, StorageError):
+            video.delete()
+            raise
+
+        session.video = video
+        session.save(update_fields=['video'])
+        return _queue_processing(video, temp_path)
+
+
+class DirectUploadCreateView(APIView):
+    """Start an upload that the client sends straight to the bucket (requires USE_S3)."""
+    parser_classes = (JSONParser,)
+    throttle_classes = [VideoUploadRateThrottle]
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Create a direct-to-storage multipart upload",
+        request_body=ResumableUploadSerializer,
+        responses={
+            201: openapi.Response(
+                description="Upload created; PUT each part of part_size bytes to its URL",
+                examples={
+                    "application/json": {
+                        "upload_id": "0f8fad5b-d9cb-469f-a165-70867728950e",
+                        "part_size": 67108864,
+                        "parts": [{"part_number": 1, "url": "https://bucket.s3.amazonaws.com/..."}]
+                    }
+                }
+            ),
+            409: "A video with this title already exists"
+        },
+        tags=['videos']
+    )
+    def post(self, request):
+        serializer = ResumableUploadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        original_title = serializer.validated_data['title']
+        safe_title = sanitize_filename(original_title)
+        if Video.objects.filter(user=request.user, title=safe_title).exists():
+            return Response(
+                {'error': DuplicateTitleError.default_detail},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        uploads = DirectUploadService()
+        session = uploads.create(
+            request.user,
+            safe_title,
+            original_title,
+            serializer.validated_data['filename'],
+            serializer.validated_data['length'],
+        )
+        response = Response({
+            'upload_id': str(session.id),
+            'length': session.length,
+            'part_size': uploads.part_size(session.length),
+            'parts': uploads.part_urls(session),
+        }, status=status.HTTP_201_CREATED)
+        response['Location'] = reverse('direct_upload', args=[session.id])
+        return response
+
+
+class DirectUploadView(APIView):
+    """
+    Resume, complete or abort a direct-to-storage upload.
+
+    GET lists the parts already in the bucket and fresh URLs for the missing ones. POST
+    completes the multipart upload and queues the video for processing. DELETE aborts it.
+    """
+    throttle_classes = [UploadPartRateThrottle]
+    permission_classes = [IsAuthenticated]
+
+    def _get_session(self, request, upload_id):
+        try:
+            return UploadSession.objects.get(
+                id=upload_id, user=request.user, video__isnull=True, s3_upload_id__gt=''
+            )
+        except UploadSession.DoesNotExist:
+            raise VideoNotFoundError('Upload not found')
+
+    def get(self, request, upload_id):
+        session = self._get_session(request, upload_id)
+        uploads = DirectUploadService()
+        parts = uploads.uploaded_parts(session)
+        return Response({
+            'upload_id': str(session.id),
+            'length': session.length,
+            'part_size': uploads.part_size(session.length),
+            'uploaded': sorted(part['PartNumber'] for part in parts),
+            'parts': uploads.part_urls(session, uploads.missing_parts(session, parts)),
+        })
+
+    def post(self, request, upload_id):
+        session = self._get_session(request, upload_id)
+        uploads = DirectUploadService()
+
+        video = _create_video(request.user, session.title, session.display_title, session.filename)
+        if video is None:
+            return Response(
+                {'error': DuplicateTitleError.default_detail},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        try:
+            source = uploads.complete(session)
+        except (InvalidVideoError, StorageError, VideoNotFoundError):
+            video.delete()
+            raise
+
+        session.video = video
+        session.save(update_fields=['video'])
+        return _queue_processing(video, source)
+
+    def delete(self, request, upload_id):
+        DirectUploadService().abort(self._get_session(request, upload_id))
+        return Response(status=status.HTTP_204_NO_CONTENT)
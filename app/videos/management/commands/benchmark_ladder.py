@@ -0,0 +1,117 @@
+from django.core.management.base import BaseCommand, CommandError
+from videos.services.video_processor import VideoProcessor
+from videos.services.ladder import default_ladder
+from videos.utils.video_helpers import VideoInfo
+import os
+import resource
+import subprocess
+import tempfile
+import time
+
+class Command(BaseCommand):
+    help = 'Compare CPU seconds per output minute of the legacy and split/scale DASH ladder graphs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fixture',
+            help='Source clip to encode (defaults to a generated 1080p test pattern)'
+        )
+        parser.add_argument(
+            '--duration',
+            type=int,
+            default=30,
+            help='Length in seconds of the generated fixture clip'
+        )
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=1,
+            help='Number of encodes per graph, CPU time is averaged across runs'
+        )
+
+    def handle(self, *args, **options):
+        processor = VideoProcessor()
+
+        with tempfile.TemporaryDirectory() as work_dir:
+            fixture = options['fixture'] or self._generate_fixture(work_dir, options['duration'])
+            if not os.path.exists(fixture):
+                raise CommandError(f'Fixture not found: {fixture}')
+
+            duration = VideoInfo.get_video_metadata(fixture).get('duration') or options['duration']
+            output_minutes = duration / 60
+
+            ladder = default_ladder()
+            graphs = {
+                'legacy': self._legacy_ladder_args(ladder),
+                'split/scale': processor._ladder_args(ladder),
+            }
+
+            results = {}
+            for name, ladder_args in graphs.items():
+                cpu_seconds, wall_seconds = 0, 0
+                for run in range(options['runs']):
+                    output_dir = os.path.join(work_dir, f'{name.replace("/", "_")}-{run}')
+                    os.makedirs(output_dir)
+                    command = ['ffmpeg', '-v', 'error', '-i', fixture]
+                    command += ladder_args
+                    command += processor._encoder_args()
+                    command += processor._dash_args(
+                        'init-$RepresentationID$.m4s',
+                        'chunk-$RepresentationID$-$Number%05d$.m4s'
+                    )
+                    command.append(os.path.join(output_dir, 'benchmark.mpd'))
+
+                    cpu, wall = self._measure(command)
+                    cpu_seconds += cpu
+                    wall_seconds += wall
+
+                cpu_seconds /= options['runs']
+                wall_seconds /= options['runs']
+                results[name] = cpu_seconds / output_minutes
+                self.stdout.write(
+                    f'{name:12} {cpu_seconds:8.2f} CPU s  {wall_seconds:8.2f} wall s  '
+                    f'{results[name]:8.2f} CPU s per output minute'
+                )
+
+        saving = 100 * (1 - results['split/scale'] / results['legacy'])
+        self.stdout.write(self.style.SUCCESS(f'split/scale graph uses {saving:.1f}% less CPU per output minute'))
+
+    def _measure(self, command):
+        """Run a command and return the CPU and wall seconds it consumed."""
+        before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        started = time.monotonic()
+        result = subprocess.run(command, capture_output=True, text=True)
+        wall = time.monotonic() - started
+        after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+        if result.returncode != 0:
+            raise CommandError(f'FFmpeg failed: {result.stderr}')
+
+        cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+        return cpu, wall
+
+    def _generate_fixture(self, work_dir, duration):
+        """Render a 1080p test pattern clip to encode."""
+        fixture = os.path.join(work_dir, 'fixture.mp4')
+        command = [
+            'ffmpeg', '-v', 'error',
+            '-f', 'lavfi', '-i', f'testsrc2=size=1920x1080:rate=24:duration={duration}',
+            '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p',
+            fixture
+        ]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise CommandError(f'Failed to generate fixture: {result.stderr}')
+        return fixture
+
+    def _legacy_ladder_args(self, renditions):
+        """The original ladder: one -map 0:v per rung, each scaled with -s."""
+        args = []
+        for index, rendition in enumerate(renditions):
+            args += [
+                '-map', '0:v', f'-s:v:{index}', rendition['size'],
+                f'-c:v:{index}', 'libx264', f'-b:v:{index}', rendition['bitrate'],
+                f'-maxrate:v:{index}', rendition['maxrate'], f'-bufsize:v:{index}', rendition['bufsize'],
+                f'-profile:v:{index}', 'main',
+            ]
+        return args
@@ -0,0 +1,104 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from videos.models import Video
+import random
+import statistics
+import time
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Measure the (title, user) Video lookup done by segment requests with and without its indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=1_000_000,
+            help='Number of Video rows to generate'
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=1000,
+            help='Number of owners the rows are spread across'
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=500,
+            help='Lookups timed per run'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('This benchmark drops and restores indexes and needs PostgreSQL')
+
+        # Everything, the generated rows and the dropped indexes, is rolled back at the end
+        with transaction.atomic():
+            users = User.objects.bulk_create(
+                User(email=f'segment-auth-bench-{i}@example.invalid', password='!')
+                for i in range(options['users'])
+            )
+            self.stdout.write(f"Inserting {options['rows']} videos...")
+            Video.objects.bulk_create(
+                (
+                    Video(
+                        user=users[i % len(users)],
+                        title=f'bench-{i}',
+                        display_title=f'Bench {i}',
+                        original_filename=f'bench-{i}.mp4',
+                    )
+                    for i in range(options['rows'])
+                ),
+                batch_size=10000
+            )
+            samples = [
+                (users[i % len(users)].id, f'bench-{i}')
+                for i in random.sample(range(options['rows']), min(options['queries'], options['rows']))
+            ]
+
+            self._analyze()
+            indexed = self._measure(samples)
+            plan_indexed = self._plan(samples[0])
+
+            with connection.schema_editor() as editor:
+                for constraint in Video._meta.constraints:
+                    editor.remove_constraint(Video, constraint)
+                for index in Video._meta.indexes:
+                    editor.remove_index(Video, index)
+            self._analyze()
+            unindexed = self._measure(samples)
+            plan_unindexed = self._plan(samples[0])
+
+            transaction.set_rollback(True)
+
+        self._report('without indexes', unindexed, plan_unindexed)
+        self._report('with indexes', indexed, plan_indexed)
+        speedup = statistics.median(unindexed) / statistics.median(indexed)
+        self.stdout.write(self.style.SUCCESS(f'Median segment-auth lookup is {speedup:.1f}x faster with indexes'))
+
+    def _analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Video._meta.db_table}')
+
+    def _measure(self, samples):
+        """Time the lookup VideoSegmentAPIView does, in milliseconds per query."""
+        timings = []
+        for user_id, title in samples:
+            started = time.perf_counter()
+            Video.objects.get(title=title, user_id=user_id)
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def _plan(self, sample):
+        user_id, title = sample
+        return Video.objects.filter(title=title, user_id=user_id).explain().splitlines()[0]
+
+    def _report(self, label, timings, plan):
+        timings = sorted(timings)
+        p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+        self.stdout.write(
+            f'{label:16} p50 {statistics.median(timings):8.3f} ms  p95 {p95:8.3f} ms  plan: {plan}'
+        )
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from videos.models import VideoMetadata
+import json
+import os
+
+class Command(BaseCommand):
+    help = 'Import per-title JSON metadata files into the VideoMetadata table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--root',
+            default=settings.VIDEO_STORAGE['METADATA_ROOT'],
+            help='Directory holding the <title>.json metadata files'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows written per query'
+        )
+
+    def handle(self, *args, **options):
+        root = options['root']
+        if not os.path.isdir(root):
+            raise CommandError(f'Metadata directory not found: {root}')
+
+        batch, imported, skipped = [], 0, 0
+        for filename in sorted(os.listdir(root)):
+            if not filename.endswith('.json'):
+                continue
+            filepath = os.path.join(root, filename)
+            try:
+                with open(filepath) as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                skipped += 1
+                self.stderr.write(f'Skipped {filepath}: {e}')
+                continue
+
+            batch.append(VideoMetadata(title=filename[:-len('.json')], data=data))
+            if len(batch) >= options['batch_size']:
+                imported += self._write(batch)
+                batch = []
+
+        if batch:
+            imported += self._write(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Imported {imported} metadata records, skipped {skipped}'))
+
+    def _write(self, batch):
+        """Insert a batch, overwriting rows for titles that were imported before."""
+        VideoMetadata.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=['title'],
+            update_fields=['data'],
+        )
+        return len(batch)
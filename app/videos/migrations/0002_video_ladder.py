@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 00:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("videos", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="video",
+            name="ladder",
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
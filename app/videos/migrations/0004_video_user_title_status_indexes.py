@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-18 00:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("videos", "0003_videometadata"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="video",
+            index=models.Index(fields=["status"], name="video_status_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="video",
+            constraint=models.UniqueConstraint(fields=("user", "title"), name="video_unique_user_title"),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.4 on 2026-10-18 01:04
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("videos", "0004_video_user_title_status_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UploadSession",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("title", models.CharField(max_length=255)),
+                ("display_title", models.CharField(max_length=255)),
+                ("filename", models.CharField(max_length=255)),
+                ("length", models.BigIntegerField()),
+                ("ranges", models.JSONField(blank=True, default=list)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("user", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ("video", models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to="videos.video")),
+            ],
+        ),
+    ]
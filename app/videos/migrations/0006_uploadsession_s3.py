@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-18 01:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("videos", "0005_uploadsession"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="uploadsession",
+            name="s3_key",
+            field=models.CharField(blank=True, max_length=1024),
+        ),
+        migrations.AddField(
+            model_name="uploadsession",
+            name="s3_upload_id",
+            field=models.CharField(blank=True, max_length=1024),
+        ),
+    ]
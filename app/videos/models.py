@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 from django.contrib.auth import get_user_model
 
@@ -24,6 +25,62 @@ class Video(models.Model):
         default=VideoStatus.UPLOADED
     )
     task_id = models.CharField(max_length=255, blank=True, null=True)
+    # Renditions planned for this upload, see videos.services.ladder.plan_ladder
+    ladder = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        constraints = [
+            # Also the index behind the (title, user) lookup done on every MPD and segment request
+            models.UniqueConstraint(fields=['user', 'title'], name='video_unique_user_title'),
+        ]
+        indexes = [
+            models.Index(fields=['status'], name='video_status_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    @property
+    def resolutions(self):
+        return [rung['name'] for rung in self.ladder]
+
+
+class VideoMetadata(models.Model):
+    """Processing metadata document for a title, see videos.services.metadata."""
+    title = models.CharField(max_length=255, unique=True)
+    data = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title
+
+
+class UploadSession(models.Model):
+    """A resumable upload, see videos.services.uploads."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    title = models.CharField(max_length=255)
+    display_title = models.CharField(max_length=255)
+    filename = models.CharField(max_length=255)
+    length = models.BigIntegerField()
+    # Received byte ranges as merged, sorted [start, end) pairs
+    ranges = models.JSONField(default=list, blank=True)
+    # Set for direct-to-bucket uploads, see videos.services.uploads.DirectUploadService
+    s3_key = models.CharField(max_length=1024, blank=True)
+    s3_upload_id = models.CharField(max_length=1024, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    video = models.OneToOneField(Video, null=True, blank=True, on_delete=models.SET_NULL)
+
+    def __str__(self):
+        return f"{self.title} ({self.id})"
+
+    @property
+    def offset(self):
+        """Bytes received contiguously from the start of the file."""
+        if self.ranges and self.ranges[0][0] == 0:
+            return self.ranges[0][1]
+        return 0
+
+    @property
+    def complete(self):
+        return self.offset >= self.length
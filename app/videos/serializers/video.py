@@ -1,7 +1,8 @@
-from rest_framework import serializers
-from ..models import Video
 import os
 from django.conf import settings
+from rest_framework import serializers
+from ..models import Video
+from ..services.metadata import get_metadata_backend
 
 class VideoUploadSerializer(serializers.Serializer):
 
@@ -9,16 +10,39 @@ class VideoUploadSerializer(serializers.Serializer):
     file = serializers.FileField()
 
     def validate_title(self, value):
-        """Validate title is unique in metadata directory."""
-        metadata_path = os.path.join(settings.MEDIA_ROOT, 'metadata', f"{value}.json")
-        if os.path.exists(metadata_path):
+        """Validate title is unique in the metadata store."""
+        if get_metadata_backend().exists(value):
+            raise serializers.ValidationError("A video with this title already exists")
+        return value
+
+class ResumableUploadSerializer(serializers.Serializer):
+
+    title = serializers.CharField(max_length=255)
+    filename = serializers.CharField(max_length=255)
+    length = serializers.IntegerField(min_value=1)
+
+    def validate_title(self, value):
+        """Validate title is unique in the metadata store."""
+        if get_metadata_backend().exists(value):
             raise serializers.ValidationError("A video with this title already exists")
         return value
 
+    def validate_filename(self, value):
+        filename = os.path.basename(value)
+        if not filename:
+            raise serializers.ValidationError("A file name is required")
+        return filename
+
+    def validate_length(self, value):
+        max_size = settings.VIDEO_SETTINGS['MAX_UPLOAD_SIZE']
+        if value > max_size:
+            raise serializers.ValidationError(f"File size must be no more than {max_size} bytes")
+        return value
+
 class VideoMetadataSerializer(serializers.ModelSerializer):
     class Meta:
         model = Video
-        fields = ('id', 'title', 'display_title', 'original_filename', 'uploaded_at', 'processed', 'mpd_file')
+        fields = ('id', 'title', 'display_title', 'original_filename', 'uploaded_at', 'processed', 'mpd_file', 'resolutions')
 
 
 
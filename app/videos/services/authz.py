@@ -0,0 +1,81 @@
+import time
+import logging
+import threading
+import redis
+from django.conf import settings
+from streambuddy_common.utils.redis_client import get_redis_client
+from ..models import Video
+
+# Grants cached in this process: key -> monotonic expiry. Shared by all views of a worker.
+_local_grants = {}
+_local_lock = threading.Lock()
+# Drop the whole local tier rather than tracking recency once it holds this many grants
+LOCAL_MAX_ENTRIES = 10000
+
+
+class VideoAuthorization:
+    """Cached answer to "may this user stream this title?".
+
+    Lookups go process memory, then Redis, then Postgres. Only grants are cached, so a
+    freshly uploaded video is never refused. Grants are revoked when a video is deleted
+    or changes owner (see videos.signals); other processes drop their in-memory copy
+    after AUTHZ_LOCAL_TTL seconds at most.
+    """
+
+    KEY_PREFIX = 'streambuddy:authz'
+
+    def __init__(self, client=None):
+        self.client = client or get_redis_client()
+        self.local_ttl = settings.VIDEO_SETTINGS['AUTHZ_LOCAL_TTL']
+        self.redis_ttl = settings.VIDEO_SETTINGS['AUTHZ_CACHE_TTL']
+
+    @classmethod
+    def key(cls, user_id, title):
+        return f"{cls.KEY_PREFIX}:{user_id}:{title}"
+
+    def is_authorized(self, user_id, title):
+        """Return True if the user owns a video with this title."""
+        key = self.key(user_id, title)
+        now = time.monotonic()
+
+        expires = _local_grants.get(key)
+        if expires and expires > now:
+            return True
+
+        try:
+            if self.client.exists(key):
+                self._grant_locally(key, now)
+                return True
+        except redis.RedisError as e:
+            logging.warning(f"Authorization cache unavailable: {str(e)}")
+
+        if not Video.objects.filter(title=title, user_id=user_id).exists():
+            return False
+
+        try:
+            self.client.set(key, 1, ex=self.redis_ttl)
+        except redis.RedisError as e:
+            logging.warning(f"Authorization cache unavailable: {str(e)}")
+        self._grant_locally(key, now)
+        return True
+
+    def invalidate(self, user_id, title):
+        """Revoke a cached grant in this process and in Redis."""
+        key = self.key(user_id, title)
+        with _local_lock:
+            _local_grants.pop(key, None)
+        try:
+            self.client.delete(key)
+        except redis.RedisError as e:
+            logging.error(f"Failed to revoke cached authorization for {title}: {str(e)}")
+
+    @staticmethod
+    def clear_local():
+        with _local_lock:
+            _local_grants.clear()
+
+    def _grant_locally(self, key, now):
+        with _local_lock:
+            if len(_local_grants) >= LOCAL_MAX_ENTRIES:
+                _local_grants.clear()
+            _local_grants[key] = now + self.local_ttl
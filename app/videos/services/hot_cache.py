@@ -0,0 +1,145 @@
+import os
+import time
+import shutil
+import logging
+import tempfile
+import threading
+from django.conf import settings
+from ..utils.video_helpers import SegmentIndex
+
+# Titles this process has recently marked as watched: title -> monotonic time
+_touched = {}
+_touched_lock = threading.Lock()
+# Mark a title as watched at most this often per process
+TOUCH_INTERVAL = 30.0
+TOUCHED_MAX_ENTRIES = 10000
+
+
+class HotSegmentCache:
+    """RAM copies of the segments every viewer of a title fetches first.
+
+    A title's init segments and first HOT_SEGMENT_COUNT media segments of each
+    representation are copied from dash_output into HOT_SEGMENT_ROOT, a tmpfs shared
+    with nginx, which serves from there before falling back to disk. Each title is one
+    directory whose mtime is bumped whenever its MPD is served; when the tier outgrows
+    HOT_SEGMENT_BUDGET bytes the least recently watched titles are dropped whole.
+    """
+
+    def __init__(self, root=None, budget=None, count=None):
+        hot_settings = settings.VIDEO_SETTINGS
+        self.root = root if root is not None else hot_settings['HOT_SEGMENT_ROOT']
+        self.budget = budget if budget is not None else hot_settings['HOT_SEGMENT_BUDGET']
+        self.count = count if count is not None else hot_settings['HOT_SEGMENT_COUNT']
+
+    @property
+    def enabled(self):
+        return bool(self.root)
+
+    def title_dir(self, title):
+        return os.path.join(self.root, title)
+
+    def path(self, title, segment):
+        """Return the hot copy of a segment, or None if it is only on disk."""
+        if not self.enabled:
+            return None
+        path = os.path.join(self.root, title, segment)
+        return path if os.path.isfile(path) else None
+
+    def startup_segments(self, output_dir, title):
+        """List the init and first media segments of every representation of a title."""
+        index = SegmentIndex.read(os.path.join(output_dir, title, SegmentIndex.FILENAME))
+        names = []
+        for representation in index['representations'].values():
+            names += list(representation['init'])
+            names += list(representation['media'])[:self.count]
+        return names
+
+    def warm(self, output_dir, title):
+        """
+        Copy a title's startup segments into the hot tier, replacing any older copy.
+        Args:
+            output_dir: The dash_output root
+            title: Video title
+        Returns:
+            int: Bytes copied
+        """
+        if not self.enabled:
+            return 0
+        os.makedirs(self.root, exist_ok=True)
+
+        # Fill a scratch directory and swap it in, so nginx never sees a half-copied title
+        staging = tempfile.mkdtemp(prefix=f".{title}-", dir=self.root)
+        try:
+            copied = 0
+            for name in self.startup_segments(output_dir, title):
+                shutil.copyfile(os.path.join(output_dir, title, name), os.path.join(staging, name))
+                copied += os.path.getsize(os.path.join(staging, name))
+            self.drop(title)
+            os.rename(staging, self.title_dir(title))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        logging.info(f"Warmed {copied} bytes of startup segments for {title}")
+        self.evict(keep=title)
+        return copied
+
+    def touch(self, title):
+        """
+        Record that a title is being watched.
+        Returns:
+            bool: False if the title has no hot copy (anymore), at most once per TOUCH_INTERVAL
+        """
+        if not self.enabled:
+            return True
+        now = time.monotonic()
+        last = _touched.get(title)
+        if last is not None and now - last < TOUCH_INTERVAL:
+            return True
+        with _touched_lock:
+            if len(_touched) >= TOUCHED_MAX_ENTRIES:
+                _touched.clear()
+            _touched[title] = now
+        try:
+            os.utime(self.title_dir(title))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def drop(self, title):
+        """Remove a title from the hot tier."""
+        if self.enabled:
+            shutil.rmtree(self.title_dir(title), ignore_errors=True)
+        with _touched_lock:
+            _touched.pop(title, None)
+
+    def evict(self, keep=None):
+        """
+        Drop the least recently watched titles until the tier fits its byte budget.
+        Args:
+            keep: Title to spare, e.g. the one just warmed
+        Returns:
+            list: Evicted titles
+        """
+        titles = []
+        total = 0
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or not entry.is_dir():
+                    continue
+                size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+                titles.append((entry.stat().st_mtime, entry.name, size))
+                total += size
+
+        evicted = []
+        for _, title, size in sorted(titles):
+            if total <= self.budget:
+                break
+            if title == keep:
+                continue
+            self.drop(title)
+            total -= size
+            evicted.append(title)
+        if evicted:
+            logging.info(f"Evicted {len(evicted)} titles from the hot segment tier")
+        return evicted
@@ -0,0 +1,122 @@
+import logging
+
+# Reference ladder, highest quality first. Heights refer to the short side of the frame
+# so portrait uploads get the same rungs as landscape ones.
+DEFAULT_LADDER = [
+    {'name': '1080p', 'height': 1080, 'bitrate': 5000, 'maxrate': 5500, 'bufsize': 10000},
+    {'name': '720p', 'height': 720, 'bitrate': 2800, 'maxrate': 3300, 'bufsize': 6000},
+    {'name': '480p', 'height': 480, 'bitrate': 1400, 'maxrate': 1750, 'bufsize': 2800},
+]
+
+# Frame rates above this get proportionally more bits per rung
+HIGH_FRAME_RATE = 30
+
+# Uploads matching these can have their top rung packaged with -c copy
+STREAM_COPY_PROFILES = ('Main', 'High')
+STREAM_COPY_MAX_KEYFRAME_INTERVAL = 4  # seconds, one DASH segment
+STREAM_COPY_MAX_BITRATE_FACTOR = 1.5  # relative to the reference rung for the source height
+
+
+def _even(value):
+    return max(2, int(round(value / 2)) * 2)
+
+
+def _rung(name, width, height, bitrate, maxrate, bufsize):
+    return {
+        'name': name,
+        'size': f"{width}x{height}",
+        'bitrate': f"{bitrate}k",
+        'maxrate': f"{maxrate}k",
+        'bufsize': f"{bufsize}k",
+    }
+
+
+def default_ladder():
+    """The reference ladder at 16:9, used when the source cannot be probed."""
+    return [
+        _rung(r['name'], _even(r['height'] * 16 / 9), r['height'], r['bitrate'], r['maxrate'], r['bufsize'])
+        for r in DEFAULT_LADDER
+    ]
+
+
+def can_stream_copy(metadata):
+    """
+    Check whether a source is already DASH-ready H.264.
+    Args:
+        metadata: dict from VideoInfo.get_video_metadata plus 'keyframe_interval'
+    Returns:
+        bool: True if the video stream can be packaged as-is for the top rung
+    """
+    short_side = min(metadata.get('width') or 0, metadata.get('height') or 0)
+    keyframe_interval = metadata.get('keyframe_interval') or 0
+    source_kbps = (metadata.get('bitrate') or 0) // 1000
+    if not short_side or not keyframe_interval or not source_kbps:
+        return False
+
+    reference = next((r for r in DEFAULT_LADDER if r['height'] <= short_side), DEFAULT_LADDER[-1])
+    return (
+        metadata.get('codec') == 'h264'
+        and metadata.get('profile') in STREAM_COPY_PROFILES
+        and metadata.get('pix_fmt') == 'yuv420p'
+        and keyframe_interval <= STREAM_COPY_MAX_KEYFRAME_INTERVAL
+        and source_kbps <= reference['bitrate'] * STREAM_COPY_MAX_BITRATE_FACTOR
+    )
+
+
+def plan_ladder(metadata, allow_stream_copy=True):
+    """
+    Pick the renditions worth encoding for a source.
+    Args:
+        metadata: dict from VideoInfo.get_video_metadata (width, height, fps, bitrate, duration)
+        allow_stream_copy: Whether a DASH-ready source may be packaged without re-encoding
+    Returns:
+        list: Rungs (name, size, bitrate, maxrate, bufsize) highest quality first. Rungs
+        above the source resolution are dropped, the aspect ratio is kept and bitrates
+        never exceed the source bitrate. When the source can be stream-copied the top
+        rung is the source itself, marked with 'copy'.
+    """
+    width = metadata.get('width') or 0
+    height = metadata.get('height') or 0
+    if not width or not height:
+        logging.warning("Source resolution unknown, using the default ladder")
+        return default_ladder()
+
+    short_side = min(width, height)
+    portrait = height > width
+    fps = metadata.get('fps') or 0
+    source_kbps = (metadata.get('bitrate') or 0) // 1000
+
+    rungs = [r for r in DEFAULT_LADDER if r['height'] <= short_side]
+    if not rungs:
+        # Source is smaller than the lowest rung, keep it at its own resolution
+        smallest = DEFAULT_LADDER[-1]
+        rungs = [{**smallest, 'name': f"{_even(short_side)}p", 'height': short_side}]
+
+    ladder = []
+    if allow_stream_copy and can_stream_copy(metadata):
+        reference = rungs[0]
+        name = reference['name'] if reference['height'] == short_side else f"{short_side}p"
+        ladder.append({
+            **_rung(name, width, height, source_kbps,
+                    int(source_kbps * reference['maxrate'] / reference['bitrate']),
+                    int(source_kbps * reference['bufsize'] / reference['bitrate'])),
+            'copy': True,
+        })
+        # Only the rungs strictly below the source still need transcoding
+        rungs = [r for r in rungs if r['height'] < short_side]
+
+    for r in rungs:
+        scale = r['height'] / short_side
+        rung_short, rung_long = _even(short_side * scale), _even(max(width, height) * scale)
+        rung_width, rung_height = (rung_short, rung_long) if portrait else (rung_long, rung_short)
+
+        factor = fps / HIGH_FRAME_RATE if fps > HIGH_FRAME_RATE else 1
+        bitrate = int(r['bitrate'] * factor)
+        if source_kbps:
+            bitrate = min(bitrate, source_kbps)
+        maxrate = int(bitrate * r['maxrate'] / r['bitrate'])
+        bufsize = int(bitrate * r['bufsize'] / r['bitrate'])
+
+        ladder.append(_rung(r['name'], rung_width, rung_height, bitrate, maxrate, bufsize))
+
+    return ladder
@@ -0,0 +1,161 @@
+import os
+import re
+import time
+import threading
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+from ..utils.video_helpers import SegmentIndex
+
+DASH_NAMESPACE = 'urn:mpeg:dash:schema:mpd:2011'
+ET.register_namespace('', DASH_NAMESPACE)
+
+# Cached entries are trusted this long before one stat checks their mtime again
+REVALIDATE_INTERVAL = 2.0
+# Start over rather than track recency once this many paths are cached
+MAX_PATHS = 50000
+_BASE_URL_MARKER = 'streambuddy-base-url-placeholder'
+# Positions in an HLS playlist where a relative URI starts: URI lines and URI="..." attributes
+_PLAYLIST_URI = re.compile(rb'(?m)^(?=[^#\s])|(?<=URI=")')
+
+
+class ManifestCache:
+    """Resolved DASH file paths and MPD templates, shared by all requests in a process.
+
+    Paths are looked up in the title's subdirectory, then in the output root, and kept
+    until their file disappears or changes. MPDs are parsed once per mtime into bytes
+    split around the BaseURL, so any BaseURL (plain or signed per user) is a concatenation
+    and the file on disk is never rewritten. Segment indexes are loaded once per mtime.
+
+    While a title is still being packaged, ffmpeg rewrites a dynamic MPD after every
+    segment it completes; such titles are indexed from the segments that MPD lists.
+
+    HLS playlists of CMAF output are cached the same way, split before every URI.
+    """
+
+    def __init__(self, revalidate_interval=REVALIDATE_INTERVAL):
+        self.revalidate_interval = revalidate_interval
+        self._paths = {}  # (output_dir, title, name) -> [path, mtime_ns, checked_at]
+        self._templates = {}  # MPD path -> (mtime_ns, head, tail, dynamic), playlist path -> (mtime_ns, parts)
+        self._indexes = {}  # index or dynamic MPD path -> (mtime_ns, {segment name: size})
+        self._lock = threading.Lock()
+
+    def resolve(self, output_dir, title, name):
+        """
+        Find a file of a title's DASH output.
+        Args:
+            output_dir: The dash_output root
+            title: Video title
+            name: MPD or segment file name
+        Returns:
+            tuple: (path, mtime_ns), or (None, None) if the file does not exist
+        """
+        key = (output_dir, title, name)
+        now = time.monotonic()
+        entry = self._paths.get(key)
+        if entry and now - entry[2] < self.revalidate_interval:
+            return entry[0], entry[1]
+
+        candidates = [entry[0]] if entry else []
+        candidates += [os.path.join(output_dir, title, name), os.path.join(output_dir, name)]
+        for path in candidates:
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            with self._lock:
+                if len(self._paths) >= MAX_PATHS:
+                    self._paths.clear()
+                self._paths[key] = [path, mtime, now]
+            return path, mtime
+
+        # Missing files are not remembered, they may be written any moment
+        with self._lock:
+            self._paths.pop(key, None)
+        return None, None
+
+    def manifest(self, output_dir, title, base_url):
+        """Return the title's MPD as bytes with the given BaseURL, or None if there is none."""
+        template = self._template(output_dir, title)
+        if template is None:
+            return None
+
+        _, head, tail, _ = template
+        return head + escape(base_url).encode('utf-8') + tail
+
+    def playlist(self, output_dir, title, name, base_url):
+        """Return one of the title's HLS playlists as bytes with every URI prefixed by base_url, or None."""
+        path, mtime = self.resolve(output_dir, title, name)
+        if path is None:
+            return None
+
+        template = self._templates.get(path)
+        if template is None or template[0] != mtime:
+            with open(path, 'rb') as f:
+                template = (mtime, _PLAYLIST_URI.split(f.read()))
+            with self._lock:
+                self._templates[path] = template
+        return base_url.encode('utf-8').join(template[1])
+
+    def is_dynamic(self, output_dir, title):
+        """Whether the title's MPD is still being written by a running packager."""
+        template = self._template(output_dir, title)
+        return template is not None and template[3]
+
+    def segment_index(self, output_dir, title):
+        """Return the title's {segment name: size} index, or None for output packaged without one."""
+        path, mtime = self.resolve(output_dir, title, SegmentIndex.FILENAME)
+        if path is None or os.path.dirname(path) != os.path.join(output_dir, title):
+            return self._dynamic_index(output_dir, title)
+
+        index = self._indexes.get(path)
+        if index is None or index[0] != mtime:
+            index = (mtime, SegmentIndex.load(path))
+            with self._lock:
+                self._indexes[path] = index
+        return index[1]
+
+    def _template(self, output_dir, title):
+        path, mtime = self.resolve(output_dir, title, f"{title}.mpd")
+        if path is None:
+            return None
+
+        template = self._templates.get(path)
+        if template is None or template[0] != mtime:
+            template = (mtime,) + self._render_template(path)
+            with self._lock:
+                self._templates[path] = template
+        return template
+
+    def _dynamic_index(self, output_dir, title):
+        # Only the segments an in-progress MPD lists are complete, anything else may still be written
+        if not self.is_dynamic(output_dir, title):
+            return None
+        path, mtime = self.resolve(output_dir, title, f"{title}.mpd")
+
+        index = self._indexes.get(path)
+        if index is None or index[0] != mtime:
+            try:
+                index = (mtime, SegmentIndex.flatten(SegmentIndex.build(path)))
+            except (ValueError, OSError, ET.ParseError):
+                # Replaced mid-read by a newer MPD, the next request picks that one up
+                return {}
+            with self._lock:
+                self._indexes[path] = index
+        return index[1]
+
+    def _render_template(self, path):
+        root = ET.parse(path).getroot()
+        # Drop BaseURLs written into the file by older versions
+        for existing in root.findall('{*}BaseURL'):
+            root.remove(existing)
+        base_url = ET.Element(f"{{{DASH_NAMESPACE}}}BaseURL")
+        base_url.text = _BASE_URL_MARKER
+        root.insert(0, base_url)
+
+        head, tail = ET.tostring(root, encoding='utf-8', xml_declaration=True).split(
+            _BASE_URL_MARKER.encode('utf-8')
+        )
+        return head, tail, root.get('type') == 'dynamic'
+
+
+manifest_cache = ManifestCache()
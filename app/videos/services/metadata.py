@@ -0,0 +1,125 @@
+import os
+import json
+import logging
+from django.conf import settings
+from django.db import DatabaseError
+from streambuddy_common.exceptions import StorageError
+
+
+class JSONFileMetadataBackend:
+    """One JSON document per title under the metadata root."""
+
+    def __init__(self, root=None):
+        self.root = root or settings.VIDEO_STORAGE['METADATA_ROOT']
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, title):
+        return os.path.join(self.root, f"{title}.json")
+
+    def get(self, title):
+        metadata_path = self._path(title)
+
+        if not os.path.exists(metadata_path):
+            logging.info(f"No metadata file found at {metadata_path}")
+            return None
+
+        try:
+            with open(metadata_path, 'r') as f:
+                return json.load(f)
+        except json.JSONDecodeError as e:
+            logging.error(f"Corrupted metadata file for {title}: {str(e)}")
+            raise StorageError(f"Corrupted metadata file: {str(e)}")
+        except Exception as e:
+            logging.error(f"Error reading metadata for {title}: {str(e)}")
+            raise StorageError(f"Error reading metadata: {str(e)}")
+
+    def save(self, title, metadata):
+        try:
+            with open(self._path(title), 'w') as f:
+                json.dump(metadata, f)
+        except Exception as e:
+            logging.error(f"Failed to save metadata for {title}: {str(e)}")
+            raise StorageError(f"Failed to save metadata: {str(e)}")
+
+    def list(self):
+        try:
+            videos = []
+            for filename in os.listdir(self.root):
+                if filename.endswith('.json'):
+                    with open(os.path.join(self.root, filename)) as f:
+                        video_data = json.load(f)
+                        if video_data.get('title'):  # Only add if title exists
+                            videos.append(video_data)
+            return videos
+        except Exception as e:
+            raise StorageError(f"Failed to list videos: {str(e)}")
+
+    def delete(self, title):
+        metadata_path = self._path(title)
+        if os.path.exists(metadata_path):
+            os.remove(metadata_path)
+
+    def exists(self, title):
+        return os.path.exists(self._path(title))
+
+
+class DatabaseMetadataBackend:
+    """Metadata rows in the VideoMetadata table, looked up through the unique title index."""
+
+    def __init__(self, root=None):
+        # Imported here so the backend module can load before the app registry is ready
+        from ..models import VideoMetadata
+        self.model = VideoMetadata
+
+    def get(self, title):
+        try:
+            record = self.model.objects.filter(title=title).only('data').first()
+        except DatabaseError as e:
+            logging.error(f"Error reading metadata for {title}: {str(e)}")
+            raise StorageError(f"Error reading metadata: {str(e)}")
+        return record.data if record else None
+
+    def save(self, title, metadata):
+        try:
+            self.model.objects.update_or_create(title=title, defaults={'data': metadata})
+        except DatabaseError as e:
+            logging.error(f"Failed to save metadata for {title}: {str(e)}")
+            raise StorageError(f"Failed to save metadata: {str(e)}")
+
+    def list(self):
+        try:
+            return list(
+                self.model.objects.filter(data__has_key='title')
+                .order_by('title')
+                .values_list('data', flat=True)
+            )
+        except DatabaseError as e:
+            raise StorageError(f"Failed to list videos: {str(e)}")
+
+    def delete(self, title):
+        self.model.objects.filter(title=title).delete()
+
+    def exists(self, title):
+        return self.model.objects.filter(title=title).exists()
+
+
+METADATA_BACKENDS = {
+    'json': JSONFileMetadataBackend,
+    'database': DatabaseMetadataBackend,
+}
+
+
+def get_metadata_backend(root=None):
+    """
+    Build the metadata backend selected by VIDEO_STORAGE['METADATA_BACKEND'].
+    Args:
+        root: Directory for the JSON file backend, defaults to VIDEO_STORAGE['METADATA_ROOT']
+    Returns:
+        JSONFileMetadataBackend or DatabaseMetadataBackend
+    """
+    name = settings.VIDEO_STORAGE.get('METADATA_BACKEND', 'json')
+    try:
+        backend_class = METADATA_BACKENDS[name]
+    except KeyError:
+        raise StorageError(f"Unknown metadata backend: {name}")
+    return backend_class(root)
@@ -0,0 +1,90 @@
+import json
+import logging
+import time
+import redis
+from django.conf import settings
+from streambuddy_common.utils.redis_client import get_redis_client
+
+
+class ProgressChannel:
+    """Processing progress snapshots kept in Redis, keyed by (user, title).
+
+    Workers publish, the progress endpoint reads. Keys carry the owner's id so a
+    read is also the ownership check and needs no database query.
+    """
+
+    KEY_PREFIX = 'streambuddy:progress'
+
+    def __init__(self, client=None):
+        self.client = client or get_redis_client()
+        self.ttl = settings.VIDEO_SETTINGS['PROGRESS_TTL']
+
+    @classmethod
+    def key(cls, user_id, title):
+        return f"{cls.KEY_PREFIX}:{user_id}:{title}"
+
+    def get(self, user_id, title):
+        """Return the latest snapshot for a video, or None if nothing was published."""
+        try:
+            raw = self.client.get(self.key(user_id, title))
+        except redis.RedisError as e:
+            logging.warning(f"Could not read progress for {title}: {str(e)}")
+            return None
+        return json.loads(raw) if raw else None
+
+    def start(self, user_id, title, status):
+        """Publish the first snapshot of a processing run and reset its subtask counter."""
+        try:
+            self.client.delete(f"{self.key(user_id, title)}:parts")
+        except redis.RedisError as e:
+            logging.warning(f"Could not reset progress for {title}: {str(e)}")
+        return self.publish(user_id, title, status, started_at=time.time())
+
+    def publish(self, user_id, title, status, progress=0, current_resolution=None,
+                resolution_progress=None, estimated_time_remaining=None, started_at=None):
+        """Store a snapshot and notify subscribers. Failures are logged, never raised."""
+        snapshot = {
+            'status': status,
+            'progress': round(progress, 2),
+            'current_resolution': current_resolution,
+            'resolution_progress': resolution_progress,
+            'estimated_time_remaining': round(estimated_time_remaining) if estimated_time_remaining is not None else None,
+            'started_at': started_at,
+            'updated_at': time.time(),
+        }
+        key = self.key(user_id, title)
+        payload = json.dumps(snapshot)
+        try:
+            pipe = self.client.pipeline()
+            pipe.set(key, payload, ex=self.ttl)
+            pipe.publish(key, payload)
+            pipe.execute()
+        except redis.RedisError as e:
+            logging.warning(f"Could not publish progress for {title}: {str(e)}")
+        return snapshot
+
+    def complete_part(self, user_id, title, status, total, label=None):
+        """Record one finished subtask of a chord and publish the overall progress."""
+        started_at = (self.get(user_id, title) or {}).get('started_at')
+        try:
+            parts_key = f"{self.key(user_id, title)}:parts"
+            pipe = self.client.pipeline()
+            pipe.incr(parts_key)
+            pipe.expire(parts_key, self.ttl)
+            done = pipe.execute()[0]
+        except redis.RedisError as e:
+            logging.warning(f"Could not count finished parts for {title}: {str(e)}")
+            return None
+
+        remaining = None
+        if started_at:
+            elapsed = time.time() - started_at
+            remaining = elapsed * (total - done) / done
+        return self.publish(
+            user_id, title, status,
+            progress=100 * done / total,
+            current_resolution=label,
+            resolution_progress=f"{done}/{total}",
+            estimated_time_remaining=remaining,
+            started_at=started_at,
+        )
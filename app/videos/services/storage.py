@@ -1,14 +1,33 @@
 import os
-import json
+import glob
+import errno
+import shutil
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from django.conf import settings
 from streambuddy_common.exceptions import StorageError, VideoNotFoundError
+from .metadata import get_metadata_backend
+from ..utils.video_helpers import SegmentIndex
 import logging
 
+DASH_CONTENT_TYPES = {
+    '.mpd': 'application/dash+xml',
+    '.m4s': 'video/iso.segment',
+    '.mp4': 'video/mp4',
+    '.json': 'application/json',
+    '.m3u8': 'application/vnd.apple.mpegurl',
+}
+
+
 class StorageService:
     """Service class for handling both local and S3 storage operations."""
-    
+
+    # Most keys one DeleteObjects request accepts
+    DELETE_BATCH_SIZE = 1000
+
     def __init__(self):
         # Initialize local storage paths
         self.metadata_root = os.path.join(settings.MEDIA_ROOT, 'metadata')
@@ -18,6 +37,7 @@ class StorageService:
         # Create necessary directories
         for directory in [self.metadata_root, self.mpd_root, self.temp_upload_root]:
             os.makedirs(directory, exist_ok=True)
+        self.metadata = get_metadata_backend(self.metadata_root)
         
         # Initialize S3 client if configured
         self.use_s3 = getattr(settings, 'USE_S3', False)
@@ -26,7 +46,13 @@ class StorageService:
                 's3',
                 aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
                 aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=settings.AWS_S3_REGION_NAME
+                region_name=settings.AWS_S3_REGION_NAME,
+                endpoint_url=getattr(settings, 'AWS_S3_ENDPOINT_URL', None),
+                # One client is shared by every publishing thread, so pool a connection for each
+                config=Config(
+                    signature_version='s3v4',
+                    max_pool_connections=settings.VIDEO_STORAGE['S3_PUBLISH_CONCURRENCY']
+                )
             )
             self.bucket_name = settings.AWS_STORAGE_BUCKET_NAME
 
@@ -47,37 +73,13 @@ class StorageService:
 
 
     def get_metadata(self, title):
-        """Retrieve video metadata from local storage."""
-        metadata_path = os.path.join(self.metadata_root, f"{title}.json")
-        
-        if not os.path.exists(metadata_path):
-            logging.info(f"No metadata file found at {metadata_path}")
-            return None
-            
-        try:
-            with open(metadata_path, 'r') as f:
-                return json.load(f)
-        except json.JSONDecodeError as e:
-            logging.error(f"Corrupted metadata file for {title}: {str(e)}")
-            raise StorageError(f"Corrupted metadata file: {str(e)}")
-        except Exception as e:
-            logging.error(f"Error reading metadata for {title}: {str(e)}")
-            raise StorageError(f"Error reading metadata: {str(e)}")
-
+        """Retrieve video metadata from the configured metadata backend."""
+        return self.metadata.get(title)
 
     def save_metadata(self, title, metadata):
-        """Save video metadata to local storage."""
-        try:
-            metadata_path = os.path.join(self.metadata_root, f"{title}.json")
-            logging.info(f"Saving metadata to {metadata_path}")
-            
-            with open(metadata_path, 'w') as f:
-                json.dump(metadata, f)
-            
-            logging.info(f"Successfully saved metadata for {title}")
-        except Exception as e:
-            logging.error(f"Failed to save metadata for {title}: {str(e)}")
-            raise StorageError(f"Failed to save metadata: {str(e)}")
+        """Save video metadata to the configured metadata backend."""
+        logging.info(f"Saving metadata for {title}")
+        self.metadata.save(title, metadata)
 
     def save_mpd(self, title, mpd_file):
         """Save MPD file to local storage."""
@@ -103,9 +105,22 @@ class StorageService:
         return segment_path
 
     def save_temp_upload(self, file, title):
-        """Save uploaded file to temporary location."""
+        """Save uploaded file to temporary location.
+
+        Files already on disk (see videos.upload_handlers) are renamed into place, which
+        is free on the same filesystem; anything else is copied chunk by chunk.
+        """
         try:
             file_path = os.path.join(self.temp_upload_root, f"{title}_{file.name}")
+            if hasattr(file, 'temporary_file_path'):
+                try:
+                    os.replace(file.temporary_file_path(), file_path)
+                    return file_path
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+                    logging.warning(f"Upload for {title} is on another filesystem, copying it")
+
             with open(file_path, 'wb+') as destination:
                 for chunk in file.chunks():
                     destination.write(chunk)
@@ -113,6 +128,28 @@ class StorageService:
         except Exception as e:
             raise StorageError(f"Failed to save temporary file: {str(e)}")
 
+    def fetch_source(self, source):
+        """
+        Make an upload available as a local file for ffmpeg.
+        Args:
+            source: Local path, or s3://bucket/key of a direct upload
+        Returns:
+            str: Local path of the source
+        """
+        if not source.startswith('s3://'):
+            return source
+
+        bucket, key = source[len('s3://'):].split('/', 1)
+        file_path = os.path.join(self.temp_upload_root, key.replace('/', '_'))
+        try:
+            # Ranged GETs in parallel. The staged object stays until processing succeeds,
+            # so a failed or redelivered task can fetch it again
+            self.s3_client.download_file(bucket, key, file_path)
+            logging.info(f"Fetched {source} to {file_path}")
+            return file_path
+        except Exception as e:
+            raise StorageError(f"Failed to fetch upload {source}: {str(e)}")
+
     def cleanup_temp_file(self, file_path):
         """Remove temporary upload file."""
         try:
@@ -121,38 +158,130 @@ class StorageService:
         except Exception as e:
             raise StorageError(f"Failed to cleanup temporary file: {str(e)}")
 
-    def list_videos(self):
-        """List all available videos."""
+    def cleanup_source(self, source, file_path):
+        """
+        Remove a successfully processed upload.
+        Args:
+            source: The path or s3:// URI the processing task was given
+            file_path: Local path fetch_source returned for it
+        """
+        self.cleanup_temp_file(file_path)
+        if not source.startswith('s3://'):
+            return
+        bucket, key = source[len('s3://'):].split('/', 1)
         try:
-            videos = []
-            for filename in os.listdir(self.metadata_root):
-                if filename.endswith('.json'):
-                    with open(os.path.join(self.metadata_root, filename)) as f:
-                        video_data = json.load(f)
-                        if video_data.get('title'):  # Only add if title exists
-                            videos.append(video_data)
-            return videos
+            self.s3_client.delete_object(Bucket=bucket, Key=key)
         except Exception as e:
-            raise StorageError(f"Failed to list videos: {str(e)}")
+            raise StorageError(f"Failed to delete upload {source}: {str(e)}")
+
+    def dash_key(self, title, name):
+        """Bucket key of a file of a title's DASH output."""
+        return f"{settings.VIDEO_STORAGE['S3_DASH_PREFIX']}/{title}/{name}"
+
+    def publish_dash(self, title):
+        """
+        Upload a title's packaged DASH output to the bucket.
+
+        Segments are uploaded concurrently on a bounded pool of threads sharing this
+        service's client; the segment index and MPD go last, so the bucket never holds
+        a manifest that references segments it does not have.
+        Args:
+            title: Video title
+        Returns:
+            int: Number of files published
+        """
+        output_dir = os.path.join(self.mpd_root, title)
+        segments = list(SegmentIndex.load(os.path.join(output_dir, SegmentIndex.FILENAME)))
+        # Segments are small; upload each one in a single request and parallelize across files
+        transfer_config = TransferConfig(use_threads=False)
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=settings.VIDEO_STORAGE['S3_PUBLISH_CONCURRENCY']) as pool:
+            futures = {
+                pool.submit(self._publish_file, output_dir, title, name, transfer_config): name
+                for name in segments
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    logging.error(f"Failed to publish {futures[future]} for {title}: {str(e)}")
+                    failed.append(futures[future])
+        if failed:
+            raise StorageError(f"Failed to publish {len(failed)} of {len(segments)} segments for {title}")
+
+        # CMAF output also has HLS playlists: media playlists before the master that lists them
+        manifests = [SegmentIndex.FILENAME]
+        manifests += sorted(
+            name for name in os.listdir(output_dir)
+            if name.endswith('.m3u8') and name != f"{title}.m3u8"
+        )
+        if os.path.exists(os.path.join(output_dir, f"{title}.m3u8")):
+            manifests.append(f"{title}.m3u8")
+        manifests.append(f"{title}.mpd")
+        try:
+            for name in manifests:
+                self._publish_file(output_dir, title, name, transfer_config)
+        except Exception as e:
+            raise StorageError(f"Failed to publish manifest for {title}: {str(e)}")
+
+        logging.info(f"Published {len(segments) + len(manifests)} files for {title}")
+        return len(segments) + len(manifests)
+
+    def delete_dash(self, title):
+        """
+        Delete a title's published DASH output from the bucket, one DeleteObjects call per page of keys.
+        Returns:
+            int: Number of objects deleted
+        """
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        pages = paginator.paginate(
+            Bucket=self.bucket_name,
+            Prefix=self.dash_key(title, ''),
+            PaginationConfig={'PageSize': self.DELETE_BATCH_SIZE}
+        )
+        deleted = 0
+        for page in pages:
+            objects = [{'Key': obj['Key']} for obj in page.get('Contents', [])]
+            if not objects:
+                continue
+            response = self.s3_client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={'Objects': objects, 'Quiet': True}
+            )
+            if response.get('Errors'):
+                raise StorageError(f"Failed to delete {len(response['Errors'])} objects for {title}")
+            deleted += len(objects)
+        return deleted
+
+    def _publish_file(self, output_dir, title, name, transfer_config):
+        self.s3_client.upload_file(
+            os.path.join(output_dir, name),
+            self.bucket_name,
+            self.dash_key(title, name),
+            ExtraArgs={'ContentType': DASH_CONTENT_TYPES.get(os.path.splitext(name)[1], 'application/octet-stream')},
+            Config=transfer_config
+        )
+
+    def list_videos(self):
+        """List all available videos."""
+        return self.metadata.list()
 
     def delete_video(self, title):
         """Delete video and all associated files."""
         try:
             # Delete metadata
-            metadata_path = os.path.join(self.metadata_root, f"{title}.json")
-            if os.path.exists(metadata_path):
-                os.remove(metadata_path)
+            self.metadata.delete(title)
+
+            # Delete MPD, segments, index and playlists
+            shutil.rmtree(os.path.join(self.mpd_root, title), ignore_errors=True)
 
-            # Delete MPD and segments
+            # Output written before titles had their own directory
             mpd_path = os.path.join(self.mpd_root, f"{title}.mpd")
             if os.path.exists(mpd_path):
                 os.remove(mpd_path)
-                
-            # Delete segments (they typically follow a pattern)
-            segment_pattern = f"{title}_*.m4s"
-            for segment in os.listdir(self.mpd_root):
-                if segment.startswith(title):
-                    os.remove(os.path.join(self.mpd_root, segment))
+            for segment in glob.glob(os.path.join(self.mpd_root, f"{glob.escape(title)}_*.m4s")):
+                os.remove(segment)
 
             # Delete from S3 if using it
             if self.use_s3:
@@ -160,23 +289,11 @@ class StorageService:
                     Bucket=self.bucket_name,
                     Key=f"videos/{title}"
                 )
+                self.delete_dash(title)
                 
         except Exception as e:
             raise StorageError(f"Failed to delete video: {str(e)}")
 
-    def save_metadata(self, title, metadata):
-        """Save video metadata to local storage."""
-        try:
-            # Ensure metadata directory exists
-            os.makedirs(self.metadata_root, exist_ok=True)
-            
-            metadata_path = os.path.join(self.metadata_root, f"{title}.json")
-            with open(metadata_path, 'w') as f:
-                json.dump(metadata, f)
-        except Exception as e:
-            raise StorageError(f"Failed to save metadata: {str(e)}")
-
     def check_title_exists(self, title):
         """Check if a video with this title already exists."""
-        metadata_path = os.path.join(self.metadata_root, f"{title}.json")
-        return os.path.exists(metadata_path)
+        return self.metadata.exists(title)
@@ -1,106 +1,238 @@
 from django.conf import settings
-from django.http import Http404
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse, FileResponse
 from rest_framework.response import Response
+from celery import current_app
 import os
+import re
 import logging
+from .signing import StreamURLSigner
+from .manifest_cache import manifest_cache
+from .hot_cache import HotSegmentCache
+
+# Access log for the streaming hot path, sampled through settings.LOGGING. Keep calls lazy
+# (%-style arguments) so records dropped by the sampler are never formatted.
+logger = logging.getLogger(__name__)
+
+# Sent by name: tasks import the services, so services must not import tasks
+WARM_HOT_SEGMENTS_TASK = 'videos.tasks.warm_hot_segments_task'
+# A single byte range, the only kind DASH players request
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Media playlists a master playlist may list, see HlsPlaylist.MEDIA_PLAYLIST
+MEDIA_PLAYLIST_PATTERN = re.compile(r'^media_[\w-]+\.m3u8$')
+# Segment names the packager writes, the only ones looked for while still being written
+SEGMENT_PATTERN = re.compile(r'^(init-[\w-]+|chunk-[\w-]+-\d+)\.m4s$')
+# Suffix ffmpeg writes a segment under until it is complete and renamed into place
+PARTIAL_SUFFIX = '.tmp'
 
 class StreamingService:
     def __init__(self, output_dir=None):
         self.output_dir = os.path.join(settings.MEDIA_ROOT, 'dash_output')
         os.makedirs(self.output_dir, exist_ok=True)
+        self.signer = StreamURLSigner()
+        self.hot_cache = HotSegmentCache()
 
     def serve_mpd(self, title):
         """Serve MPD file."""
-        try:
-            output_dir = self._get_output_dir()
-            # Check both in root directory and title subdirectory
-            file_path = os.path.join(output_dir, f"{title}.mpd")
-            if not os.path.exists(file_path):
-                # Try in subdirectory
-                file_path = os.path.join(output_dir, title, f"{title}.mpd")
-                if not os.path.exists(file_path):
-                    raise FileNotFoundError()
-
-            logging.info(f"Serving MPD file from: {file_path}")
-            response = Response(content_type='application/dash+xml')
-            response['X-Accel-Redirect'] = os.path.join(settings.PROTECTED_MEDIA_URL, 'dash_output', f"{title}.mpd")
-            response['Access-Control-Allow-Origin'] = '*'
-            return response
-        except FileNotFoundError:
-            logging.error(f"MPD file not found at: {file_path}")
-            raise Http404("MPD File Not Found")
-        except Exception as e:
-            logging.error(f"Error serving MPD file: {str(e)}")
-            raise
+        return self._manifest_response(title, f"/api/videos/{title}/segments/")
+
+    def serve_signed_mpd(self, title, user_id):
+        """Serve the MPD with a BaseURL signed for this user, so segments bypass the app."""
+        response = self._manifest_response(title, self.signer.sign(user_id, title))
+        # The body embeds a per-user token, keep it out of shared caches
+        response['Cache-Control'] = 'private, no-store'
+        return response
+
+    def serve_playlist(self, title, playlist=None):
+        """Serve the HLS master playlist of CMAF output, or one of its media playlists."""
+        return self._playlist_response(title, playlist, f"/api/videos/{title}/segments/")
+
+    def serve_signed_playlist(self, title, user_id, playlist=None):
+        """Serve an HLS playlist whose segment URIs are signed for this user."""
+        response = self._playlist_response(title, playlist, self.signer.sign(user_id, title))
+        response['Cache-Control'] = 'private, no-store'
+        return response
+
+    def serve_signed_segment(self, user_id, expires, token, title, segment, range_header=None):
+        """
+        Validate a signed segment URL and serve the file, or the byte range requested of it.
+        Used where nginx does not check secure_link itself, e.g. the development server.
+        """
+        if not self.signer.verify(user_id, title, expires, token):
+            logger.warning("signed_segment_denied user=%s title=%s segment=%s", user_id, title, segment)
+            raise PermissionDenied("Invalid or expired segment URL")
+
+        file_path = self._segment_path(title, segment)
+        if file_path is None:
+            logger.warning("segment_not_found title=%s segment=%s", title, segment)
+            raise Http404(f"Segment not found: {segment}")
+
+        logger.info("signed_segment_served user=%s title=%s segment=%s", user_id, title, segment)
+        response = self._file_response(file_path, range_header)
+        response['Access-Control-Allow-Origin'] = '*'
+        return response
 
     def serve_segment(self, title, segment):
         """Serve video segment."""
         try:
-            output_dir = self._get_output_dir()
-            # Check both in root directory and title subdirectory
-            file_path = os.path.join(output_dir, segment)
-            if not os.path.exists(file_path):
-                # Try in subdirectory
-                file_path = os.path.join(output_dir, title, segment)
-                if not os.path.exists(file_path):
-                    raise FileNotFoundError()
-
-            logging.info(f"Attempting to serve segment from: {file_path}")
-            
-            if not os.path.exists(file_path):
-                logging.error(f"Segment file not found at: {file_path}")
+            file_path = self._segment_path(title, segment)
+            if file_path is None:
+                logger.warning("segment_not_found title=%s segment=%s", title, segment)
                 raise Http404(f"Segment not found: {segment}")
 
-            
-            if not self._is_valid_segment(title, segment):
-                raise Http404("Invalid segment requested")
-            
+            logger.info("segment_served title=%s segment=%s", title, segment)
             content_type = 'video/mp4' if segment.endswith('.mp4') or segment.endswith('.m4s') else 'application/octet-stream'
-            
+
             response = Response(content_type=content_type)
-            response['X-Accel-Redirect'] = os.path.join(settings.PROTECTED_MEDIA_URL, 'dash_output', segment)
+            response['X-Accel-Redirect'] = self._protected_url(file_path)
             response['Access-Control-Allow-Origin'] = '*'
             response['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
             response['Access-Control-Allow-Headers'] = 'Content-Type'
 
             return response
-        except FileNotFoundError:
-            raise Http404(f"Segment not found: {segment}")
-        except Exception as e:
-            logging.error(f"Error serving segment {segment}: {str(e)}")
+        except Http404:
+            raise
+        except Exception:
+            logger.exception("segment_error title=%s segment=%s", title, segment)
             raise Http404("Error serving segment")
 
-    def _is_valid_segment(self, title, segment):
-        """Validate that the segment belongs to the specified video."""
+    def completed_segment_response(self, title, segment):
+        """Hand a finished segment to nginx with X-Accel-Redirect, for views outside DRF."""
+        file_path = self._segment_path(title, segment)
+        if file_path is None:
+            logger.warning("segment_not_found title=%s segment=%s", title, segment)
+            raise Http404(f"Segment not found: {segment}")
+
+        response = HttpResponse(content_type='video/mp4')
+        response['X-Accel-Redirect'] = self._protected_url(file_path)
+        response['Access-Control-Allow-Origin'] = '*'
+        return response
+
+    def partial_segment_path(self, title, segment):
+        """
+        Find a segment the packager is still writing, for low-latency playback of a title being encoded.
+        Args:
+            title: Video title
+            segment: Requested segment file name
+        Returns:
+            str or None: Path of the growing file, None unless the segment is being written right now
+        """
+        if not settings.VIDEO_SETTINGS['LOW_LATENCY'] or not SEGMENT_PATTERN.match(segment):
+            return None
+        output_dir = self._get_output_dir()
+        if not manifest_cache.is_dynamic(output_dir, title):
+            return None
+        path = os.path.join(output_dir, title, segment + PARTIAL_SUFFIX)
+        return path if os.path.exists(path) else None
+
+    def _manifest_response(self, title, base_url):
+        output_dir = self._get_output_dir()
         try:
+            content = manifest_cache.manifest(output_dir, title, base_url)
+            dynamic = content is not None and manifest_cache.is_dynamic(output_dir, title)
+        except Exception:
+            logger.exception("mpd_error title=%s", title)
+            raise
+        if content is None or (dynamic and not settings.VIDEO_SETTINGS['PROGRESSIVE_PLAYBACK']):
+            logger.warning("mpd_not_found title=%s", title)
+            raise Http404("MPD File Not Found")
+
+        if not dynamic and not self.hot_cache.touch(title):
+            self._warm(title)
+
+        logger.info("mpd_served title=%s dynamic=%s", title, dynamic)
+        response = HttpResponse(content, content_type='application/dash+xml')
+        response['Access-Control-Allow-Origin'] = '*'
+        if dynamic:
+            # Still encoding: players poll it every minimumUpdatePeriod until it turns static
+            response['Cache-Control'] = 'no-cache'
+        return response
+
+    def _playlist_response(self, title, playlist, segment_base_url):
+        # The master lists media playlists served by this same endpoint, which list the segments
+        if playlist is None:
+            name, base_url = f"{title}.m3u8", f"/api/videos/{title}/m3u8/"
+        elif MEDIA_PLAYLIST_PATTERN.match(playlist):
+            name, base_url = playlist, segment_base_url
+        else:
+            name = None
+
+        try:
+            content = manifest_cache.playlist(self._get_output_dir(), title, name, base_url) if name else None
+        except Exception:
+            logger.exception("playlist_error title=%s playlist=%s", title, playlist)
+            raise
+        if content is None:
+            logger.warning("playlist_not_found title=%s playlist=%s", title, playlist)
+            raise Http404("Playlist Not Found")
+
+        if playlist is None and not self.hot_cache.touch(title):
+            self._warm(title)
+
+        logger.info("playlist_served title=%s playlist=%s", title, playlist)
+        response = HttpResponse(content, content_type='application/vnd.apple.mpegurl')
+        response['Access-Control-Allow-Origin'] = '*'
+        return response
+
+    def _file_response(self, file_path, range_header=None):
+        """Serve a whole file, or one 'bytes=' range of it as nginx would for single-file representations."""
+        match = RANGE_PATTERN.match(range_header or '')
+        if not match or match.groups() == ('', ''):
+            response = FileResponse(open(file_path, 'rb'), content_type='video/mp4')
+            response['Accept-Ranges'] = 'bytes'
+            return response
+
+        size = os.path.getsize(file_path)
+        first, last = match.groups()
+        if first:
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1
+        if start >= size or start > end:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{size}"
+            return response
+
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            response = HttpResponse(f.read(end - start + 1), content_type='video/mp4', status=206)
+        response['Content-Range'] = f"bytes {start}-{end}/{size}"
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    def _warm(self, title):
+        # Watched again after being evicted (or never warmed): copy it back in the background
+        try:
+            current_app.send_task(WARM_HOT_SEGMENTS_TASK, args=[title])
+        except Exception:
+            logger.exception("hot_warm_error title=%s", title)
+
+    def _protected_url(self, file_path):
+        """Internal nginx location of a file under MEDIA_ROOT or in the hot segment tier."""
+        if self.hot_cache.enabled and file_path.startswith(os.path.join(self.hot_cache.root, '')):
+            return settings.PROTECTED_HOT_URL + os.path.relpath(file_path, self.hot_cache.root)
+        return settings.PROTECTED_MEDIA_URL + os.path.relpath(file_path, settings.MEDIA_ROOT)
+
+    def _get_output_dir(self):
+        return self.output_dir
+
+    def _segment_path(self, title, segment):
+        """
+        Resolve a segment of a title, checked against its segment index.
+        Args:
+            title: Video title
+            segment: Requested segment file name
+        Returns:
+            str or None: Path of the segment, None if the video does not list it
+        """
+        output_dir = self._get_output_dir()
+        segments = manifest_cache.segment_index(output_dir, title)
+        if segments is not None:
+            if segment not in segments:
+                return None
+            return self.hot_cache.path(title, segment) or os.path.join(output_dir, title, segment)
 
-            logging.info(f"Validating segment: {segment} for video: {title}")
-
-            # Valid extensions
-            valid_extensions = ('.mp4', '.m4s', '.mpd')
-            if not segment.endswith(valid_extensions):
-                logging.warning(f"Invalid extension for segment: {segment}")
-                return False
-            
-            # Valid segment patterns for FFmpeg DASH output
-            valid_patterns = [
-                'init-stream',     # Init segment pattern
-                'chunk-stream',    # Media segment pattern
-                'init-',           # Alternative init pattern
-                'chunk-',          # Alternative chunk pattern
-                f"{title}.mpd"     # MPD file
-            ]
-            
-            # Check if segment filename matches any pattern
-            is_valid = any(pattern in segment for pattern in valid_patterns)
-            
-            if not is_valid:
-                logging.warning(f"Invalid segment pattern: {segment} for video: {title}")
-            else:
-                logging.info(f"Valid segment requested: {segment}")
-                
-            return True  # For now, accept all segments with valid extensions
-            
-        except Exception as e:
-            logging.error(f"Error validating segment {segment}: {str(e)}")
-            return False
\ No newline at end of file
+        # Output packaged before segment indexes were written
+        if not segment.endswith(('.mp4', '.m4s')) or not segment.startswith(('init-', 'chunk-')):
+            return None
+        return manifest_cache.resolve(output_dir, title, segment)[0]
@@ -0,0 +1,282 @@
+import os
+import logging
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from streambuddy_common.exceptions import StorageError, InvalidVideoError, VideoNotFoundError
+from streambuddy_common.utils.validators import VideoValidator
+from ..models import UploadSession
+from .storage import StorageService
+
+# Bytes read from the request body per write
+CHUNK_SIZE = 1024 * 1024
+
+
+def merge_ranges(ranges, start, end):
+    """
+    Add a [start, end) byte range to a sorted list of disjoint ranges.
+    Args:
+        ranges: Sorted, non-overlapping [start, end) pairs
+        start: First byte of the new range
+        end: One past the last byte of the new range
+    Returns:
+        list: Sorted [start, end) pairs with overlapping and adjacent ranges merged
+    """
+    merged = []
+    for range_start, range_end in sorted(ranges + [[start, end]]):
+        if merged and range_start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], range_end)
+        else:
+            merged.append([range_start, range_end])
+    return merged
+
+
+class ResumableUploadService:
+    """Resumable uploads written part by part straight into a preallocated temp file.
+
+    Parts may arrive in any order and in parallel: each one is written at its own offset
+    with pwrite and only the bookkeeping of received ranges is serialized, by locking the
+    session row. A part cut off mid-way still records the bytes that made it to disk.
+    """
+
+    def __init__(self):
+        self.storage = StorageService()
+
+    def part_path(self, session):
+        return os.path.join(self.storage.temp_upload_root, f"{session.id}.part")
+
+    def create(self, user, title, display_title, filename, length):
+        """Open an upload session and preallocate its file (sparse where supported)."""
+        session = UploadSession.objects.create(
+            user=user,
+            title=title,
+            display_title=display_title,
+            filename=filename,
+            length=length,
+        )
+        try:
+            with open(self.part_path(session), 'wb') as f:
+                f.truncate(length)
+        except OSError as e:
+            session.delete()
+            raise StorageError(f"Failed to allocate upload: {str(e)}")
+        logging.info(f"Created upload {session.id} for {title} ({length} bytes)")
+        return session
+
+    def write_part(self, session, offset, stream, length):
+        """
+        Write a byte range of the upload from a request body.
+        Args:
+            session: The UploadSession
+            offset: Position of the first byte in the file
+            stream: File-like request body
+            length: Number of bytes in the body
+        Returns:
+            UploadSession: Refreshed session including the new range
+        """
+        if offset < 0 or length <= 0 or offset + length > session.length:
+            raise InvalidVideoError(
+                f"Range {offset}-{offset + length} is outside the upload of {session.length} bytes"
+            )
+
+        written = 0
+        try:
+            fd = os.open(self.part_path(session), os.O_WRONLY)
+            try:
+                while written < length:
+                    data = stream.read(min(CHUNK_SIZE, length - written))
+                    if not data:
+                        break
+                    os.pwrite(fd, data, offset + written)
+                    written += len(data)
+            finally:
+                os.close(fd)
+        except FileNotFoundError:
+            raise StorageError("Upload data is no longer available")
+        except OSError as e:
+            logging.error(f"Failed to write upload {session.id} at {offset}: {str(e)}")
+            raise StorageError(f"Failed to write upload part: {str(e)}")
+        finally:
+            if written:
+                session = self._record_range(session, offset, offset + written)
+
+        if written < length:
+            logging.warning(f"Upload {session.id} part at {offset} ended after {written} of {length} bytes")
+        return session
+
+    def finalize(self, session):
+        """
+        Move a complete upload to where uploads are picked up for processing.
+        Returns:
+            str: Path of the assembled file
+        """
+        if not session.complete:
+            raise InvalidVideoError(f"Upload incomplete, {session.offset} of {session.length} bytes received")
+
+        part_path = self.part_path(session)
+        try:
+            VideoValidator.validate_video_path(part_path)
+        except ValidationError as e:
+            raise InvalidVideoError(' '.join(e.messages))
+
+        final_path = os.path.join(self.storage.temp_upload_root, f"{session.title}_{session.filename}")
+        try:
+            os.replace(part_path, final_path)
+        except OSError as e:
+            raise StorageError(f"Failed to finalize upload: {str(e)}")
+        return final_path
+
+    def abort(self, session):
+        """Drop an upload and its data."""
+        self.storage.cleanup_temp_file(self.part_path(session))
+        session.delete()
+
+    def _record_range(self, session, start, end):
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(pk=session.pk)
+            session.ranges = merge_ranges(session.ranges, start, end)
+            session.save(update_fields=['ranges'])
+        return session
+
+
+class DirectUploadService:
+    """Uploads sent by the client straight to the bucket with presigned multipart URLs.
+
+    The web tier only starts, inspects and completes the S3 multipart upload; the parts
+    themselves go from the client to S3 in parallel. Part ETags are read back with
+    ListParts on completion, so clients don't need CORS access to response headers.
+    """
+
+    # S3 limits on multipart uploads
+    MIN_PART_SIZE = 5 * 1024 * 1024
+    MAX_PARTS = 10000
+
+    def __init__(self):
+        self.storage = StorageService()
+        if not self.storage.use_s3:
+            raise InvalidVideoError("Direct uploads require S3 storage")
+        self.s3 = self.storage.s3_client
+        self.bucket = self.storage.bucket_name
+
+    def part_size(self, length):
+        size = max(settings.VIDEO_SETTINGS['DIRECT_UPLOAD_PART_SIZE'], self.MIN_PART_SIZE)
+        return max(size, -(-length // self.MAX_PARTS))
+
+    def part_count(self, session):
+        return -(-session.length // self.part_size(session.length))
+
+    def source(self, session):
+        return f"s3://{self.bucket}/{session.s3_key}"
+
+    def create(self, user, title, display_title, filename, length):
+        """Open an upload session backed by an S3 multipart upload."""
+        session = UploadSession(
+            user=user,
+            title=title,
+            display_title=display_title,
+            filename=filename,
+            length=length,
+        )
+        session.s3_key = f"uploads/{user.id}/{session.id}/{filename}"
+        try:
+            response = self.s3.create_multipart_upload(Bucket=self.bucket, Key=session.s3_key)
+        except Exception as e:
+            raise StorageError(f"Failed to start upload: {str(e)}")
+        session.s3_upload_id = response['UploadId']
+        session.save()
+        logging.info(f"Created direct upload {session.id} for {title} ({length} bytes)")
+        return session
+
+    def part_urls(self, session, part_numbers=None):
+        """
+        Presign PUT URLs for parts of the upload.
+        Args:
+            session: The UploadSession
+            part_numbers: 1-based parts to sign, all of them by default
+        Returns:
+            list: {'part_number', 'url'} dicts
+        """
+        ttl = settings.VIDEO_SETTINGS['DIRECT_UPLOAD_URL_TTL']
+        if part_numbers is None:
+            part_numbers = range(1, self.part_count(session) + 1)
+        return [
+            {
+                'part_number': number,
+                'url': self.s3.generate_presigned_url(
+                    'upload_part',
+                    Params={
+                        'Bucket': self.bucket,
+                        'Key': session.s3_key,
+                        'UploadId': session.s3_upload_id,
+                        'PartNumber': number,
+                    },
+                    ExpiresIn=ttl,
+                ),
+            }
+            for number in part_numbers
+        ]
+
+    def uploaded_parts(self, session):
+        """Return the parts S3 has received so far as {'PartNumber', 'ETag', 'Size'} dicts."""
+        parts = []
+        kwargs = {'Bucket': self.bucket, 'Key': session.s3_key, 'UploadId': session.s3_upload_id}
+        try:
+            while True:
+                response = self.s3.list_parts(**kwargs)
+                parts.extend(response.get('Parts', []))
+                if not response.get('IsTruncated'):
+                    return parts
+                kwargs['PartNumberMarker'] = response['NextPartNumberMarker']
+        except self.s3.exceptions.NoSuchUpload:
+            raise VideoNotFoundError('Upload not found')
+
+    def missing_parts(self, session, parts=None):
+        received = {part['PartNumber'] for part in (parts if parts is not None else self.uploaded_parts(session))}
+        return [number for number in range(1, self.part_count(session) + 1) if number not in received]
+
+    def complete(self, session):
+        """
+        Assemble the uploaded parts into one object and check it is a video.
+        Returns:
+            str: s3:// URI of the object, for the processing task to fetch
+        """
+        parts = self.uploaded_parts(session)
+        missing = self.missing_parts(session, parts)
+        if missing:
+            raise InvalidVideoError(f"Upload incomplete, missing parts {missing[:10]}")
+        received = sum(part['Size'] for part in parts)
+        if received != session.length:
+            raise InvalidVideoError(f"Upload has {received} bytes, expected {session.length}")
+
+        try:
+            self.s3.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=session.s3_key,
+                UploadId=session.s3_upload_id,
+                MultipartUpload={'Parts': [
+                    {'PartNumber': part['PartNumber'], 'ETag': part['ETag']}
+                    for part in sorted(parts, key=lambda part: part['PartNumber'])
+                ]},
+            )
+            head = self.s3.get_object(Bucket=self.bucket, Key=session.s3_key, Range='bytes=0-1023')['Body'].read()
+        except Exception as e:
+            raise StorageError(f"Failed to complete upload: {str(e)}")
+
+        try:
+            VideoValidator.validate_video_head(head, received)
+        except ValidationError as e:
+            # The multipart upload is gone once completed, nothing is left to resume
+            self.s3.delete_object(Bucket=self.bucket, Key=session.s3_key)
+            session.delete()
+            raise InvalidVideoError(' '.join(e.messages))
+        return self.source(session)
+
+    def abort(self, session):
+        """Drop an upload and whatever parts S3 holds for it."""
+        try:
+            self.s3.abort_multipart_upload(
+                Bucket=self.bucket, Key=session.s3_key, UploadId=session.s3_upload_id
+            )
+        except self.s3.exceptions.NoSuchUpload:
+            pass
+        session.delete()
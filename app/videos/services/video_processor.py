@@ -1,7 +1,9 @@
 import os
 import json
+import shutil
 import logging
 import subprocess
+import tempfile
 import math
 from datetime import datetime
 import time
@@ -14,6 +16,24 @@ from streambuddy_common.utils.progress_tracker import FFmpegProgress
 from streambuddy_common.utils.validators import VideoValidator
 from streambuddy_common.exceptions import VideoProcessingError, StorageError, DuplicateTitleError, InvalidVideoError
 from .storage import StorageService
+from .ladder import plan_ladder
+from .manifest_cache import DASH_NAMESPACE
+from ..utils.video_helpers import VideoInfo, FragmentedMP4, SegmentIndex, HlsPlaylist
+
+SEGMENT_DURATION = 4  # seconds, two 48-frame GOPs at 24fps
+
+FFMPEG_STDERR_TAIL = 8192  # bytes of ffmpeg stderr kept for error messages
+
+# Video renditions share adaptation set 0; the one audio representation gets set 1,
+# except when packaged on its own (ffmpeg numbers sets from 0) until it is merged in
+VIDEO_SET = 'id=0,streams=v'
+VIDEO_AND_AUDIO_SETS = f'{VIDEO_SET} id=1,streams=a'
+AUDIO_ONLY_SET = 'id=0,streams=a'
+# Representation id of audio packaged on its own, used in its file names
+AUDIO_REPRESENTATION = 'a'
+
+# Merged and stitched MPDs are written with the DASH namespace as default, not ns0:
+ET.register_namespace('', DASH_NAMESPACE)
 
 class VideoProcessor:
     def __init__(self):
@@ -116,100 +136,509 @@ class VideoProcessor:
                     logging.error(f"Failed to cleanup temporary file: {str(e)}")
 
 
-    def process_to_dash(self, file_path, title):
-        """Convert video to DASH format with single 1080p quality."""
+    def plan_ladder(self, file_path, allow_stream_copy=True):
+        """Choose the renditions to encode from the source's resolution, frame rate and bitrate."""
+        metadata = VideoInfo.get_video_metadata(file_path)
+        if allow_stream_copy and metadata.get('codec') == 'h264':
+            metadata['keyframe_interval'] = VideoInfo.get_max_keyframe_interval(file_path)
+        ladder = plan_ladder(metadata, allow_stream_copy)
+        logging.info(f"Planned ladder for {file_path}: {[rung['name'] for rung in ladder]}")
+        return ladder
+
+    def process_to_dash(self, file_path, title, ladder=None, on_progress=None):
+        """Convert video to DASH format across the planned bitrate ladder."""
         try:
+            ladder = ladder or self.plan_ladder(file_path)
             output_dir = os.path.join(self.storage.mpd_root, title)  # Create subfolder for each video
             os.makedirs(output_dir, exist_ok=True)
             output_path = os.path.join(output_dir, f"{title}.mpd")
-            
-            command = [
-            'ffmpeg', '-i', file_path,
-            # 1080p
-            '-map', '0:v', '-s:v:0', '1920x1080',
-            '-c:v:0', 'libx264', '-b:v:0', '5000k',
-            '-maxrate:v:0', '5500k', '-bufsize:v:0', '10000k',
-            
-            # 720p
-            '-map', '0:v', '-s:v:1', '1280x720',
-            '-c:v:1', 'libx264', '-b:v:1', '2800k',
-            '-maxrate:v:1', '3300k', '-bufsize:v:1', '6000k',
-            
-            # 480p
-            '-map', '0:v', '-s:v:2', '854x480',
-            '-c:v:2', 'libx264', '-b:v:2', '1400k',
-            '-maxrate:v:2', '1750k', '-bufsize:v:2', '2800k',
-            
-            # Common settings
-            '-preset', 'veryfast',  # Fast encoding
-            '-profile:v', 'main',
-            '-keyint_min', '48',
-            '-g', '48',  # Keyframe interval
-            '-sc_threshold', '0',  # Disable scene cut detection
-            '-b_strategy', '0',
-            
-            # DASH settings
-            '-f', 'dash',
-            '-init_seg_name', f'init-$RepresentationID$.m4s',
-            '-media_seg_name', f'chunk-$RepresentationID$-$Number%05d$.m4s',
-            '-adaptation_sets', 'id=0,streams=v',
-            '-use_template', '1',
-            '-use_timeline', '1',
-            '-seg_duration', '4',
-            output_path
-        ]
 
+            metadata = VideoInfo.get_video_metadata(file_path)
+            audio = self.plan_audio(file_path, metadata)
 
-            result = subprocess.run(command, capture_output=True, text=True)
+            command = ['ffmpeg', '-i', file_path]
+            align_to_source = self._copies_source(ladder)
+            command += self._ladder_args(ladder, align_to_source)
+            command += self._encoder_args(align_to_source)
+            # Audio is mapped once after the video rungs and shared by all of them
+            command += self._audio_args(audio)
+            command += self._dash_args(
+                'init-$RepresentationID$.m4s',
+                'chunk-$RepresentationID$-$Number%05d$.m4s',
+                single_file_name='rep-$RepresentationID$.mp4' if self._single_file() else None,
+                adaptation_sets=VIDEO_AND_AUDIO_SETS if audio else VIDEO_SET
+            )
+            command.append(output_path)
+
+            duration = metadata.get('duration', 0)
+            progress = FFmpegProgress(duration, self.storage, title, on_progress=on_progress) if duration else None
+            result = self._run_ffmpeg(command, progress)
                 
             if result.returncode == 0:
-                self._add_base_url_to_mpd(output_path, title)
-                metadata = self.storage.get_metadata(title) or {}
-                metadata.update({
-                    'status': 'completed',
-                    'processing_progress': 100,
-                    'completed_at': str(datetime.now()),
-                    'mpd_file': f"{title}.mpd",
-                    'title': title,
-                    'resolutions': ['1080p', '720p', '480p']  # Add available resolutions
-                })
-                self.storage.save_metadata(title, metadata)
+                self._finalize_manifest(title, ladder)
                 return result
             else:
+                # Drop the dynamic MPD so players don't keep polling a stream that will never finish
+                if os.path.exists(output_path):
+                    os.remove(output_path)
                 raise Exception(f"DASH creation failed: {result.stderr}")
             
         except Exception as e:
             logging.error(f"Error in process_to_dash: {str(e)}")
             raise
 
-    def _add_base_url_to_mpd(self, mpd_path, title):
-        """Add BaseURL element to MPD file."""
+    def encode_rendition(self, file_path, title, index, ladder):
+        """Encode a single rendition of the ladder into its own DASH representation.
+
+        Segments are written with the rendition index baked into their names so
+        several renditions can share the title directory, and the partial MPD is
+        later combined by ``merge_rendition_manifests``.
+        """
+        try:
+            rendition = ladder[index]
+            output_dir = os.path.join(self.storage.mpd_root, title)
+            os.makedirs(output_dir, exist_ok=True)
+            output_path = self._rendition_manifest_path(title, index)
+
+            command = ['ffmpeg', '-i', file_path]
+            align_to_source = self._copies_source(ladder)
+            command += self._ladder_args([rendition], align_to_source)
+            command += self._encoder_args(align_to_source)
+            command += self._dash_args(
+                f'init-{index}.m4s',
+                f'chunk-{index}-$Number%05d$.m4s',
+                single_file_name=f'rep-{index}.mp4' if self._single_file() else None
+            )
+            command.append(output_path)
+
+            logging.info(f"Encoding {rendition['name']} rendition for {title}")
+            result = self._run_ffmpeg(command)
+            if result.returncode != 0:
+                raise VideoProcessingError(f"DASH creation failed for {rendition['name']}: {result.stderr}")
+            return output_path
+
+        except Exception as e:
+            logging.error(f"Error in encode_rendition: {str(e)}")
+            raise
+
+    def plan_audio(self, file_path, metadata=None):
+        """
+        Decide how the source's audio is packaged.
+        Returns:
+            str or None: 'copy' for AAC sources, 'aac' to encode, None if there is no audio
+        """
+        metadata = metadata if metadata is not None else VideoInfo.get_video_metadata(file_path)
+        codec = metadata.get('audio_codec')
+        if not codec:
+            return None
+        return 'copy' if codec == 'aac' else 'aac'
+
+    def encode_audio(self, file_path, title, single_file=None):
+        """Package the source's audio once, for the parallel and chunked modes to merge in.
+
+        Returns the partial MPD path, or None if the source has no audio.
+        """
+        try:
+            audio = self.plan_audio(file_path)
+            if audio is None:
+                logging.info(f"No audio stream in {file_path}")
+                return None
+
+            output_dir = os.path.join(self.storage.mpd_root, title)
+            os.makedirs(output_dir, exist_ok=True)
+            output_path = self._audio_manifest_path(title)
+            if single_file is None:
+                single_file = self._single_file()
+
+            command = ['ffmpeg', '-i', file_path]
+            command += self._audio_args(audio)
+            command += self._dash_args(
+                f'init-{AUDIO_REPRESENTATION}.m4s',
+                f'chunk-{AUDIO_REPRESENTATION}-$Number%05d$.m4s',
+                single_file_name=f'rep-{AUDIO_REPRESENTATION}.mp4' if single_file else None,
+                adaptation_sets=AUDIO_ONLY_SET
+            )
+            command.append(output_path)
+
+            logging.info(f"Packaging audio ({audio}) for {title}")
+            result = self._run_ffmpeg(command)
+            if result.returncode != 0:
+                raise VideoProcessingError(f"DASH creation failed for audio: {result.stderr}")
+            return output_path
+
+        except Exception as e:
+            logging.error(f"Error in encode_audio: {str(e)}")
+            raise
+
+    def merge_rendition_manifests(self, title, indices, ladder):
+        """Combine per-rendition MPDs into the single manifest served to players."""
         try:
-            # Parse the MPD file
-            tree = ET.parse(mpd_path)
+            partial_paths = [self._rendition_manifest_path(title, index) for index in indices]
+            tree = ET.parse(partial_paths[0])
             root = tree.getroot()
-            
-            # Create BaseURL element
-            # This URL should match your segment endpoint pattern
-            base_url = f"/api/videos/{title}/segments"
-            
-            # Check if BaseURL already exists
-            existing_base_url = root.find('{*}BaseURL')
-            if existing_base_url is not None:
-                existing_base_url.text = base_url
-            else:
-                # Add BaseURL after Period element
-                base_url_elem = ET.Element('BaseURL')
-                base_url_elem.text = base_url
-                root.insert(0, base_url_elem)
-            
-            # Write the modified XML back to the file
-            tree.write(mpd_path, encoding='utf-8', xml_declaration=True)
-            
+            adaptation_set = root.find('{*}Period/{*}AdaptationSet')
+            for representation in adaptation_set.findall('{*}Representation'):
+                adaptation_set.remove(representation)
+
+            max_width = max_height = 0
+            for index, partial_path in zip(indices, partial_paths):
+                representation = ET.parse(partial_path).getroot().find('{*}Period/{*}AdaptationSet/{*}Representation')
+                representation.set('id', str(index))
+                template = representation.find('{*}SegmentTemplate')
+                if template is not None:
+                    template.set('initialization', 'init-$RepresentationID$.m4s')
+                    template.set('media', 'chunk-$RepresentationID$-$Number%05d$.m4s')
+                max_width = max(max_width, int(representation.get('width', 0)))
+                max_height = max(max_height, int(representation.get('height', 0)))
+                adaptation_set.append(representation)
+
+            adaptation_set.set('maxWidth', str(max_width))
+            adaptation_set.set('maxHeight', str(max_height))
+
+            self._merge_audio(root, title)
+            output_path = os.path.join(self.storage.mpd_root, title, f"{title}.mpd")
+            tree.write(output_path, encoding='utf-8', xml_declaration=True)
+
+            for partial_path in partial_paths:
+                os.remove(partial_path)
+
+            self._finalize_manifest(title, ladder)
+            return output_path
+
         except Exception as e:
-            logging.error(f"Error adding BaseURL to MPD: {str(e)}")
+            logging.error(f"Error merging rendition manifests for {title}: {str(e)}")
             raise
 
+    def plan_chunks(self, file_path):
+        """Split the source duration into segment-aligned (start, duration) chunks."""
+        duration = VideoInfo.get_video_metadata(file_path).get('duration', 0)
+        if not duration:
+            raise VideoProcessingError(f"Could not determine duration of {file_path}")
+
+        # Chunks must hold a whole number of segments so the stitched timeline has no gaps
+        chunk_duration = settings.VIDEO_SETTINGS['CHUNK_DURATION']
+        chunk_duration = max(SEGMENT_DURATION, chunk_duration - chunk_duration % SEGMENT_DURATION)
+
+        chunks = []
+        start = 0
+        while start < duration:
+            chunks.append((start, min(chunk_duration, duration - start)))
+            start += chunk_duration
+        return chunks
+
+    def encode_chunk(self, file_path, title, index, start, duration, ladder):
+        """Encode one time slice of the source through the full ladder.
+
+        Keyframes are forced on every segment boundary and timestamps are offset
+        by ``start`` so the chunk's segments slot straight into the final timeline.
+        """
+        try:
+            output_dir = self._chunk_dir(title, index)
+            os.makedirs(output_dir, exist_ok=True)
+            output_path = os.path.join(output_dir, f"{title}.mpd")
+
+            # Stream copy cannot cut at arbitrary times, so chunked ladders never contain copy rungs
+            command = ['ffmpeg', '-ss', str(start), '-i', file_path, '-t', str(duration)]
+            command += self._ladder_args(ladder)
+            command += self._encoder_args()
+            command += [
+                '-force_key_frames', f'expr:gte(t,n_forced*{SEGMENT_DURATION})',
+                '-output_ts_offset', str(start),
+            ]
+            command += self._dash_args(
+                'init-$RepresentationID$.m4s',
+                'chunk-$RepresentationID$-$Number%05d$.m4s'
+            )
+            command.append(output_path)
+
+            logging.info(f"Encoding chunk {index} ({start}s +{duration}s) for {title}")
+            result = self._run_ffmpeg(command)
+            if result.returncode != 0:
+                raise VideoProcessingError(f"DASH creation failed for chunk {index}: {result.stderr}")
+            return output_path
+
+        except Exception as e:
+            logging.error(f"Error in encode_chunk: {str(e)}")
+            raise
+
+    def stitch_chunks(self, title, chunk_count, ladder):
+        """Renumber chunk segments into one continuous sequence and merge their timelines."""
+        try:
+            output_dir = os.path.join(self.storage.mpd_root, title)
+            first_chunk_dir = self._chunk_dir(title, 0)
+            tree = ET.parse(os.path.join(first_chunk_dir, f"{title}.mpd"))
+            root = tree.getroot()
+            representations = root.findall('{*}Period/{*}AdaptationSet/{*}Representation')
+
+            # Every chunk is encoded with identical settings, so the first init segment serves them all
+            for representation in representations:
+                init_name = f"init-{representation.get('id')}.m4s"
+                os.replace(os.path.join(first_chunk_dir, init_name), os.path.join(output_dir, init_name))
+
+            end_time = 0
+            for representation in representations:
+                rep_id = representation.get('id')
+                timescale = int(representation.find('{*}SegmentTemplate').get('timescale'))
+                timeline = representation.find('{*}SegmentTemplate/{*}SegmentTimeline')
+                for entry in list(timeline):
+                    timeline.remove(entry)
+
+                number = next_time = 0
+                for index in range(chunk_count):
+                    chunk_dir = self._chunk_dir(title, index)
+                    chunk_root = ET.parse(os.path.join(chunk_dir, f"{title}.mpd")).getroot()
+                    chunk_rep = next(
+                        r for r in chunk_root.findall('{*}Period/{*}AdaptationSet/{*}Representation')
+                        if r.get('id') == rep_id
+                    )
+                    chunk_timeline = chunk_rep.find('{*}SegmentTemplate/{*}SegmentTimeline')
+
+                    # ffmpeg applies -output_ts_offset through an edit list and keeps each
+                    # chunk's fragment decode times starting at zero, so rebase them here
+                    first_segment = os.path.join(chunk_dir, f"chunk-{rep_id}-00001.m4s")
+                    delta = int(chunk_timeline[0].get('t', next_time)) - FragmentedMP4.get_decode_time(first_segment)
+
+                    local_number = 0
+                    for entry in chunk_timeline:
+                        timeline.append(entry)
+                        repeat = int(entry.get('r', 0))
+                        # Entries without a 't' continue straight on from the previous one
+                        start_time = int(entry.get('t', next_time))
+                        next_time = start_time + int(entry.get('d')) * (repeat + 1)
+                        end_time = max(end_time, next_time / timescale)
+                        for _ in range(repeat + 1):
+                            number += 1
+                            local_number += 1
+                            segment_path = os.path.join(output_dir, f"chunk-{rep_id}-{number:05d}.m4s")
+                            os.replace(os.path.join(chunk_dir, f"chunk-{rep_id}-{local_number:05d}.m4s"), segment_path)
+                            FragmentedMP4.shift_decode_time(segment_path, delta)
+
+            root.set('mediaPresentationDuration', f"PT{end_time:.1f}S")
+            self._merge_audio(root, title)
+            output_path = os.path.join(output_dir, f"{title}.mpd")
+            tree.write(output_path, encoding='utf-8', xml_declaration=True)
+
+            shutil.rmtree(os.path.join(output_dir, '_chunks'), ignore_errors=True)
+            self._finalize_manifest(title, ladder)
+            return output_path
+
+        except Exception as e:
+            logging.error(f"Error stitching chunks for {title}: {str(e)}")
+            raise
+
+    def _run_ffmpeg(self, command, progress=None):
+        """Run ffmpeg, streaming its -progress output instead of buffering it.
+
+        Only the tail of stderr is kept for error reporting, so memory stays flat
+        however long the encode runs. Returns a ``CompletedProcess`` like
+        ``subprocess.run`` would.
+        """
+        command = [command[0], '-progress', 'pipe:1', '-nostats'] + command[1:]
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr, text=True)
+            for block in self._iter_progress(process.stdout):
+                if progress and 'out_time' in block:
+                    progress.update_progress(f"time={block['out_time']}")
+            returncode = process.wait()
+
+            stderr.seek(0, os.SEEK_END)
+            stderr.seek(max(0, stderr.tell() - FFMPEG_STDERR_TAIL))
+            stderr_tail = stderr.read().decode(errors='replace')
+
+        return subprocess.CompletedProcess(command, returncode, stdout='', stderr=stderr_tail)
+
+    def _iter_progress(self, stream):
+        """Yield one dict per ``-progress`` report as ffmpeg writes it."""
+        block = {}
+        for line in stream:
+            key, _, value = line.strip().partition('=')
+            if not key:
+                continue
+            block[key] = value
+            if key == 'progress':
+                yield block
+                block = {}
+
+    def _chunk_dir(self, title, index):
+        return os.path.join(self.storage.mpd_root, title, '_chunks', str(index))
+
+    def _audio_manifest_path(self, title):
+        return os.path.join(self.storage.mpd_root, title, f"{title}-audio.mpd")
+
+    def _merge_audio(self, root, title):
+        """Move the audio adaptation set written by ``encode_audio``, if any, into a merged MPD."""
+        audio_path = self._audio_manifest_path(title)
+        if not os.path.exists(audio_path):
+            return
+        adaptation_set = ET.parse(audio_path).getroot().find('{*}Period/{*}AdaptationSet')
+        adaptation_set.set('id', '1')
+        adaptation_set.find('{*}Representation').set('id', AUDIO_REPRESENTATION)
+        root.find('{*}Period').append(adaptation_set)
+        os.remove(audio_path)
+
+    def _rendition_manifest_path(self, title, index):
+        return os.path.join(self.storage.mpd_root, title, f"{title}-rendition-{index}.mpd")
+
+    def _copies_source(self, ladder):
+        return any(rendition.get('copy') for rendition in ladder)
+
+    def _ladder_args(self, renditions, align_to_source=False):
+        """FFmpeg filter graph and output options for the ladder.
+
+        The source is decoded once and fanned out with ``split`` so every rung
+        scales from the same decoded frames. Rungs marked ``copy`` are packaged
+        straight from the source stream, and with ``align_to_source`` the
+        transcoded rungs place their keyframes where the source has them.
+        """
+        encoded = [index for index, rendition in enumerate(renditions) if not rendition.get('copy')]
+        labels = {index: f'[s{index}]' for index in encoded}
+        graph = [f"[0:v]split={len(encoded)}{''.join(labels.values())}"] if len(encoded) > 1 else []
+        args = []
+        for index, rendition in enumerate(renditions):
+            if rendition.get('copy'):
+                args += ['-map', '0:v', f'-c:v:{index}', 'copy']
+                continue
+
+            source = labels[index] if len(encoded) > 1 else '[0:v]'
+            width, height = rendition['size'].split('x')
+            graph.append(f"{source}scale={width}:{height}[v{index}]")
+            args += [
+                '-map', f'[v{index}]',
+                f'-c:v:{index}', 'libx264', f'-b:v:{index}', rendition['bitrate'],
+                f'-maxrate:v:{index}', rendition['maxrate'], f'-bufsize:v:{index}', rendition['bufsize'],
+                f'-profile:v:{index}', 'main',
+            ]
+            if align_to_source:
+                # Keyframes follow the copied stream so every rung cuts segments at the same points
+                args += [f'-force_key_frames:v:{index}', 'source']
+
+        return (['-filter_complex', ';'.join(graph)] if graph else []) + args
+
+    def _encoder_args(self, align_to_source=False):
+        """Encoder settings shared by every transcoded rendition."""
+        if align_to_source:
+            # GOPs come from the source keyframes via -force_key_frames instead of a fixed interval
+            keyframe_args = ['-g', '1000']
+        else:
+            keyframe_args = [
+                '-keyint_min', '48',
+                '-g', '48',  # Keyframe interval
+            ]
+        return [
+            '-preset', 'veryfast',  # Fast encoding
+            *keyframe_args,
+            '-sc_threshold', '0',  # Disable scene cut detection
+            '-b_strategy', '0',
+        ]
+
+    def _audio_args(self, audio):
+        """Map the first audio stream, copied or encoded to stereo AAC, or nothing without audio."""
+        if audio is None:
+            return []
+        if audio == 'copy':
+            return ['-map', '0:a:0', '-c:a', 'copy']
+        return ['-map', '0:a:0', '-c:a', 'aac', '-b:a', settings.VIDEO_SETTINGS['AUDIO_BITRATE'], '-ac', '2']
+
+    def _dash_args(self, init_seg_name, media_seg_name, single_file_name=None, adaptation_sets=VIDEO_SET):
+        """DASH muxer settings.
+
+        With ``single_file_name`` each representation is written as one fragmented MP4
+        with a global sidx instead of an init segment plus one file per segment. In CMAF
+        mode the fragments carry the cmfc brand so HLS players accept them too. The
+        low-latency profile splits each segment into short fragments written as they are
+        encoded and marks the in-progress MPD's segments as available before they complete.
+        """
+        if single_file_name:
+            layout = ['-single_file', '1', '-global_sidx', '1', '-single_file_name', single_file_name]
+        else:
+            layout = [
+                '-init_seg_name', init_seg_name,
+                '-media_seg_name', media_seg_name,
+                '-use_template', '1',
+                '-use_timeline', '1',
+            ]
+            if self._low_latency():
+                layout += [
+                    '-streaming', '1',
+                    '-ldash', '1',
+                    '-frag_type', 'duration',
+                    '-frag_duration', str(settings.VIDEO_SETTINGS['FRAGMENT_DURATION']),
+                ]
+        if self._cmaf():
+            layout += ['-format_options', 'movflags=+cmaf']
+        return [
+            '-f', 'dash',
+            *layout,
+            '-adaptation_sets', adaptation_sets,
+            '-seg_duration', str(SEGMENT_DURATION),
+        ]
+
+    def _single_file(self):
+        return settings.VIDEO_SETTINGS['PACKAGING'] == 'single_file'
+
+    def _cmaf(self):
+        return settings.VIDEO_SETTINGS['CMAF']
+
+    def _low_latency(self):
+        return settings.VIDEO_SETTINGS['LOW_LATENCY']
+
+    def _use_segment_base(self, mpd_path):
+        """
+        Replace the per-fragment SegmentLists of single-file representations with SegmentBase.
+
+        ffmpeg lists every fragment's byte range in the MPD; players only need the init
+        range and the range of the file's global sidx, which indexes every fragment, so
+        the manifest stays a few lines long however long the video is.
+        """
+        tree = ET.parse(mpd_path)
+        root = tree.getroot()
+        converted = False
+        for representation in root.iterfind('.//{*}Representation'):
+            base_url = representation.find('{*}BaseURL')
+            segment_list = representation.find('{*}SegmentList')
+            if base_url is None or segment_list is None:
+                continue
+
+            file_path = os.path.join(os.path.dirname(mpd_path), base_url.text)
+            sidx = next((box for box in FragmentedMP4.top_level_boxes(file_path) if box[0] == b'sidx'), None)
+            if sidx is None:
+                raise VideoProcessingError(f"No sidx box found in {file_path}")
+            _, sidx_offset, sidx_size = sidx
+
+            segment_base = ET.Element(f"{{{DASH_NAMESPACE}}}SegmentBase", {
+                'indexRange': f"{sidx_offset}-{sidx_offset + sidx_size - 1}",
+                'indexRangeExact': 'true',
+            })
+            ET.SubElement(segment_base, f"{{{DASH_NAMESPACE}}}Initialization", {'range': f"0-{sidx_offset - 1}"})
+            representation.insert(list(representation).index(segment_list), segment_base)
+            representation.remove(segment_list)
+            converted = True
+
+        if converted:
+            root.set('profiles', 'urn:mpeg:dash:profile:isoff-on-demand:2011')
+            tree.write(mpd_path, encoding='utf-8', xml_declaration=True)
+
+    def _finalize_manifest(self, title, ladder):
+        """Index the segments and mark the title as completed. The BaseURL is added when the MPD is served."""
+        mpd_path = os.path.join(self.storage.mpd_root, title, f"{title}.mpd")
+        if self._cmaf():
+            # Before SegmentBase replaces the per-fragment byte ranges the playlists list
+            HlsPlaylist.write(mpd_path)
+        self._use_segment_base(mpd_path)
+        SegmentIndex.write(mpd_path)
+        metadata = self.storage.get_metadata(title) or {}
+        metadata.update({
+            'status': 'completed',
+            'processing_progress': 100,
+            'completed_at': str(datetime.now()),
+            'mpd_file': f"{title}.mpd",
+            'title': title,
+            'resolutions': [rendition['name'] for rendition in ladder]  # Add available resolutions
+        })
+        if self._cmaf():
+            metadata['hls_file'] = f"{title}.m3u8"
+        self.storage.save_metadata(title, metadata)
+
     def get_video_info(self, title):
         """Get video metadata."""
         return self.storage.get_metadata(title)
@@ -0,0 +1,40 @@
+import logging
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from streambuddy_common.exceptions import StorageError
+from .models import Video
+from .services.authz import VideoAuthorization
+from .services.storage import StorageService
+from .services.hot_cache import HotSegmentCache
+
+
+@receiver(post_init, sender=Video)
+def remember_video_owner(sender, instance, **kwargs):
+    """Keep the (owner, title) the row was loaded with, to spot ownership changes on save."""
+    instance._authorized_as = (instance.user_id, instance.title)
+
+
+@receiver(post_save, sender=Video)
+def revoke_previous_owner(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_authorized_as', None)
+    current = (instance.user_id, instance.title)
+    if not created and previous and previous != current:
+        VideoAuthorization().invalidate(*previous)
+    instance._authorized_as = current
+
+
+@receiver(post_delete, sender=Video)
+def revoke_deleted_video(sender, instance, **kwargs):
+    VideoAuthorization().invalidate(instance.user_id, instance.title)
+
+
+@receiver(post_delete, sender=Video)
+def delete_video_files(sender, instance, **kwargs):
+    """Remove a deleted video's output: RAM copies, local files and the bucket."""
+    # First, so nginx stops serving startup segments of a title that no longer exists
+    HotSegmentCache().drop(instance.title)
+    try:
+        StorageService().delete_video(instance.title)
+    except StorageError as e:
+        # The row is gone either way, leftovers are only wasted space
+        logging.error(f"Failed to delete files of {instance.title}: {str(e)}")
@@ -1,24 +1,30 @@
 from streambuddy.celery import app
-from celery import shared_task
+from celery import shared_task, chord, group
+from django.conf import settings
 from .services.video_processor import VideoProcessor
 from .services.storage import StorageService
+from .services.progress import ProgressChannel
+from .services.hot_cache import HotSegmentCache
 from .models import Video, VideoStatus
 from datetime import datetime
 import logging
 from celery import Task
 import os
 
+# Result of the audio subtask in a chord, told apart from rendition and chunk indices
+AUDIO_PART = 'audio'
 
 class VideoProcessingTask(Task):
     name = 'process_video'
 
     def on_failure(self, exc, task_id, args, kwargs, einfo):
-        video_id = args[2] if len(args) > 2 else None
+        video_id = kwargs.get('video_id') or (args[2] if len(args) > 2 else None)
         if video_id:
             try:
                 video = Video.objects.get(id=video_id)
                 video.status = VideoStatus.FAILED
                 video.save()
+                ProgressChannel().publish(video.user_id, video.title, VideoStatus.FAILED)
             except Video.DoesNotExist:
                 logging.error(f"Video with id {video_id} not found on failure.")
             except Exception as e:
@@ -29,39 +35,80 @@ def process_video_task(self, file_path, title, video_id):
     """Celery task for processing video files with progress tracking."""
     processor = VideoProcessor()
     storage = StorageService()
+    channel = ProgressChannel()
 
     try:
         video = Video.objects.get(id=video_id)
+        # Direct uploads arrive as s3:// URIs and are pulled onto the worker first
+        source = file_path
+        file_path = storage.fetch_source(source)
         video.status = VideoStatus.PROCESSING
         video.task_id = self.request.id
+        mode = settings.VIDEO_SETTINGS['PROCESSING_MODE']
+        video.ladder = processor.plan_ladder(file_path, allow_stream_copy=mode != 'chunked')
         video.save()
+        progress = channel.start(video.user_id, title, VideoStatus.PROCESSING)
+
+        if mode == 'parallel':
+            # Fan out one subtask per rendition, plus one for the audio every rendition shares,
+            # and merge the manifests once all of them finish
+            header = group(
+                [encode_rendition_task.s(file_path, title, video_id, index)
+                 for index in range(len(video.ladder))]
+                + [encode_audio_task.s(file_path, title, video_id)]
+            )
+            result = chord(header)(finalize_dash_task.s(file_path, title, video_id=video_id, source=source))
+
+            return {
+                'processed': False,
+                'status': 'dispatched',
+                'title': title,
+                'message': f'Encoding {len(video.ladder)} renditions in parallel',
+                'finalize_task_id': result.id
+            }
+
+        if mode == 'chunked':
+            # Fan out one subtask per time slice and stitch the segments once all of them finish
+            chunks = processor.plan_chunks(file_path)
+            header = group(
+                [encode_chunk_task.s(file_path, title, video_id, index, start, duration, len(chunks))
+                 for index, (start, duration) in enumerate(chunks)]
+                + [encode_audio_task.s(file_path, title, video_id, single_file=False)]
+            )
+            result = chord(header)(stitch_chunks_task.s(file_path, title, video_id=video_id, source=source))
+
+            return {
+                'processed': False,
+                'status': 'dispatched',
+                'title': title,
+                'message': f'Encoding {len(chunks)} chunks in parallel',
+                'finalize_task_id': result.id
+            }
 
         # Set lower nice value for FFmpeg process
         os.nice(10)
 
         # Process video with progress tracking
-        result = processor.process_to_dash(file_path, title)
+        def on_progress(percent, remaining_time):
+            channel.publish(
+                video.user_id, title, VideoStatus.PROCESSING,
+                progress=percent,
+                estimated_time_remaining=remaining_time,
+                started_at=progress['started_at'],
+            )
+
+        result = processor.process_to_dash(file_path, title, video.ladder, on_progress=on_progress)
 
         if result.returncode != 0:
             raise Exception(f"FFMPEG error: {result.stderr}")
 
         # Update completion metadata
-        video.processed = True
-        video.status = VideoStatus.COMPLETED
-        video.mpd_file = f"{title}.mpd"
-        video.save()
+        _mark_completed(video, title)
 
         # Cleanup
-        storage.cleanup_temp_file(file_path)
+        storage.cleanup_source(source, file_path)
 
-        return {
-            'processed': True,
-            'status': 'success',
-            'title': title,
-            'processing_completed': str(datetime.now()),
-            'message': 'Video processing completed successfully',
-            'mpd_url': f"/api/videos/{title}/mpd/"
-        }
+        return _completed_result(title)
 
     except Video.DoesNotExist:
         logging.error(f"Video with id {video_id} not found.")
@@ -71,6 +118,103 @@ def process_video_task(self, file_path, title, video_id):
         # Let the on_failure handler deal with metadata update
         raise
 
+@shared_task(base=VideoProcessingTask, bind=True)
+def encode_rendition_task(self, file_path, title, video_id, index):
+    """Encode one rendition of the ladder as part of a parallel processing chord."""
+    processor = VideoProcessor()
+
+    video = Video.objects.get(id=video_id)
+
+    os.nice(10)
+    processor.encode_rendition(file_path, title, index, video.ladder)
+    ProgressChannel().complete_part(
+        video.user_id, title, VideoStatus.PROCESSING, len(video.ladder), label=video.ladder[index]['name']
+    )
+    return index
+
+@shared_task(base=VideoProcessingTask, bind=True)
+def encode_audio_task(self, file_path, title, video_id, single_file=None):
+    """Package the source's audio once, alongside the rendition or chunk subtasks of a chord."""
+    VideoProcessor().encode_audio(file_path, title, single_file=single_file)
+    return AUDIO_PART
+
+@shared_task(base=VideoProcessingTask, bind=True)
+def finalize_dash_task(self, indices, file_path, title, video_id, source=None):
+    """Merge the per-rendition manifests once every rendition has been encoded."""
+    processor = VideoProcessor()
+    storage = StorageService()
+
+    try:
+        video = Video.objects.get(id=video_id)
+        indices = sorted(index for index in indices if index != AUDIO_PART)
+        processor.merge_rendition_manifests(title, indices, video.ladder)
+        _mark_completed(video, title)
+        storage.cleanup_source(source or file_path, file_path)
+        return _completed_result(title)
+
+    except Exception as e:
+        logging.error(f"Finalizing DASH output failed for {title}: {str(e)}")
+        raise
+
+@shared_task(base=VideoProcessingTask, bind=True)
+def encode_chunk_task(self, file_path, title, video_id, index, start, duration, chunk_count):
+    """Encode one time slice of the source as part of a chunked processing chord."""
+    processor = VideoProcessor()
+
+    video = Video.objects.get(id=video_id)
+
+    os.nice(10)
+    processor.encode_chunk(file_path, title, index, start, duration, video.ladder)
+    ProgressChannel().complete_part(
+        video.user_id, title, VideoStatus.PROCESSING, chunk_count, label=f"chunk {index + 1}"
+    )
+    return index
+
+@shared_task(base=VideoProcessingTask, bind=True)
+def stitch_chunks_task(self, indices, file_path, title, video_id, source=None):
+    """Stitch the encoded chunks into one continuous presentation."""
+    processor = VideoProcessor()
+    storage = StorageService()
+
+    try:
+        video = Video.objects.get(id=video_id)
+        chunk_count = len([index for index in indices if index != AUDIO_PART])
+        processor.stitch_chunks(title, chunk_count, video.ladder)
+        _mark_completed(video, title)
+        storage.cleanup_source(source or file_path, file_path)
+        return _completed_result(title)
+
+    except Exception as e:
+        logging.error(f"Stitching chunks failed for {title}: {str(e)}")
+        raise
+
+@shared_task
+def warm_hot_segments_task(title):
+    """Copy a title's startup segments into the RAM tier."""
+    return HotSegmentCache().warm(StorageService().mpd_root, title)
+
+def _mark_completed(video, title):
+    storage = StorageService()
+    if storage.use_s3:
+        storage.publish_dash(title)
+    if HotSegmentCache().enabled:
+        warm_hot_segments_task.delay(title)
+    video.processed = True
+    video.status = VideoStatus.COMPLETED
+    video.mpd_file = f"{title}.mpd"
+    video.save()
+    ProgressChannel().publish(video.user_id, title, VideoStatus.COMPLETED, progress=100)
+
+def _completed_result(title):
+    return {
+        'processed': True,
+        'status': 'success',
+        'title': title,
+        'processing_completed': str(datetime.now()),
+        'message': 'Video processing completed successfully',
+        'mpd_url': f"/api/videos/{title}/mpd/"
+    }
+
 @shared_task
 def monitor_worker_health():
     inspector = app.control.inspect()
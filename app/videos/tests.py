@@ -1,15 +1,77 @@
-from django.test import TestCase, override_settings
+from django.test import TestCase, AsyncClient, override_settings
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
 from rest_framework.response import Response
-from .models import Video
-from unittest.mock import patch, MagicMock
+from .models import Video, VideoMetadata, UploadSession
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
+import errno
+import json
 import os
+import shutil
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+import xml.etree.ElementTree as ET
 from django.conf import settings
+from django.http import Http404
+from .services.video_processor import VideoProcessor
+from .services.ladder import plan_ladder, default_ladder, can_stream_copy
+from .utils.video_helpers import FragmentedMP4, SegmentIndex, HlsPlaylist
+from .services.authz import VideoAuthorization
+from .services.signing import StreamURLSigner
+from .services.manifest_cache import ManifestCache
+from .services.uploads import merge_ranges, DirectUploadService
+from .upload_handlers import TempUploadRootFile
+from .services.streaming import StreamingService
+from .tasks import warm_hot_segments_task
+from .services.storage import StorageService
+from .services import hot_cache
+from .services.hot_cache import HotSegmentCache
+from .services.metadata import DatabaseMetadataBackend, JSONFileMetadataBackend, get_metadata_backend
+import struct
+import boto3
+import requests
+from moto import mock_aws
+from streambuddy_common.exceptions import StorageError
 
 User = get_user_model()
 
+class FakeRedis:
+    """The few Redis commands the authorization cache uses, backed by a dict."""
+
+    def __init__(self):
+        self.store = {}
+
+    def exists(self, key):
+        return int(key in self.store)
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    def delete(self, key):
+        self.store.pop(key, None)
+
+
+class TempMediaRootMixin:
+    """Run each test against its own empty MEDIA_ROOT, with SETTINGS merged into VIDEO_SETTINGS."""
+
+    SETTINGS = {}
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            VIDEO_SETTINGS={**settings.VIDEO_SETTINGS, **self.SETTINGS},
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
 @override_settings(MEDIA_ROOT=os.path.join(settings.BASE_DIR, 'test_media'))
 class VideoAPITestCase(TestCase):
     def setUp(self):
@@ -31,6 +93,11 @@ class VideoAPITestCase(TestCase):
             original_filename='test.mp4'
         )
 
+        redis_patcher = patch('videos.services.authz.get_redis_client', return_value=FakeRedis())
+        self.redis = redis_patcher.start()()
+        self.addCleanup(redis_patcher.stop)
+        VideoAuthorization.clear_local()
+
     def test_video_list(self):
         response = self.client.get('/api/videos/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -80,3 +147,1029 @@ class VideoAPITestCase(TestCase):
         self.client.force_authenticate(user=self.other_user)
         response = self.client.get(f'/api/videos/{self.video.title}/mpd/')
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @patch('videos.api.streaming.StreamingService')
+    def test_segment_authorization_cached(self, mock_streaming_service):
+        mock_streaming_service.return_value.serve_segment.return_value = Response(status=status.HTTP_200_OK)
+        url = f'/api/videos/{self.video.title}/segments/chunk-0-00001.m4s/'
+
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        # A fresh process still skips the database thanks to the Redis tier
+        VideoAuthorization.clear_local()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    @patch('videos.api.streaming.StreamingService')
+    def test_delete_and_owner_change_revoke_authorization(self, mock_streaming_service):
+        mock_streaming_service.return_value.serve_mpd.return_value = Response(status=status.HTTP_200_OK)
+        url = f'/api/videos/{self.video.title}/mpd/'
+
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        self.video.user = self.other_user
+        self.video.save()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(user=self.other_user)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        self.client.delete(f'/api/videos/{self.video.title}/')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.redis.store, {})
+
+    @patch('videos.api.upload.process_video_task')
+    @patch('videos.api.upload.StorageService')
+    @patch('videos.api.upload.VideoValidator')
+    def test_upload_duplicate_title_conflicts(self, mock_validator, mock_storage, mock_task):
+        upload = SimpleUploadedFile('again.mp4', b'video', content_type='video/mp4')
+        response = self.client.post('/api/videos/upload/', {'title': 'test-video', 'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Video.objects.filter(user=self.user, title='test-video').count(), 1)
+        mock_task.delay.assert_not_called()
+
+    @patch('videos.api.upload.ProgressChannel')
+    def test_progress_served_from_redis(self, mock_channel):
+        mock_channel.return_value.get.return_value = {
+            'status': 'processing',
+            'progress': 45.5,
+            'current_resolution': '720p',
+            'resolution_progress': '2/3',
+            'estimated_time_remaining': 120,
+        }
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/api/videos/{self.video.title}/progress/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['progress'], 45.5)
+        mock_channel.return_value.get.assert_called_once_with(self.user.id, self.video.title)
+
+    @patch('videos.api.upload.ProgressChannel')
+    def test_progress_falls_back_to_video_status(self, mock_channel):
+        mock_channel.return_value.get.return_value = None
+        response = self.client.get(f'/api/videos/{self.video.title}/progress/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], self.video.status)
+
+        self.client.force_authenticate(user=self.other_user)
+        response = self.client.get(f'/api/videos/{self.video.title}/progress/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class VideoProgressEventsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='events@example.com', password='testpassword')
+        self.video = Video.objects.create(
+            user=self.user,
+            title='events-video',
+            display_title='Events Video',
+            original_filename='events.mp4'
+        )
+
+    def _redis(self, current, published):
+        client = MagicMock()
+        client.exists = AsyncMock(return_value=bool(current))
+        client.get = AsyncMock(return_value=json.dumps(current) if current else None)
+        client.aclose = AsyncMock()
+        pubsub = client.pubsub.return_value
+        pubsub.subscribe = AsyncMock()
+        pubsub.aclose = AsyncMock()
+        pubsub.get_message = AsyncMock(side_effect=[
+            {'type': 'message', 'data': json.dumps(snapshot)} for snapshot in published
+        ])
+        return client
+
+    async def _read(self, response):
+        return ''.join([chunk.decode() async for chunk in response.streaming_content])
+
+    async def test_streams_until_processing_ends(self):
+        client = self._redis(
+            {'status': 'PROCESSING', 'progress': 10},
+            [{'status': 'PROCESSING', 'progress': 60}, {'status': 'COMPLETED', 'progress': 100}],
+        )
+        async_client = AsyncClient()
+        await async_client.aforce_login(self.user)
+        with patch('videos.api.events.aioredis.from_url', return_value=client):
+            response = await async_client.get(f'/api/videos/{self.video.title}/events/')
+            body = await self._read(response)
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(body.count('event: progress'), 3)
+        self.assertIn('"progress": 100', body)
+        client.pubsub.return_value.subscribe.assert_awaited_once_with(
+            f'streambuddy:progress:{self.user.id}:{self.video.title}'
+        )
+        client.aclose.assert_awaited()
+
+    async def test_unknown_video_and_anonymous_rejected(self):
+        async_client = AsyncClient()
+        response = await async_client.get(f'/api/videos/{self.video.title}/events/')
+        self.assertEqual(response.status_code, 401)
+
+        await async_client.aforce_login(self.user)
+        with patch('videos.api.events.aioredis.from_url', return_value=self._redis(None, [])):
+            response = await async_client.get('/api/videos/missing/events/')
+        self.assertEqual(response.status_code, 404)
+
+
+PARTIAL_MPD = """<?xml version="1.0" encoding="utf-8"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" mediaPresentationDuration="PT8.0S">
+    <Period id="0" start="PT0.0S">
+        <AdaptationSet id="0" contentType="video" maxWidth="{width}" maxHeight="{height}">
+            <Representation id="0" mimeType="video/mp4" bandwidth="{bandwidth}" width="{width}" height="{height}">
+                <SegmentTemplate timescale="12288" initialization="init-{index}.m4s" media="chunk-{index}-$Number%05d$.m4s" startNumber="1">
+                    <SegmentTimeline>
+                        <S t="0" d="49152" r="1" />
+                    </SegmentTimeline>
+                </SegmentTemplate>
+            </Representation>
+        </AdaptationSet>
+    </Period>
+</MPD>
+"""
+
+
+@override_settings(MEDIA_ROOT=os.path.join(settings.BASE_DIR, 'test_media'))
+class VideoProcessorTestCase(TestCase):
+    def setUp(self):
+        self.processor = VideoProcessor()
+        self.output_dir = os.path.join(self.processor.storage.mpd_root, 'merge-test')
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+        metadata_path = os.path.join(self.processor.storage.metadata_root, 'merge-test.json')
+        if os.path.exists(metadata_path):
+            os.remove(metadata_path)
+
+    def test_merge_rendition_manifests(self):
+        renditions = [(0, 1920, 1080, 5000000), (1, 1280, 720, 2800000)]
+        for index, width, height, bandwidth in renditions:
+            path = os.path.join(self.output_dir, f'merge-test-rendition-{index}.mpd')
+            with open(path, 'w') as f:
+                f.write(PARTIAL_MPD.format(index=index, width=width, height=height, bandwidth=bandwidth))
+            for name in (f'init-{index}.m4s', f'chunk-{index}-00001.m4s', f'chunk-{index}-00002.m4s'):
+                open(os.path.join(self.output_dir, name), 'wb').close()
+
+        output_path = self.processor.merge_rendition_manifests('merge-test', [0, 1], default_ladder()[:2])
+
+        root = ET.parse(output_path).getroot()
+        adaptation_set = root.find('{*}Period/{*}AdaptationSet')
+        representations = adaptation_set.findall('{*}Representation')
+        self.assertEqual([r.get('id') for r in representations], ['0', '1'])
+        self.assertEqual(adaptation_set.get('maxWidth'), '1920')
+        self.assertEqual(
+            representations[1].find('{*}SegmentTemplate').get('initialization'),
+            'init-$RepresentationID$.m4s'
+        )
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, 'merge-test-rendition-0.mpd')))
+        self.assertEqual(len(SegmentIndex.load(os.path.join(self.output_dir, SegmentIndex.FILENAME))), 6)
+
+    def test_merge_rendition_manifests_adds_audio(self):
+        with open(os.path.join(self.output_dir, 'merge-test-rendition-0.mpd'), 'w') as f:
+            f.write(PARTIAL_MPD.format(index=0, width=640, height=360, bandwidth=800000))
+        with open(os.path.join(self.output_dir, 'merge-test-audio.mpd'), 'w') as f:
+            f.write(PARTIAL_MPD.format(index=0, width=640, height=360, bandwidth=128000).replace(
+                'init-0.m4s', 'init-a.m4s').replace('chunk-0-', 'chunk-a-').replace('"video"', '"audio"'))
+        for name in ('init-0.m4s', 'chunk-0-00001.m4s', 'chunk-0-00002.m4s',
+                     'init-a.m4s', 'chunk-a-00001.m4s', 'chunk-a-00002.m4s'):
+            open(os.path.join(self.output_dir, name), 'wb').close()
+
+        output_path = self.processor.merge_rendition_manifests('merge-test', [0], default_ladder()[:1])
+
+        adaptation_sets = ET.parse(output_path).getroot().findall('{*}Period/{*}AdaptationSet')
+        self.assertEqual([a.get('id') for a in adaptation_sets], ['0', '1'])
+        self.assertEqual(adaptation_sets[1].find('{*}Representation').get('id'), 'a')
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, 'merge-test-audio.mpd')))
+        self.assertIn('chunk-a-00002.m4s', SegmentIndex.load(os.path.join(self.output_dir, SegmentIndex.FILENAME)))
+
+    def test_cmaf_output_gets_hls_playlists(self):
+        self.test_merge_rendition_manifests_adds_audio()
+        with self.settings(VIDEO_SETTINGS={**settings.VIDEO_SETTINGS, 'CMAF': True}):
+            self.assertIn('movflags=+cmaf', self.processor._dash_args('init.m4s', 'chunk.m4s'))
+            self.processor._finalize_manifest('merge-test', default_ladder()[:1])
+
+        with open(os.path.join(self.output_dir, 'merge-test.m3u8')) as f:
+            master = f.read().splitlines()
+        self.assertIn('#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="audio",NAME="default",DEFAULT=YES,AUTOSELECT=YES,URI="media_a.m3u8"', master)
+        self.assertTrue(master[-2].startswith('#EXT-X-STREAM-INF:BANDWIDTH=928000,'))
+        self.assertIn('AUDIO="audio"', master[-2])
+        self.assertEqual(master[-1], 'media_0.m3u8')
+        with open(os.path.join(self.output_dir, 'media_a.m3u8')) as f:
+            media = f.read().splitlines()
+        self.assertIn('#EXT-X-MAP:URI="init-a.m4s"', media)
+        self.assertEqual(media[-4:], ['chunk-a-00001.m4s', '#EXTINF:4.000,', 'chunk-a-00002.m4s', '#EXT-X-ENDLIST'])
+
+    def test_hls_playlist_byte_ranges_for_single_file(self):
+        mpd_path = os.path.join(self.output_dir, 'merge-test.mpd')
+        with open(mpd_path, 'w') as f:
+            f.write(PARTIAL_MPD.format(index=0, width=640, height=360, bandwidth=800000).replace(
+                'mediaPresentationDuration="PT8.0S"', 'mediaPresentationDuration="PT6.5S"'
+            ).replace(
+                '<SegmentTemplate timescale="12288" initialization="init-0.m4s" media="chunk-0-$Number%05d$.m4s" startNumber="1">'
+                '\n                    <SegmentTimeline>\n                        <S t="0" d="49152" r="1" />'
+                '\n                    </SegmentTimeline>\n                </SegmentTemplate>',
+                '<BaseURL>rep-0.mp4</BaseURL><SegmentList timescale="1000000" duration="4000000">'
+                '<Initialization range="0-923" /><SegmentURL mediaRange="924-1983" /><SegmentURL mediaRange="1984-2500" /></SegmentList>'
+            ))
+
+        HlsPlaylist.write(mpd_path)
+
+        with open(os.path.join(self.output_dir, 'media_0.m3u8')) as f:
+            media = f.read().splitlines()
+        self.assertIn('#EXT-X-MAP:URI="rep-0.mp4",BYTERANGE="924@0"', media)
+        self.assertEqual(media[-4:], ['#EXTINF:2.500,', '#EXT-X-BYTERANGE:517@1984', 'rep-0.mp4', '#EXT-X-ENDLIST'])
+
+    @patch('videos.services.video_processor.VideoInfo.get_video_metadata')
+    def test_plan_audio(self, mock_metadata):
+        mock_metadata.return_value = {'duration': 10.0, 'audio_codec': 'aac'}
+        self.assertEqual(self.processor.plan_audio('/tmp/source.mp4'), 'copy')
+        self.assertEqual(self.processor.plan_audio('/tmp/source.mp4', {'audio_codec': 'opus'}), 'aac')
+        self.assertIsNone(self.processor.plan_audio('/tmp/source.mp4', {'audio_codec': None}))
+
+    def test_audio_args(self):
+        self.assertEqual(self.processor._audio_args('copy'), ['-map', '0:a:0', '-c:a', 'copy'])
+        args = self.processor._audio_args('aac')
+        self.assertEqual(args[args.index('-c:a') + 1], 'aac')
+        self.assertEqual(args[args.index('-ac') + 1], '2')
+        self.assertEqual(self.processor._audio_args(None), [])
+
+    @override_settings(VIDEO_SETTINGS={**settings.VIDEO_SETTINGS, 'CHUNK_DURATION': 62})
+    @patch('videos.services.video_processor.VideoInfo.get_video_metadata')
+    def test_plan_chunks_aligns_to_segments(self, mock_metadata):
+        mock_metadata.return_value = {'duration': 130.0}
+        chunks = self.processor.plan_chunks('/tmp/source.mp4')
+        self.assertEqual(chunks, [(0, 60), (60, 60), (120, 10.0)])
+
+    def test_shift_decode_time(self):
+        tfdt = struct.pack('>I4sB3sQ', 20, b'tfdt', 1, b'\x00' * 3, 96)
+        traf = struct.pack('>I4s', 8 + len(tfdt), b'traf') + tfdt
+        moof = struct.pack('>I4s', 8 + len(traf), b'moof') + traf
+        path = os.path.join(self.output_dir, 'chunk-0-00001.m4s')
+        with open(path, 'wb') as f:
+            f.write(moof)
+
+        FragmentedMP4.shift_decode_time(path, 737280)
+
+        self.assertEqual(FragmentedMP4.get_decode_time(path), 737376)
+
+    def test_single_file_manifest_uses_segment_base(self):
+        # ffmpeg -single_file -global_sidx layout: ftyp, moov, one sidx, then the fragments
+        boxes = [(b'ftyp', 24), (b'moov', 800), (b'sidx', 100), (b'moof', 60), (b'mdat', 1000)]
+        with open(os.path.join(self.output_dir, 'rep-0.mp4'), 'wb') as f:
+            for box_type, size in boxes:
+                f.write(struct.pack('>I4s', size, box_type) + b'\x00' * (size - 8))
+        with open(os.path.join(self.output_dir, 'merge-test.mpd'), 'w') as f:
+            f.write(PARTIAL_MPD.format(index=0, width=640, height=360, bandwidth=800000).replace(
+                '<SegmentTemplate timescale="12288" initialization="init-0.m4s" media="chunk-0-$Number%05d$.m4s" startNumber="1">'
+                '\n                    <SegmentTimeline>\n                        <S t="0" d="49152" r="1" />'
+                '\n                    </SegmentTimeline>\n                </SegmentTemplate>',
+                '<BaseURL>rep-0.mp4</BaseURL><SegmentList timescale="1000000" duration="4000000">'
+                '<Initialization range="0-923" /><SegmentURL mediaRange="924-1983" /></SegmentList>'
+            ))
+
+        self.processor._finalize_manifest('merge-test', default_ladder()[:1])
+
+        root = ET.parse(os.path.join(self.output_dir, 'merge-test.mpd')).getroot()
+        representation = root.find('.//{*}Representation')
+        self.assertIsNone(representation.find('{*}SegmentList'))
+        segment_base = representation.find('{*}SegmentBase')
+        self.assertEqual(segment_base.get('indexRange'), '824-923')
+        self.assertEqual(segment_base.find('{*}Initialization').get('range'), '0-823')
+        self.assertEqual(root.get('profiles'), 'urn:mpeg:dash:profile:isoff-on-demand:2011')
+        self.assertEqual(SegmentIndex.load(os.path.join(self.output_dir, SegmentIndex.FILENAME)), {'rep-0.mp4': 1984})
+
+    def test_single_file_dash_args(self):
+        with self.settings(VIDEO_SETTINGS={**settings.VIDEO_SETTINGS, 'PACKAGING': 'single_file'}):
+            args = self.processor._dash_args('init.m4s', 'chunk.m4s', single_file_name='rep-0.mp4')
+        self.assertEqual(args[args.index('-single_file_name') + 1], 'rep-0.mp4')
+        self.assertIn('-global_sidx', args)
+        self.assertNotIn('-media_seg_name', args)
+
+    def test_low_latency_dash_args(self):
+        with self.settings(VIDEO_SETTINGS={**settings.VIDEO_SETTINGS, 'LOW_LATENCY': True, 'FRAGMENT_DURATION': 0.5}):
+            args = self.processor._dash_args('init.m4s', 'chunk.m4s')
+            single_file_args = self.processor._dash_args('init.m4s', 'chunk.m4s', single_file_name='rep-0.mp4')
+        self.assertEqual(args[args.index('-streaming') + 1], '1')
+        self.assertEqual(args[args.index('-frag_duration') + 1], '0.5')
+        self.assertIn('-ldash', args)
+        self.assertNotIn('-streaming', single_file_args)
+
+    def test_ladder_args_decode_once(self):
+        args = self.processor._ladder_args(default_ladder())
+        graph = args[args.index('-filter_complex') + 1]
+        self.assertTrue(graph.startswith('[0:v]split=3[s0][s1][s2];'))
+        self.assertIn('[s1]scale=1280:720[v1]', graph)
+        self.assertEqual(args.count('-map'), 3)
+        self.assertNotIn('0:v', [args[i + 1] for i, arg in enumerate(args) if arg == '-map'])
+
+    def test_ladder_args_stream_copy_top_rung(self):
+        ladder = [
+            {'name': '720p', 'size': '1280x720', 'bitrate': '2100k', 'maxrate': '2475k', 'bufsize': '4500k', 'copy': True},
+            {'name': '480p', 'size': '854x480', 'bitrate': '1400k', 'maxrate': '1750k', 'bufsize': '2800k'},
+        ]
+        args = self.processor._ladder_args(ladder, align_to_source=True)
+        self.assertEqual(args[:2], ['-filter_complex', '[0:v]scale=854:480[v1]'])
+        self.assertIn('-c:v:0', args)
+        self.assertEqual(args[args.index('-c:v:0') + 1], 'copy')
+        self.assertEqual(args[args.index('-force_key_frames:v:1') + 1], 'source')
+        self.assertNotIn('-keyint_min', self.processor._encoder_args(align_to_source=True))
+
+    def test_iter_progress_yields_reports(self):
+        output = [
+            'frame=24\n', 'out_time=00:00:01.000000\n', 'progress=continue\n',
+            'frame=48\n', 'out_time=00:00:02.000000\n', 'progress=end\n',
+        ]
+        blocks = list(self.processor._iter_progress(iter(output)))
+        self.assertEqual([block['out_time'] for block in blocks], ['00:00:01.000000', '00:00:02.000000'])
+        self.assertEqual(blocks[-1]['progress'], 'end')
+
+
+class LadderPlannerTestCase(TestCase):
+    DASH_READY = {
+        'width': 1280, 'height': 720, 'fps': 24, 'bitrate': 2100000, 'duration': 60,
+        'codec': 'h264', 'profile': 'High', 'pix_fmt': 'yuv420p', 'keyframe_interval': 2.0,
+    }
+
+    def test_default_ladder_matches_reference(self):
+        self.assertEqual([rung['size'] for rung in default_ladder()], ['1920x1080', '1280x720', '854x480'])
+
+    def test_small_source_is_not_upscaled(self):
+        ladder = plan_ladder({'width': 640, 'height': 360, 'fps': 30, 'bitrate': 900000, 'duration': 12})
+        self.assertEqual(len(ladder), 1)
+        self.assertEqual(ladder[0]['size'], '640x360')
+        self.assertEqual(ladder[0]['bitrate'], '900k')
+
+    def test_rungs_above_source_are_dropped(self):
+        ladder = plan_ladder({'width': 1280, 'height': 720, 'fps': 25, 'bitrate': 2000000, 'duration': 60})
+        self.assertEqual([rung['name'] for rung in ladder], ['720p', '480p'])
+        self.assertEqual(ladder[0]['bitrate'], '2000k')
+        self.assertEqual(ladder[1]['bitrate'], '1400k')
+
+    def test_portrait_keeps_aspect_ratio(self):
+        ladder = plan_ladder({'width': 1080, 'height': 1920, 'fps': 30, 'bitrate': 8000000, 'duration': 60})
+        self.assertEqual([rung['size'] for rung in ladder], ['1080x1920', '720x1280', '480x854'])
+
+    def test_unknown_source_uses_default_ladder(self):
+        self.assertEqual(plan_ladder({}), default_ladder())
+
+    def test_dash_ready_source_copies_top_rung(self):
+        ladder = plan_ladder(self.DASH_READY)
+        self.assertTrue(ladder[0]['copy'])
+        self.assertEqual(ladder[0]['size'], '1280x720')
+        self.assertEqual([rung['name'] for rung in ladder], ['720p', '480p'])
+        self.assertNotIn('copy', ladder[1])
+
+    def test_stream_copy_requires_regular_keyframes(self):
+        self.assertFalse(can_stream_copy({**self.DASH_READY, 'keyframe_interval': 10.0}))
+        self.assertFalse(can_stream_copy({**self.DASH_READY, 'profile': 'High 10'}))
+        self.assertFalse(can_stream_copy({**self.DASH_READY, 'bitrate': 20000000}))
+        self.assertNotIn('copy', plan_ladder(self.DASH_READY, allow_stream_copy=False)[0])
+
+
+class MetadataBackendTestCase(TestCase):
+    def setUp(self):
+        self.json_root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.json_root, ignore_errors=True)
+
+    def test_database_backend_round_trip(self):
+        backend = DatabaseMetadataBackend()
+        self.assertIsNone(backend.get('clip'))
+        self.assertFalse(backend.exists('clip'))
+
+        backend.save('clip', {'title': 'clip', 'status': 'processing'})
+        backend.save('clip', {'title': 'clip', 'status': 'completed'})
+        backend.save('untitled', {'status': 'processing'})
+
+        self.assertTrue(backend.exists('clip'))
+        self.assertEqual(backend.get('clip')['status'], 'completed')
+        self.assertEqual(backend.list(), [{'title': 'clip', 'status': 'completed'}])
+
+        backend.delete('clip')
+        self.assertFalse(backend.exists('clip'))
+
+    @override_settings(VIDEO_STORAGE={**settings.VIDEO_STORAGE, 'METADATA_BACKEND': 'json'})
+    def test_json_backend_selected_by_setting(self):
+        backend = get_metadata_backend(self.json_root)
+        self.assertIsInstance(backend, JSONFileMetadataBackend)
+        backend.save('clip', {'title': 'clip'})
+        self.assertTrue(os.path.exists(os.path.join(self.json_root, 'clip.json')))
+        self.assertEqual(backend.list(), [{'title': 'clip'}])
+
+    def test_import_metadata_json(self):
+        for title in ('first', 'second'):
+            with open(os.path.join(self.json_root, f'{title}.json'), 'w') as f:
+                json.dump({'title': title, 'status': 'completed'}, f)
+        with open(os.path.join(self.json_root, 'broken.json'), 'w') as f:
+            f.write('{')
+
+        call_command('import_metadata_json', root=self.json_root, stdout=StringIO(), stderr=StringIO())
+        call_command('import_metadata_json', root=self.json_root, stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(VideoMetadata.objects.count(), 2)
+        self.assertEqual(DatabaseMetadataBackend().get('second')['status'], 'completed')
+
+
+class SignedStreamingTestCase(TempMediaRootMixin, TestCase):
+    SETTINGS = {'SIGNING_SECRET': 'segment-secret', 'SIGNED_URL_TTL': 3600, 'SIGNED_URL_PREFIX': '/streams'}
+
+    def setUp(self):
+        super().setUp()
+
+        video_dir = os.path.join(self.media_root, 'dash_output', 'signed-video')
+        os.makedirs(video_dir)
+        with open(os.path.join(video_dir, 'signed-video.mpd'), 'w') as f:
+            f.write(PARTIAL_MPD.format(width=640, height=360, bandwidth=800000, index=0))
+        with open(os.path.join(video_dir, 'chunk-0-00001.m4s'), 'wb') as f:
+            f.write(b'segment')
+
+        self.user = User.objects.create_user(email='signed@example.com', password='testpassword')
+        Video.objects.create(user=self.user, title='signed-video', display_title='Signed', original_filename='s.mp4')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_token_matches_nginx_secure_link(self):
+        signer = StreamURLSigner()
+        # echo -n '4600/7/clip segment-secret' | openssl md5 -binary | openssl base64 | tr +/ -_ | tr -d =
+        self.assertEqual(signer.sign(7, 'clip', now=1000), '/streams/7/4600/onGzINFS1jN9BedCPySBXA/clip/')
+        self.assertTrue(signer.verify(7, 'clip', 4600, 'onGzINFS1jN9BedCPySBXA', now=4600))
+        self.assertFalse(signer.verify(7, 'clip', 4600, 'onGzINFS1jN9BedCPySBXA', now=4601))
+        self.assertFalse(signer.verify(8, 'clip', 4600, 'onGzINFS1jN9BedCPySBXA', now=4600))
+
+    @patch('videos.api.streaming.VideoAuthorization')
+    def test_mpd_base_url_is_signed(self, mock_authorization):
+        mock_authorization.return_value.is_authorized.return_value = True
+        response = self.client.get('/api/videos/signed-video/mpd/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Cache-Control'], 'private, no-store')
+        base_url = ET.fromstring(response.content).find('{urn:mpeg:dash:schema:mpd:2011}BaseURL').text
+        self.assertTrue(base_url.startswith(f'/streams/{self.user.id}/'))
+
+        segment = self.client.get(base_url + 'chunk-0-00001.m4s')
+        self.assertEqual(segment.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(segment.streaming_content), b'segment')
+
+    @patch('videos.api.streaming.VideoAuthorization')
+    def test_m3u8_segment_uris_are_signed(self, mock_authorization):
+        mock_authorization.return_value.is_authorized.return_value = True
+        HlsPlaylist.write(os.path.join(self.media_root, 'dash_output', 'signed-video', 'signed-video.mpd'))
+
+        master = self.client.get('/api/videos/signed-video/m3u8/')
+        self.assertEqual(master.status_code, status.HTTP_200_OK)
+        self.assertEqual(master['Content-Type'], 'application/vnd.apple.mpegurl')
+        playlist_url = master.content.decode().splitlines()[-1]
+        self.assertEqual(playlist_url, '/api/videos/signed-video/m3u8/media_0.m3u8')
+
+        media = self.client.get(playlist_url)
+        self.assertEqual(media.status_code, status.HTTP_200_OK)
+        lines = media.content.decode().splitlines()
+        segment_url = next(line for line in lines if line.endswith('chunk-0-00001.m4s'))
+        self.assertTrue(segment_url.startswith(f'/streams/{self.user.id}/'))
+        self.assertIn(f'#EXT-X-MAP:URI="/streams/{self.user.id}/', media.content.decode())
+        self.assertEqual(b''.join(self.client.get(segment_url).streaming_content), b'segment')
+
+        self.assertEqual(self.client.get('/api/videos/signed-video/m3u8/segments.json').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_forged_segment_url_rejected(self):
+        other_user_prefix = StreamURLSigner().sign(self.user.id + 1, 'signed-video')
+        forged = other_user_prefix.replace(f'/streams/{self.user.id + 1}/', f'/streams/{self.user.id}/')
+        response = self.client.get(forged + 'chunk-0-00001.m4s')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class LowLatencySegmentTestCase(TempMediaRootMixin, TestCase):
+    SETTINGS = {
+        'SIGNING_SECRET': 'segment-secret', 'SIGNED_URL_TTL': 3600, 'SIGNED_URL_PREFIX': '/streams',
+        'LOW_LATENCY': True, 'FRAGMENT_DURATION': 0.5,
+    }
+
+    def setUp(self):
+        super().setUp()
+
+        # Two segments done, the third being written
+        self.video_dir = os.path.join(self.media_root, 'dash_output', 'live-video')
+        os.makedirs(self.video_dir)
+        with open(os.path.join(self.video_dir, 'live-video.mpd'), 'w') as f:
+            f.write(PARTIAL_MPD.format(width=640, height=360, bandwidth=800000, index=0).replace('"static"', '"dynamic"'))
+        for name in ('init-0.m4s', 'chunk-0-00001.m4s', 'chunk-0-00002.m4s'):
+            with open(os.path.join(self.video_dir, name), 'wb') as f:
+                f.write(b'segment')
+        self.partial_path = os.path.join(self.video_dir, 'chunk-0-00003.m4s.tmp')
+        with open(self.partial_path, 'wb') as f:
+            f.write(b'fragment-1')
+        self.prefix = StreamURLSigner().sign(7, 'live-video').replace('/streams/', '/streams/live/', 1)
+
+    def _finish_segment(self):
+        with open(self.partial_path, 'ab') as f:
+            f.write(b'fragment-2')
+        os.replace(self.partial_path, self.partial_path[:-len('.tmp')])
+
+    async def test_growing_segment_streamed_until_complete(self):
+        response = await AsyncClient().get(self.prefix + 'chunk-0-00003.m4s')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Buffering'], 'no')
+
+        asyncio.get_running_loop().call_later(0.2, self._finish_segment)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(body, b'fragment-1fragment-2')
+
+    async def test_completed_segment_served_from_disk(self):
+        response = await AsyncClient().get(self.prefix + 'chunk-0-00002.m4s')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected_media/dash_output/live-video/chunk-0-00002.m4s')
+
+        response = await AsyncClient().get(self.prefix + 'chunk-0-00009.m4s')
+        self.assertEqual(response.status_code, 404)
+
+    def test_partial_segments_need_low_latency_and_dynamic_mpd(self):
+        service = StreamingService()
+        self.assertEqual(service.partial_segment_path('live-video', 'chunk-0-00003.m4s'), self.partial_path)
+        self.assertIsNone(service.partial_segment_path('live-video', 'live-video.mpd'))
+        with self.settings(VIDEO_SETTINGS={**settings.VIDEO_SETTINGS, 'LOW_LATENCY': False}):
+            self.assertIsNone(service.partial_segment_path('live-video', 'chunk-0-00003.m4s'))
+
+
+class ManifestCacheTestCase(TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir, ignore_errors=True)
+        os.makedirs(os.path.join(self.output_dir, 'clip'))
+        self.mpd_path = os.path.join(self.output_dir, 'clip', 'clip.mpd')
+        self._write_mpd(640)
+        self.cache = ManifestCache(revalidate_interval=60)
+
+    def _write_mpd(self, width):
+        # An MPD rewritten on disk by an older release, with a stray non-namespaced BaseURL
+        mpd = PARTIAL_MPD.format(width=width, height=360, bandwidth=800000, index=0)
+        mpd = mpd.replace('<Period', '<BaseURL>/api/videos/clip/segments</BaseURL><Period', 1)
+        with open(self.mpd_path, 'w') as f:
+            f.write(mpd)
+
+    def test_variants_built_in_memory(self):
+        plain = self.cache.manifest(self.output_dir, 'clip', '/api/videos/clip/segments/')
+        signed = self.cache.manifest(self.output_dir, 'clip', '/streams/1/99/a&b/clip/')
+
+        root = ET.fromstring(signed)
+        self.assertEqual([e.text for e in root.iter('{urn:mpeg:dash:schema:mpd:2011}BaseURL')], ['/streams/1/99/a&b/clip/'])
+        self.assertNotIn(b'ns0:', plain)
+        self.assertIn(b'<BaseURL>/api/videos/clip/segments/</BaseURL>', plain)
+        with open(self.mpd_path, 'rb') as f:
+            self.assertNotIn(b'/streams/', f.read())
+
+    def test_hot_titles_skip_stat_until_revalidation(self):
+        self.cache.manifest(self.output_dir, 'clip', '/a/')
+        with patch('videos.services.manifest_cache.os.stat') as mock_stat:
+            self.cache.manifest(self.output_dir, 'clip', '/b/')
+            self.assertEqual(self.cache.resolve(self.output_dir, 'clip', 'clip.mpd')[0], self.mpd_path)
+        mock_stat.assert_not_called()
+
+    def test_changed_mpd_is_reparsed(self):
+        self.cache.revalidate_interval = 0
+        self.assertIn(b'width="640"', self.cache.manifest(self.output_dir, 'clip', '/a/'))
+        self._write_mpd(1280)
+        os.utime(self.mpd_path, ns=(0, os.stat(self.mpd_path).st_mtime_ns + 10**9))
+        self.assertIn(b'width="1280"', self.cache.manifest(self.output_dir, 'clip', '/a/'))
+
+        os.remove(self.mpd_path)
+        self.assertIsNone(self.cache.manifest(self.output_dir, 'clip', '/a/'))
+
+    def test_segment_index_lists_every_representation_file(self):
+        for name, size in (('init-0.m4s', 10), ('chunk-0-00001.m4s', 20), ('chunk-0-00002.m4s', 30)):
+            with open(os.path.join(self.output_dir, 'clip', name), 'wb') as f:
+                f.write(b'x' * size)
+        SegmentIndex.write(self.mpd_path)
+
+        segments = self.cache.segment_index(self.output_dir, 'clip')
+        self.assertEqual(segments, {'init-0.m4s': 10, 'chunk-0-00001.m4s': 20, 'chunk-0-00002.m4s': 30})
+
+        with override_settings(MEDIA_ROOT=self.output_dir):
+            service = StreamingService()
+            service.output_dir = self.output_dir
+            with patch('videos.services.streaming.manifest_cache', self.cache):
+                service.serve_segment('clip', 'chunk-0-00002.m4s')
+                with self.assertRaises(Http404):
+                    service.serve_segment('clip', 'chunk-0-00003.m4s')
+
+    def test_in_progress_mpd_served_uncached_with_only_listed_segments(self):
+        # ffmpeg's MPD while encoding: dynamic, listing the two segments it has finished
+        with open(self.mpd_path, 'w') as f:
+            f.write(PARTIAL_MPD.format(width=640, height=360, bandwidth=800000, index=0).replace(
+                'type="static" mediaPresentationDuration="PT8.0S"', 'type="dynamic" minimumUpdatePeriod="PT4S"'
+            ))
+        for name in ('init-0.m4s', 'chunk-0-00001.m4s', 'chunk-0-00002.m4s', 'chunk-0-00003.m4s'):
+            open(os.path.join(self.output_dir, 'clip', name), 'wb').close()
+
+        self.assertTrue(self.cache.is_dynamic(self.output_dir, 'clip'))
+        self.assertEqual(
+            sorted(self.cache.segment_index(self.output_dir, 'clip')),
+            ['chunk-0-00001.m4s', 'chunk-0-00002.m4s', 'init-0.m4s']
+        )
+
+        with override_settings(MEDIA_ROOT=self.output_dir):
+            service = StreamingService()
+            service.output_dir = self.output_dir
+            with patch('videos.services.streaming.manifest_cache', self.cache):
+                self.assertEqual(service.serve_mpd('clip')['Cache-Control'], 'no-cache')
+                with self.assertRaises(Http404):
+                    service.serve_segment('clip', 'chunk-0-00003.m4s')
+                with self.settings(VIDEO_SETTINGS={**settings.VIDEO_SETTINGS, 'PROGRESSIVE_PLAYBACK': False}):
+                    with self.assertRaises(Http404):
+                        service.serve_mpd('clip')
+
+    def test_segment_redirect_points_into_title_directory(self):
+        with override_settings(MEDIA_ROOT=self.output_dir):
+            service = StreamingService()
+            with patch('videos.services.streaming.manifest_cache') as mock_cache:
+                mock_cache.segment_index.return_value = None
+                mock_cache.resolve.return_value = (
+                    os.path.join(self.output_dir, 'dash_output', 'clip', 'chunk-0-00001.m4s'), 1
+                )
+                response = service.serve_segment('clip', 'chunk-0-00001.m4s')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected_media/dash_output/clip/chunk-0-00001.m4s')
+
+
+    def test_signed_segment_byte_ranges(self):
+        path = os.path.join(self.output_dir, 'clip', 'rep-0.mp4')
+        with open(path, 'wb') as f:
+            f.write(bytes(range(100)))
+        service = StreamingService()
+
+        partial = service._file_response(path, 'bytes=10-19')
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(partial.content, bytes(range(10, 20)))
+        self.assertEqual(service._file_response(path, 'bytes=-5').content, bytes(range(95, 100)))
+        self.assertEqual(service._file_response(path, 'bytes=200-').status_code, 416)
+        whole = service._file_response(path)
+        self.assertEqual(whole.status_code, 200)
+        self.assertEqual(whole['Accept-Ranges'], 'bytes')
+        whole.close()
+
+class ResumableUploadTestCase(TempMediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.user = User.objects.create_user(email='resumable@example.com', password='testpassword')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.payload = bytes(range(256)) * 40
+
+    def _create(self):
+        response = self.client.post(
+            '/api/videos/uploads/',
+            {'title': 'Big Upload', 'filename': '../big.mp4', 'length': len(self.payload)},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response['Location']
+
+    def _patch(self, url, start, end):
+        return self.client.patch(
+            url, self.payload[start:end],
+            content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(start)
+        )
+
+    def test_merge_ranges(self):
+        self.assertEqual(merge_ranges([[0, 10], [20, 30]], 10, 20), [[0, 30]])
+        self.assertEqual(merge_ranges([[0, 10]], 15, 20), [[0, 10], [15, 20]])
+        self.assertEqual(merge_ranges([[5, 10]], 0, 7), [[0, 10]])
+
+    @patch('videos.api.upload.process_video_task')
+    @patch('videos.services.uploads.VideoValidator')
+    def test_parts_out_of_order_then_finalize(self, mock_validator, mock_task):
+        mock_task.delay.return_value.id = 'task-1'
+        url = self._create()
+
+        response = self._patch(url, 6000, len(self.payload))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(response['Upload-Offset'], '0')
+        self.assertEqual(self.client.post(url + 'finalize/').status_code, status.HTTP_409_CONFLICT)
+
+        self._patch(url, 0, 6000)
+        head = self.client.head(url)
+        self.assertEqual(head['Upload-Offset'], str(len(self.payload)))
+        self.assertEqual(head['Upload-Ranges'], f'0-{len(self.payload) - 1}')
+
+        response = self.client.post(url + 'finalize/')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        temp_path = mock_task.delay.call_args[0][0]
+        self.assertEqual(os.path.basename(temp_path), 'big_upload_big.mp4')
+        with open(temp_path, 'rb') as f:
+            self.assertEqual(f.read(), self.payload)
+
+        video = Video.objects.get(user=self.user, title='big_upload')
+        self.assertEqual(UploadSession.objects.get().video, video)
+        self.assertEqual(self.client.head(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_part_outside_upload_rejected(self):
+        url = self._create()
+        response = self.client.patch(
+            url, b'x' * 10,
+            content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(len(self.payload) - 5)
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.head(url)['Upload-Ranges'], '')
+
+
+class TempUploadRootTestCase(TempMediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.temp_dir = os.path.join(self.media_root, 'temp_uploads')
+
+        self.user = User.objects.create_user(email='spool@example.com', password='testpassword')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    @patch('videos.api.upload.process_video_task')
+    @patch('videos.api.upload.VideoValidator')
+    def test_upload_is_renamed_into_place(self, mock_validator, mock_task):
+        mock_task.delay.return_value.id = 'task-1'
+        upload = SimpleUploadedFile('clip.mp4', b'small video', content_type='video/mp4')
+
+        response = self.client.post('/api/videos/upload/', {'title': 'Spooled', 'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        temp_path = mock_task.delay.call_args[0][0]
+        self.assertEqual(temp_path, os.path.join(self.temp_dir, 'spooled_clip.mp4'))
+        with open(temp_path, 'rb') as f:
+            self.assertEqual(f.read(), b'small video')
+        # The spooled temp file was moved, not copied and left behind
+        self.assertEqual(os.listdir(self.temp_dir), ['spooled_clip.mp4'])
+
+    def test_save_temp_upload_copies_across_filesystems(self):
+        upload = TempUploadRootFile('clip.mp4', 'video/mp4', 0, None)
+        upload.write(b'cross device')
+        upload.seek(0)
+
+        with patch('videos.services.storage.os.replace', side_effect=OSError(errno.EXDEV, 'cross-device link')):
+            temp_path = StorageService().save_temp_upload(upload, 'far')
+        upload.close()
+
+        with open(temp_path, 'rb') as f:
+            self.assertEqual(f.read(), b'cross device')
+        self.assertEqual(os.listdir(self.temp_dir), ['far_clip.mp4'])
+
+
+@mock_aws
+@override_settings(
+    USE_S3=True,
+    AWS_ACCESS_KEY_ID='testing',
+    AWS_SECRET_ACCESS_KEY='testing',
+    AWS_STORAGE_BUCKET_NAME='streambuddy-test',
+    AWS_S3_REGION_NAME='us-east-1',
+    AWS_S3_ENDPOINT_URL=None,
+)
+class DirectUploadTestCase(TempMediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+
+        redis_patcher = patch('videos.services.authz.get_redis_client', return_value=FakeRedis())
+        redis_patcher.start()
+        self.addCleanup(redis_patcher.stop)
+
+        self.s3 = boto3.client('s3', region_name='us-east-1')
+        self.s3.create_bucket(Bucket='streambuddy-test')
+
+        self.user = User.objects.create_user(email='direct@example.com', password='testpassword')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        # Two parts: S3 requires every part but the last to be at least 5MB
+        self.payload = os.urandom(DirectUploadService.MIN_PART_SIZE + 1024)
+
+    def _create(self):
+        with self.settings(VIDEO_SETTINGS={**settings.VIDEO_SETTINGS, 'DIRECT_UPLOAD_PART_SIZE': 1}):
+            response = self.client.post(
+                '/api/videos/uploads/direct/',
+                {'title': 'Direct', 'filename': 'direct.mp4', 'length': len(self.payload)},
+                format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response
+
+    def _put_part(self, part):
+        size = DirectUploadService.MIN_PART_SIZE
+        start = (part['part_number'] - 1) * size
+        response = requests.put(part['url'], data=self.payload[start:start + size])
+        self.assertEqual(response.status_code, 200)
+
+    @patch('videos.api.upload.process_video_task')
+    @patch('videos.services.uploads.VideoValidator')
+    def test_presigned_parts_then_complete(self, mock_validator, mock_task):
+        mock_task.delay.return_value.id = 'task-1'
+        created = self._create()
+        self.assertEqual(created.data['part_size'], DirectUploadService.MIN_PART_SIZE)
+        self.assertEqual([part['part_number'] for part in created.data['parts']], [1, 2])
+
+        # Upload only the last part, then resume from the server's view of the upload
+        self._put_part(created.data['parts'][1])
+        resumed = self.client.get(created['Location'])
+        self.assertEqual(resumed.data['uploaded'], [2])
+        self.assertEqual([part['part_number'] for part in resumed.data['parts']], [1])
+        self._put_part(resumed.data['parts'][0])
+
+        response = self.client.post(created['Location'])
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        source = mock_task.delay.call_args[0][0]
+        self.assertTrue(source.startswith('s3://streambuddy-test/uploads/'))
+
+        # The worker pulls the assembled object down, and drops it from the bucket only once processed
+        storage = StorageService()
+        local_path = storage.fetch_source(source)
+        with open(local_path, 'rb') as f:
+            self.assertEqual(f.read(), self.payload)
+        self.assertEqual(self.s3.list_objects_v2(Bucket='streambuddy-test').get('KeyCount'), 1)
+        storage.cleanup_source(source, local_path)
+        self.assertFalse(os.path.exists(local_path))
+        self.assertEqual(self.s3.list_objects_v2(Bucket='streambuddy-test').get('KeyCount'), 0)
+
+    def test_complete_with_missing_parts_is_rejected(self):
+        created = self._create()
+        self._put_part(created.data['parts'][0])
+
+        response = self.client.post(created['Location'])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Video.objects.filter(user=self.user, title='direct').exists())
+
+    def test_invalid_video_drops_session(self):
+        created = self._create()
+        for part in created.data['parts']:
+            self._put_part(part)
+
+        # Random bytes fail validation once assembled
+        response = self.client.post(created['Location'])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertEqual(self.s3.list_objects_v2(Bucket='streambuddy-test').get('KeyCount'), 0)
+
+    def test_abort_drops_multipart_upload(self):
+        created = self._create()
+
+        response = self.client.delete(created['Location'])
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.s3.list_multipart_uploads(Bucket='streambuddy-test').get('Uploads', []), [])
+        self.assertFalse(UploadSession.objects.exists())
+
+
+@mock_aws
+@override_settings(
+    USE_S3=True,
+    AWS_ACCESS_KEY_ID='testing',
+    AWS_SECRET_ACCESS_KEY='testing',
+    AWS_STORAGE_BUCKET_NAME='streambuddy-test',
+    AWS_S3_REGION_NAME='us-east-1',
+    AWS_S3_ENDPOINT_URL=None,
+)
+class DashPublishTestCase(TempMediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.s3 = boto3.client('s3', region_name='us-east-1')
+        self.s3.create_bucket(Bucket='streambuddy-test')
+
+        output_dir = os.path.join(self.media_root, 'dash_output', 'published')
+        os.makedirs(output_dir)
+        self.media = {f"chunk-0-{number:05d}.m4s": 10 for number in range(1, 6)}
+        index = {'representations': {'0': {'init': {'init-0.m4s': 4}, 'media': self.media}}}
+        for name, size in {'init-0.m4s': 4, **self.media}.items():
+            with open(os.path.join(output_dir, name), 'wb') as f:
+                f.write(b'x' * size)
+        with open(os.path.join(output_dir, SegmentIndex.FILENAME), 'w') as f:
+            json.dump(index, f)
+        with open(os.path.join(output_dir, 'published.mpd'), 'w') as f:
+            f.write('<MPD/>')
+
+    def _keys(self):
+        return sorted(obj['Key'] for obj in self.s3.list_objects_v2(Bucket='streambuddy-test').get('Contents', []))
+
+    def test_publish_uploads_segments_index_and_mpd(self):
+        published = StorageService().publish_dash('published')
+
+        self.assertEqual(published, 8)
+        self.assertEqual(
+            self._keys(),
+            sorted(f"dash/published/{name}" for name in ['init-0.m4s', 'published.mpd', 'segments.json', *self.media])
+        )
+        mpd = self.s3.head_object(Bucket='streambuddy-test', Key='dash/published/published.mpd')
+        self.assertEqual(mpd['ContentType'], 'application/dash+xml')
+
+    def test_publish_fails_if_any_segment_fails(self):
+        storage = StorageService()
+        publish_file = storage._publish_file
+
+        def flaky(output_dir, title, name, transfer_config):
+            if name == 'chunk-0-00003.m4s':
+                raise OSError('connection reset')
+            return publish_file(output_dir, title, name, transfer_config)
+
+        with patch.object(storage, '_publish_file', side_effect=flaky):
+            with self.assertRaises(StorageError):
+                storage.publish_dash('published')
+        # The manifest is only published once every segment is there
+        self.assertNotIn('dash/published/published.mpd', self._keys())
+
+    def test_delete_dash_removes_objects_in_batches(self):
+        storage = StorageService()
+        storage.publish_dash('published')
+        self.s3.put_object(Bucket='streambuddy-test', Key='dash/published-other/keep.m4s', Body=b'')
+        storage.DELETE_BATCH_SIZE = 3
+
+        with patch.object(storage.s3_client, 'delete_objects', wraps=storage.s3_client.delete_objects) as delete_objects:
+            self.assertEqual(storage.delete_dash('published'), 8)
+
+        self.assertEqual(delete_objects.call_count, 3)
+        self.assertEqual(self._keys(), ['dash/published-other/keep.m4s'])
+
+    def test_deleting_video_removes_local_and_published_output(self):
+        StorageService().publish_dash('published')
+        user = User.objects.create_user(email='publisher@example.com', password='testpassword')
+        Video.objects.create(user=user, title='published', display_title='Published', original_filename='p.mp4')
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        with patch('videos.services.authz.get_redis_client', return_value=FakeRedis()):
+            response = client.delete('/api/videos/published/')
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'dash_output', 'published')))
+        self.assertEqual(self._keys(), [])
+
+
+class HotSegmentCacheTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.output_dir = os.path.join(self.media_root, 'dash_output')
+        self.hot_root = os.path.join(self.media_root, 'hot')
+        for title in ('first', 'second'):
+            self._package(title)
+        hot_cache._touched.clear()
+        self.cache = HotSegmentCache(root=self.hot_root, budget=10**6, count=2)
+
+    def _package(self, title):
+        title_dir = os.path.join(self.output_dir, title)
+        os.makedirs(title_dir)
+        media = {f"chunk-0-{number:05d}.m4s": 100 for number in range(1, 6)}
+        for name, size in {'init-0.m4s': 10, **media}.items():
+            with open(os.path.join(title_dir, name), 'wb') as f:
+                f.write(b'x' * size)
+        with open(os.path.join(title_dir, SegmentIndex.FILENAME), 'w') as f:
+            json.dump({'representations': {'0': {'init': {'init-0.m4s': 10}, 'media': media}}}, f)
+
+    def test_warm_copies_init_and_first_segments(self):
+        self.assertEqual(self.cache.warm(self.output_dir, 'first'), 210)
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.hot_root, 'first'))),
+            ['chunk-0-00001.m4s', 'chunk-0-00002.m4s', 'init-0.m4s']
+        )
+        self.assertIsNotNone(self.cache.path('first', 'chunk-0-00002.m4s'))
+        self.assertIsNone(self.cache.path('first', 'chunk-0-00003.m4s'))
+
+    def test_least_recently_watched_title_evicted_over_budget(self):
+        self.cache.warm(self.output_dir, 'first')
+        os.utime(os.path.join(self.hot_root, 'first'), (0, 0))
+        self.cache.budget = 300
+
+        self.cache.warm(self.output_dir, 'second')
+
+        self.assertEqual(os.listdir(self.hot_root), ['second'])
+        # An evicted title asks to be warmed again, once per touch interval
+        self.assertFalse(self.cache.touch('first'))
+        self.assertTrue(self.cache.touch('first'))
+
+    def test_deleting_video_drops_hot_copy(self):
+        self.cache.warm(self.output_dir, 'first')
+        user = User.objects.create_user(email='hot@example.com', password='testpassword')
+        video = Video.objects.create(user=user, title='first', display_title='First', original_filename='f.mp4')
+
+        with override_settings(
+            MEDIA_ROOT=self.media_root,
+            VIDEO_SETTINGS={**settings.VIDEO_SETTINGS, 'HOT_SEGMENT_ROOT': self.hot_root},
+        ), patch('videos.services.authz.get_redis_client', return_value=FakeRedis()):
+            video.delete()
+
+        self.assertFalse(os.path.exists(self.cache.title_dir('first')))
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, 'first')))
+
+    def test_hot_segments_redirect_to_ram_tier(self):
+        self.cache.warm(self.output_dir, 'first')
+        with override_settings(MEDIA_ROOT=self.media_root):
+            service = StreamingService()
+            service.hot_cache = self.cache
+            cache = ManifestCache()
+            with patch('videos.services.streaming.manifest_cache', cache):
+                hot = service.serve_segment('first', 'chunk-0-00001.m4s')
+                cold = service.serve_segment('first', 'chunk-0-00004.m4s')
+
+        self.assertEqual(hot['X-Accel-Redirect'], '/protected_hot/first/chunk-0-00001.m4s')
+        self.assertEqual(cold['X-Accel-Redirect'], '/protected_media/dash_output/first/chunk-0-00004.m4s')
+
+    @patch('videos.services.streaming.current_app')
+    def test_evicted_title_rewarmed_by_task_name(self, mock_app):
+        StreamingService()._warm('first')
+        mock_app.send_task.assert_called_once_with(warm_hot_segments_task.name, args=['first'])
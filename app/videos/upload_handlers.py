@@ -0,0 +1,30 @@
+import os
+import tempfile
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile, TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, TemporaryFileUploadHandler
+
+
+class TempUploadRootFile(TemporaryUploadedFile):
+    """A TemporaryUploadedFile created in temp_uploads instead of FILE_UPLOAD_TEMP_DIR.
+
+    Being on the same filesystem as its final location, StorageService.save_temp_upload
+    can rename it into place instead of copying it. Until then it is deleted on close like
+    any other temporary upload.
+    """
+
+    def __init__(self, name, content_type, size, charset, content_type_extra=None):
+        temp_dir = os.path.join(settings.MEDIA_ROOT, 'temp_uploads')
+        os.makedirs(temp_dir, exist_ok=True)
+        file = tempfile.NamedTemporaryFile(prefix='.upload-', suffix='.part', dir=temp_dir)
+        UploadedFile.__init__(self, file, name, content_type, size, charset, content_type_extra)
+
+
+class TempUploadRootFileHandler(TemporaryFileUploadHandler):
+    """Stream every uploaded file, however small, straight into temp_uploads."""
+
+    def new_file(self, *args, **kwargs):
+        FileUploadHandler.new_file(self, *args, **kwargs)
+        self.file = TempUploadRootFile(
+            self.file_name, self.content_type, 0, self.charset, self.content_type_extra
+        )
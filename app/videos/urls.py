@@ -1,14 +1,39 @@
 from django.urls import path
-from .api.upload import VideoUploadAPIView, VideoProcessingStatusView
-from .api.streaming import VideoStreamingAPIView, VideoSegmentAPIView, VideoInfoAPIView, VideoListAPIView
+from .api.upload import (
+    VideoUploadAPIView,
+    VideoProcessingStatusView,
+    VideoProcessProgressView,
+    ResumableUploadCreateView,
+    ResumableUploadView,
+    ResumableUploadFinalizeView,
+    DirectUploadCreateView,
+    DirectUploadView,
+)
+from .api.events import video_progress_events
+from .api.streaming import (
+    VideoStreamingAPIView,
+    VideoPlaylistAPIView,
+    VideoSegmentAPIView,
+    VideoInfoAPIView,
+    VideoListAPIView,
+)
 
 urlpatterns = [
     # Remove the 'api/' prefix since it's already included in the main urls.py
     path('videos/', VideoListAPIView.as_view(), name='video_list'),
     path('videos/upload/', VideoUploadAPIView.as_view(), name='video_upload'),
+    path('videos/uploads/', ResumableUploadCreateView.as_view(), name='resumable_upload_create'),
+    path('videos/uploads/direct/', DirectUploadCreateView.as_view(), name='direct_upload_create'),
+    path('videos/uploads/direct/<uuid:upload_id>/', DirectUploadView.as_view(), name='direct_upload'),
+    path('videos/uploads/<uuid:upload_id>/', ResumableUploadView.as_view(), name='resumable_upload'),
+    path('videos/uploads/<uuid:upload_id>/finalize/', ResumableUploadFinalizeView.as_view(), name='resumable_upload_finalize'),
     path('videos/<str:title>/', VideoInfoAPIView.as_view(), name='video_info'),
-    # path('videos/<str:title>/progress/', VideoProcessProgressView.as_view(), name='video_progress'),
+    path('videos/<str:title>/progress/', VideoProcessProgressView.as_view(), name='video_progress'),
+    path('videos/<str:title>/events/', video_progress_events, name='video_progress_events'),
     path('videos/<str:title>/mpd/', VideoStreamingAPIView.as_view(), name='serve_mpd'),
+    path('videos/<str:title>/m3u8/', VideoPlaylistAPIView.as_view(), name='serve_m3u8'),
+    # Media playlists are listed by the master as relative names, so no trailing slash
+    path('videos/<str:title>/m3u8/<str:playlist>', VideoPlaylistAPIView.as_view(), name='serve_media_playlist'),
     path('videos/<str:title>/segments/<str:segment>/', VideoSegmentAPIView.as_view(), name='serve_segments'),
     
     path('tasks/<str:task_id>/', VideoProcessingStatusView.as_view(), name='task_status'),
@@ -1,4 +1,11 @@
+import os
+import re
+import json
+import math
+import struct
 import subprocess
+import xml.etree.ElementTree as ET
+from fractions import Fraction
 from typing import Dict, Any
 
 class VideoInfo:
@@ -34,6 +41,10 @@ class VideoInfo:
                     (s for s in metadata['streams'] if s['codec_type'] == 'video'),
                     None
                 )
+                audio_stream = next(
+                    (s for s in metadata['streams'] if s['codec_type'] == 'audio'),
+                    None
+                )
                 
                 if video_stream:
                     return {
@@ -43,7 +54,10 @@ class VideoInfo:
                         'width': int(video_stream.get('width', 0)),
                         'height': int(video_stream.get('height', 0)),
                         'codec': video_stream.get('codec_name', 'unknown'),
-                        'fps': eval(video_stream.get('r_frame_rate', '0/1'))
+                        'profile': video_stream.get('profile'),
+                        'pix_fmt': video_stream.get('pix_fmt'),
+                        'fps': eval(video_stream.get('r_frame_rate', '0/1')),
+                        'audio_codec': audio_stream.get('codec_name') if audio_stream else None
                     }
                     
             return {}
@@ -51,3 +65,387 @@ class VideoInfo:
         except Exception as e:
             print(f"Error getting video metadata: {str(e)}")
             return {}
+
+    @staticmethod
+    def get_max_keyframe_interval(file_path: str, probe_seconds: int = 60) -> float:
+        """
+        Get the longest gap between keyframes near the start of the video.
+        Args:
+            file_path: Path to video file
+            probe_seconds: How much of the video to inspect
+        Returns:
+            float: Longest keyframe gap in seconds, or 0 if it could not be determined
+        """
+        try:
+            # Packet flags are enough here, nothing has to be decoded
+            cmd = [
+                'ffprobe',
+                '-v', 'quiet',
+                '-select_streams', 'v:0',
+                '-read_intervals', f'%+{probe_seconds}',
+                '-show_entries', 'packet=pts_time,flags',
+                '-of', 'csv=p=0',
+                file_path
+            ]
+
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                return 0
+
+            keyframes = sorted(
+                float(pts_time)
+                for pts_time, flags in (line.split(',')[:2] for line in result.stdout.splitlines() if ',' in line)
+                if 'K' in flags and pts_time not in ('', 'N/A')
+            )
+            if len(keyframes) < 2:
+                return 0
+            return max(later - earlier for earlier, later in zip(keyframes, keyframes[1:]))
+
+        except Exception as e:
+            print(f"Error getting keyframe interval: {str(e)}")
+            return 0
+
+
+class FragmentedMP4:
+    """Utility class for patching timing boxes in fragmented MP4 segments."""
+
+    @staticmethod
+    def _iter_boxes(data, start, end):
+        offset = start
+        while offset + 8 <= end:
+            size, box_type = struct.unpack('>I4s', data[offset:offset + 8])
+            if size < 8:
+                break
+            yield box_type, offset, size
+            offset += size
+
+    @staticmethod
+    def get_decode_time(file_path: str) -> int:
+        """
+        Get the baseMediaDecodeTime of the first fragment in a segment.
+        Args:
+            file_path: Path to .m4s segment
+        Returns:
+            int: Decode time in track timescale units
+        """
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        for box_type, offset, size in FragmentedMP4._iter_boxes(data, 0, len(data)):
+            if box_type != b'moof':
+                continue
+            for child, child_offset, child_size in FragmentedMP4._iter_boxes(data, offset + 8, offset + size):
+                if child != b'traf':
+                    continue
+                for leaf, leaf_offset, _ in FragmentedMP4._iter_boxes(data, child_offset + 8, child_offset + child_size):
+                    if leaf == b'tfdt':
+                        return FragmentedMP4._read_time(data, leaf_offset + 12, data[leaf_offset + 8])
+        raise ValueError(f"No tfdt box found in {file_path}")
+
+    @staticmethod
+    def shift_decode_time(file_path: str, delta: int) -> None:
+        """
+        Shift every tfdt and sidx timestamp in a segment by delta, in place.
+        Args:
+            file_path: Path to .m4s segment
+            delta: Offset in track timescale units
+        """
+        if not delta:
+            return
+        with open(file_path, 'r+b') as f:
+            data = bytearray(f.read())
+            for box_type, offset, size in FragmentedMP4._iter_boxes(data, 0, len(data)):
+                if box_type == b'sidx':
+                    # version(1) flags(3) reference_ID(4) timescale(4) earliest_presentation_time
+                    FragmentedMP4._shift_time(data, offset + 20, data[offset + 8], delta)
+                elif box_type == b'moof':
+                    for child, child_offset, child_size in FragmentedMP4._iter_boxes(data, offset + 8, offset + size):
+                        if child != b'traf':
+                            continue
+                        for leaf, leaf_offset, _ in FragmentedMP4._iter_boxes(data, child_offset + 8, child_offset + child_size):
+                            if leaf == b'tfdt':
+                                FragmentedMP4._shift_time(data, leaf_offset + 12, data[leaf_offset + 8], delta)
+            f.seek(0)
+            f.write(data)
+
+    @staticmethod
+    def top_level_boxes(file_path: str):
+        """
+        List the top-level boxes of an MP4 file, seeking over their payloads.
+        Args:
+            file_path: Path to an MP4 file of any size
+        Returns:
+            list: (box type, offset, size) tuples in file order
+        """
+        boxes = []
+        with open(file_path, 'rb') as f:
+            file_size = os.fstat(f.fileno()).st_size
+            offset = 0
+            while offset + 8 <= file_size:
+                f.seek(offset)
+                size, box_type = struct.unpack('>I4s', f.read(8))
+                if size == 1:
+                    size = struct.unpack('>Q', f.read(8))[0]
+                elif size == 0:
+                    size = file_size - offset
+                if size < 8:
+                    break
+                boxes.append((box_type, offset, size))
+                offset += size
+        return boxes
+
+    @staticmethod
+    def _read_time(data, offset, version):
+        fmt = '>Q' if version == 1 else '>I'
+        return struct.unpack_from(fmt, data, offset)[0]
+
+    @staticmethod
+    def _shift_time(data, offset, version, delta):
+        fmt = '>Q' if version == 1 else '>I'
+        struct.pack_into(fmt, data, offset, FragmentedMP4._read_time(data, offset, version) + delta)
+
+
+class SegmentIndex:
+    """Per-video list of the files a DASH manifest references, written next to the MPD."""
+
+    FILENAME = 'segments.json'
+    _TEMPLATE_VARIABLE = re.compile(r'\$(RepresentationID|Number)(%0(\d+)d)?\$')
+
+    @staticmethod
+    def _expand(template: str, representation_id: str, number: int = 0) -> str:
+        def substitute(match):
+            if match.group(1) == 'RepresentationID':
+                return representation_id
+            return str(number).zfill(int(match.group(3) or 0))
+        return SegmentIndex._TEMPLATE_VARIABLE.sub(substitute, template)
+
+    @staticmethod
+    def build(mpd_path: str) -> Dict[str, Any]:
+        """
+        List the init and media segments of every representation in an MPD.
+        Args:
+            mpd_path: Path to an MPD using SegmentTemplate with a SegmentTimeline
+        Returns:
+            dict: {'representations': {id: {'init': {name: size}, 'media': {name: size}}}}
+            with sizes in bytes, read from the files next to the MPD. Single-file
+            representations list their one file under 'file' instead.
+        """
+        output_dir = os.path.dirname(mpd_path)
+        root = ET.parse(mpd_path).getroot()
+        representations = {}
+
+        for adaptation_set in root.iterfind('.//{*}AdaptationSet'):
+            set_template = adaptation_set.find('{*}SegmentTemplate')
+            for representation in adaptation_set.findall('{*}Representation'):
+                representation_id = representation.get('id')
+                base_url = representation.find('{*}BaseURL')
+                if base_url is not None and representation.find('{*}SegmentTemplate') is None:
+                    # Single-file packaging: one file per representation, addressed by byte range
+                    try:
+                        size = os.path.getsize(os.path.join(output_dir, base_url.text))
+                    except OSError:
+                        raise ValueError(f"File {base_url.text} listed in {mpd_path} is missing")
+                    representations[representation_id] = {'init': {}, 'media': {}, 'file': {base_url.text: size}}
+                    continue
+
+                template = representation.find('{*}SegmentTemplate')
+                if template is None:
+                    template = set_template
+                if template is None:
+                    continue
+
+                names = [SegmentIndex._expand(template.get('initialization'), representation_id)]
+                count = sum(
+                    int(s.get('r', 0)) + 1 for s in template.iterfind('{*}SegmentTimeline/{*}S')
+                )
+                start = int(template.get('startNumber', 1))
+                names += [
+                    SegmentIndex._expand(template.get('media'), representation_id, number)
+                    for number in range(start, start + count)
+                ]
+
+                sizes = {}
+                for name in names:
+                    try:
+                        sizes[name] = os.path.getsize(os.path.join(output_dir, name))
+                    except OSError:
+                        raise ValueError(f"Segment {name} listed in {mpd_path} is missing")
+                representations[representation_id] = {
+                    'init': {names[0]: sizes[names[0]]},
+                    'media': {name: sizes[name] for name in names[1:]},
+                }
+
+        return {'representations': representations}
+
+    @staticmethod
+    def write(mpd_path: str) -> str:
+        """Build the index for an MPD and store it in the same directory. Returns its path."""
+        index_path = os.path.join(os.path.dirname(mpd_path), SegmentIndex.FILENAME)
+        with open(index_path, 'w') as f:
+            json.dump(SegmentIndex.build(mpd_path), f, separators=(',', ':'))
+        return index_path
+
+    @staticmethod
+    def read(index_path: str) -> Dict[str, Any]:
+        """Read an index as written, segments grouped by representation in playback order."""
+        with open(index_path) as f:
+            return json.load(f)
+
+    @staticmethod
+    def load(index_path: str) -> Dict[str, int]:
+        """Read an index into a flat {segment name: size} dict for constant-time lookups."""
+        return SegmentIndex.flatten(SegmentIndex.read(index_path))
+
+    @staticmethod
+    def flatten(index: Dict[str, Any]) -> Dict[str, int]:
+        """Merge the per-representation lists of an index into one {segment name: size} dict."""
+        segments = {}
+        for representation in index['representations'].values():
+            segments.update(representation['init'])
+            segments.update(representation['media'])
+            segments.update(representation.get('file', {}))
+        return segments
+
+
+class HlsPlaylist:
+    """HLS playlists over the CMAF segments of a DASH manifest, written next to the MPD.
+
+    The master playlist is named after the MPD and lists one media playlist per video
+    representation, with the audio representation as an alternate rendition group.
+    URIs are bare file names, resolved against a base URL when served like the MPD's.
+    """
+
+    MEDIA_PLAYLIST = 'media_{}.m3u8'
+    AUDIO_GROUP = 'audio'
+    _ISO_DURATION = re.compile(r'^PT(?:(\d+)H)?(?:(\d+)M)?(?:([\d.]+)S)?$')
+
+    @staticmethod
+    def _seconds(duration: str) -> float:
+        match = HlsPlaylist._ISO_DURATION.match(duration or '')
+        if not match:
+            raise ValueError(f"Unsupported duration {duration}")
+        hours, minutes, seconds = match.groups()
+        return int(hours or 0) * 3600 + int(minutes or 0) * 60 + float(seconds or 0)
+
+    @staticmethod
+    def _byte_range(value: str) -> str:
+        first, last = (int(part) for part in value.split('-'))
+        return f"{last - first + 1}@{first}"
+
+    @staticmethod
+    def _timeline(element) -> list:
+        durations = []
+        for s in element.iterfind('{*}SegmentTimeline/{*}S'):
+            durations += [int(s.get('d'))] * (int(s.get('r', 0)) + 1)
+        return durations
+
+    @staticmethod
+    def _segments(representation, set_template, total_duration: float):
+        """
+        Resolve the init section and media segments of a representation.
+        Returns:
+            tuple: ((uri, byte range or None), [(seconds, uri, byte range or None)])
+        """
+        representation_id = representation.get('id')
+        segment_list = representation.find('{*}SegmentList')
+        if segment_list is not None:
+            # Single-file packaging: byte ranges of the one file named by BaseURL
+            uri = representation.find('{*}BaseURL').text
+            timescale = int(segment_list.get('timescale', 1))
+            ranges = [url.get('mediaRange') for url in segment_list.findall('{*}SegmentURL')]
+            durations = [d / timescale for d in HlsPlaylist._timeline(segment_list)]
+            if not durations:
+                duration = int(segment_list.get('duration')) / timescale
+                durations = [duration] * (len(ranges) - 1)
+                durations.append(max(total_duration - sum(durations), 0.001))
+            init = (uri, HlsPlaylist._byte_range(segment_list.find('{*}Initialization').get('range')))
+            return init, [
+                (seconds, uri, HlsPlaylist._byte_range(media_range))
+                for seconds, media_range in zip(durations, ranges)
+            ]
+
+        template = representation.find('{*}SegmentTemplate')
+        if template is None:
+            template = set_template
+        timescale = int(template.get('timescale', 1))
+        start = int(template.get('startNumber', 1))
+        init = (SegmentIndex._expand(template.get('initialization'), representation_id), None)
+        return init, [
+            (d / timescale, SegmentIndex._expand(template.get('media'), representation_id, number), None)
+            for number, d in enumerate(HlsPlaylist._timeline(template), start)
+        ]
+
+    @staticmethod
+    def _media_playlist(init, segments) -> str:
+        uri, byte_range = init
+        lines = [
+            '#EXTM3U',
+            '#EXT-X-VERSION:7',
+            f"#EXT-X-TARGETDURATION:{math.ceil(max(seconds for seconds, _, _ in segments))}",
+            '#EXT-X-MEDIA-SEQUENCE:0',
+            '#EXT-X-PLAYLIST-TYPE:VOD',
+            '#EXT-X-INDEPENDENT-SEGMENTS',
+            f'#EXT-X-MAP:URI="{uri}"' + (f',BYTERANGE="{byte_range}"' if byte_range else ''),
+        ]
+        for seconds, uri, byte_range in segments:
+            lines.append(f"#EXTINF:{seconds:.3f},")
+            if byte_range:
+                lines.append(f"#EXT-X-BYTERANGE:{byte_range}")
+            lines.append(uri)
+        lines.append('#EXT-X-ENDLIST')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def write(mpd_path: str) -> str:
+        """
+        Write the master and media playlists for a static MPD.
+        Args:
+            mpd_path: Path to an MPD of fMP4 segments, templated or single-file
+        Returns:
+            str: Path of the master playlist
+        """
+        output_dir = os.path.dirname(mpd_path)
+        root = ET.parse(mpd_path).getroot()
+        total_duration = HlsPlaylist._seconds(root.get('mediaPresentationDuration'))
+        videos, audio = [], None
+
+        for adaptation_set in root.iterfind('.//{*}AdaptationSet'):
+            set_template = adaptation_set.find('{*}SegmentTemplate')
+            content_type = adaptation_set.get('contentType') or adaptation_set.get('mimeType', '').split('/')[0]
+            for representation in adaptation_set.findall('{*}Representation'):
+                init, segments = HlsPlaylist._segments(representation, set_template, total_duration)
+                name = HlsPlaylist.MEDIA_PLAYLIST.format(representation.get('id'))
+                with open(os.path.join(output_dir, name), 'w') as f:
+                    f.write(HlsPlaylist._media_playlist(init, segments))
+                if content_type == 'audio':
+                    audio = audio or (representation, name)
+                else:
+                    videos.append((adaptation_set, representation, name))
+
+        lines = ['#EXTM3U', '#EXT-X-VERSION:7', '#EXT-X-INDEPENDENT-SEGMENTS']
+        if audio:
+            lines.append(
+                f'#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="{HlsPlaylist.AUDIO_GROUP}",NAME="default",'
+                f'DEFAULT=YES,AUTOSELECT=YES,URI="{audio[1]}"'
+            )
+        for adaptation_set, representation, name in videos:
+            bandwidth = int(representation.get('bandwidth', 0))
+            codecs = [representation.get('codecs') or adaptation_set.get('codecs')]
+            if audio:
+                bandwidth += int(audio[0].get('bandwidth', 0))
+                codecs.append(audio[0].get('codecs'))
+            attributes = [f"BANDWIDTH={bandwidth}"]
+            if all(codecs):
+                attributes.append(f'CODECS="{",".join(codecs)}"')
+            if representation.get('width'):
+                attributes.append(f"RESOLUTION={representation.get('width')}x{representation.get('height')}")
+            frame_rate = representation.get('frameRate') or adaptation_set.get('frameRate')
+            if frame_rate:
+                attributes.append(f"FRAME-RATE={float(Fraction(frame_rate)):.3f}")
+            if audio:
+                attributes.append(f'AUDIO="{HlsPlaylist.AUDIO_GROUP}"')
+            lines += [f"#EXT-X-STREAM-INF:{','.join(attributes)}", name]
+
+        master_path = os.path.splitext(mpd_path)[0] + '.m3u8'
+        with open(master_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        return master_path